@@ -14,7 +14,7 @@ import logging
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from scrapers.scraperapi_client import ScraperAPIClient
+from scrapers.scraperapi_client import scraperapi_client, scraperapi_credits
 
 load_dotenv()
 
@@ -42,7 +42,8 @@ async def auto_fetch_all_charms():
     print(f"\nFound {total_charms} charms")
     print(f"Starting scraping process...\n")
     
-    scraper = ScraperAPIClient()
+    scraper = scraperapi_client
+    await scraper.sync_credits()
     updated_count = 0
     skipped_count = 0
     error_count = 0
@@ -70,7 +71,7 @@ async def auto_fetch_all_charms():
         try:
             # Scrape live prices
             print(f"  🔍 Fetching live prices...")
-            all_listings = scraper.scrape_all(f"James Avery {charm_name}")
+            all_listings = await scraper.scrape_all(f"James Avery {charm_name}")
             
             if not all_listings:
                 print(f"  ⚠️  No listings found")
@@ -147,8 +148,10 @@ async def auto_fetch_all_charms():
     print(f"⏭️  Skipped: {skipped_count} charms (recently updated)")
     print(f"❌ Errors: {error_count} charms")
     print(f"📊 Total: {total_charms} charms")
+    print(f"💳 ScraperAPI credits spent: {scraperapi_credits.stats()['by_kind']}")
     print("="*70)
     
+    await scraper.close()
     client.close()
 
 if __name__ == "__main__":
@@ -0,0 +1,327 @@
+"""
+End-to-end benchmark for CharmTracker update cycles
+Starts the fake marketplaces (fake_marketplaces.py), seeds a scratch MongoDB
+database with synthetic charms built from seed.py's generators, then runs the
+scheduler's marketplace update cycle and James Avery catalog sync against
+them. Reports charms/minute, per-stage and per-platform latency percentiles,
+requests served by each fake and peak RSS.
+
+The scratch database (BENCHMARK_MONGO_URL, default a local mongod; never the
+app's MONGO_URL) is dropped before and after the run. Rate limits are the configured ones unless
+--unthrottled is given.
+
+Usage:
+    python benchmark_update_cycle.py --charms 500
+    python benchmark_update_cycle.py --charms 200 --latency-ms 300 --error-rate 0.05 --cycles 2
+    python benchmark_update_cycle.py --workload catalog --catalog 2000 --page-kb 300 --json before.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Sample names are combined with these to reach the requested charm count
+NAME_STYLES = ['', 'Petite', 'Dangle', 'Enamel', 'Vintage', 'Mini', 'Classic', 'Large', 'Twisted', 'Textured']
+
+
+def charm_names(count: int):
+    from seed import SAMPLE_CHARMS
+
+    names = []
+    rounds = 0
+    while len(names) < count:
+        for style in NAME_STYLES:
+            for charm in SAMPLE_CHARMS:
+                name = f"{style} {charm['name']}".strip()
+                names.append(f"{name} {rounds + 1}" if rounds else name)
+        rounds += 1
+    return names[:count]
+
+
+def configure(args):
+    """Environment for the backend modules; must run before they are imported"""
+    fake_settings = {
+        'FAKE_LATENCY_MS': args.latency_ms,
+        'FAKE_LATENCY_JITTER': args.jitter,
+        'FAKE_ERROR_RATE': args.error_rate,
+        'FAKE_LISTINGS': args.listings,
+        'FAKE_PAGE_KB': args.page_kb,
+        'FAKE_RUN_SECONDS': args.apify_run_seconds,
+    }
+    os.environ.update({name: str(value) for name, value in fake_settings.items() if value is not None})
+
+    from fake_marketplaces import marketplace_env
+    os.environ.update(marketplace_env())
+    os.environ.update({
+        'JAMES_AVERY_DISCOVERY': 'sitemap',
+        # Never publish the scratch catalog over a real snapshot
+        'CATALOG_SNAPSHOT_DIR': '',
+        'SEARCH_CACHE_ENABLED': 'false' if args.no_cache else os.getenv('SEARCH_CACHE_ENABLED', 'true'),
+    })
+    if args.batch_size:
+        os.environ['UPDATE_BATCH_SIZE'] = str(args.batch_size)
+    if args.unthrottled:
+        for platform in ('EBAY', 'ETSY', 'POSHMARK'):
+            os.environ[f'{platform}_REQUESTS_PER_SECOND'] = '0'
+        os.environ['JAMES_AVERY_INITIAL_RATE'] = '1000'
+        os.environ['JAMES_AVERY_MAX_RATE'] = '1000'
+
+
+def peak_rss_mb() -> dict:
+    """This process, and the parse pool workers summed (Linux)"""
+    workers = 0
+    for child in multiprocessing.active_children():
+        try:
+            with open(f'/proc/{child.pid}/status') as f:
+                workers += next(int(line.split()[1]) for line in f if line.startswith('VmHWM:'))
+        except (OSError, StopIteration):
+            continue
+    # ru_maxrss and VmHWM are in kilobytes
+    return {
+        'self': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'workers': round(workers / 1024, 1),
+    }
+
+
+async def seed_charms(db, names, known_url_share: float, ja_base_url: str):
+    """Charm documents like seed.py's, all due for a refresh"""
+    from fake_marketplaces import catalog_products
+    from seed import generate_placeholder_images, generate_price_history, generate_sample_listings
+
+    now = datetime.utcnow()
+    docs = []
+    for product in catalog_products(names):
+        avg_price = round(random.uniform(25, 80), 2)
+        charm = {
+            'id': f"charm_{product['name'].lower().replace(' ', '_')}",
+            'name': product['name'],
+            'description': f"Sterling silver {product['name'].lower()}.",
+            'material': 'Silver',
+            'status': 'Active',
+            'is_retired': False,
+            'avg_price': avg_price,
+            'price_change_7d': 0.0,
+            'price_change_30d': 0.0,
+            'price_change_90d': 0.0,
+            'popularity': random.randint(60, 98),
+            'images': generate_placeholder_images(product['name']),
+            'listings': generate_sample_listings(product['name'], avg_price),
+            'price_history': generate_price_history(avg_price),
+            'related_charm_ids': [],
+            'last_updated': now - timedelta(days=2),
+            'next_refresh_at': now - timedelta(minutes=1),
+            'created_at': now,
+        }
+        # The rest are found through the James Avery search
+        if random.random() < known_url_share:
+            charm['james_avery_url'] = f"{ja_base_url}{product['path']}"
+        docs.append(charm)
+    for start in range(0, len(docs), 500):
+        await db.charms.insert_many(docs[start:start + 500])
+
+
+def stage_report(stats: dict) -> dict:
+    return {
+        name: {key: stage[key] for key in ('processed', 'failed', 'items_per_second', 'p50_ms', 'p95_ms', 'p99_ms', 'max_queue_depth')}
+        for name, stage in stats.get('stages', {}).items()
+    }
+
+
+def request_counts(servers) -> dict:
+    counts = {}
+    for name, (_, app) in servers.items():
+        counts[name] = dict(app['stats'])
+        app['stats'].update({key: 0 for key in app['stats']})
+    return counts
+
+
+async def run_update_cycles(scheduler, db, args, servers) -> list:
+    from services.pipeline import pipeline_stats
+    from scrapers.hedging import hedging_stats
+
+    results = []
+    for cycle in range(1, args.cycles + 1):
+        # Everything is due again, so later cycles measure a warm search cache
+        due = datetime.utcnow() - timedelta(minutes=1)
+        await db.charms.update_many({}, {'$set': {'next_refresh_at': due}})
+        if scheduler.refresh_queue.loaded:
+            for charm_id in await db.charms.distinct('id'):
+                scheduler.refresh_queue.push(charm_id, due)
+        started = time.perf_counter()
+        await scheduler._update_cycle()
+        seconds = time.perf_counter() - started
+        outcome = await db.update_stats.find_one(sort=[('started_at', -1)]) or {}
+        results.append({
+            'cycle': cycle,
+            'seconds': round(seconds, 2),
+            'charms': outcome.get('total_charms', 0),
+            'succeeded': outcome.get('success_count', 0),
+            'failed': outcome.get('fail_count', 0),
+            'charms_per_minute': round(outcome.get('total_charms', 0) / seconds * 60, 1) if seconds else 0.0,
+            'stages': stage_report(pipeline_stats().get('marketplace_updates', {})),
+            'platforms': {
+                platform: {key: stats[key] for key in ('samples', 'p50_ms', 'p95_ms', 'p99_ms', 'hedges')}
+                for platform, stats in hedging_stats().items()
+            },
+            'requests': request_counts(servers),
+            'peak_rss_mb': peak_rss_mb(),
+        })
+    return results
+
+
+async def run_catalog_sync(scheduler, db, servers) -> dict:
+    from services.pipeline import pipeline_stats
+
+    before = await db.charms.count_documents({})
+    started = time.perf_counter()
+    await scheduler._run_james_avery_scrape()
+    seconds = time.perf_counter() - started
+    # The frontier holds every product the run queued
+    products = await db.crawl_frontier.count_documents({})
+    return {
+        'seconds': round(seconds, 2),
+        'products': products,
+        'new_charms': await db.charms.count_documents({}) - before,
+        'products_per_minute': round(products / seconds * 60, 1) if seconds else 0.0,
+        'stages': stage_report(pipeline_stats().get('catalog_sync', {})),
+        'requests': request_counts(servers),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def print_stages(stages: dict):
+    print(f"   {'stage':<12}{'items':>8}{'failed':>8}{'items/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max queue':>11}")
+    for name, s in stages.items():
+        print(
+            f"   {name:<12}{s['processed']:>8}{s['failed']:>8}{s['items_per_second']:>10}"
+            f"{str(s['p50_ms']):>10}{str(s['p95_ms']):>10}{str(s['p99_ms']):>10}{s['max_queue_depth']:>11}"
+        )
+
+
+def print_report(report: dict):
+    print("\n" + "=" * 70)
+    print("📊 BENCHMARK RESULTS")
+    print("=" * 70)
+    for cycle in report.get('update_cycles', []):
+        print(
+            f"\n🔄 Update cycle {cycle['cycle']}: {cycle['charms']} charms in {cycle['seconds']}s "
+            f"= {cycle['charms_per_minute']} charms/min ({cycle['succeeded']} ok, {cycle['failed']} failed)"
+        )
+        print_stages(cycle['stages'])
+        for platform, s in cycle['platforms'].items():
+            print(f"   {platform:<12}{s['samples']:>6} calls  p50 {s['p50_ms']} ms  p95 {s['p95_ms']} ms  p99 {s['p99_ms']} ms  hedges {s['hedges']}")
+        print(f"   requests: {json.dumps(cycle['requests'])}")
+        print(f"   peak RSS: {cycle['peak_rss_mb']['self']} MB (workers {cycle['peak_rss_mb']['workers']} MB)")
+    catalog = report.get('catalog_sync')
+    if catalog:
+        print(
+            f"\n🏪 Catalog sync: {catalog['products']} products in {catalog['seconds']}s "
+            f"= {catalog['products_per_minute']} products/min ({catalog['new_charms']} new charms)"
+        )
+        print_stages(catalog['stages'])
+        print(f"   requests: {json.dumps(catalog['requests'])}")
+        print(f"   peak RSS: {catalog['peak_rss_mb']['self']} MB (workers {catalog['peak_rss_mb']['workers']} MB)")
+    print("=" * 70)
+
+
+async def benchmark(args):
+    configure(args)
+
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from fake_marketplaces import FakeProfile, start_fake_marketplaces
+    from scrapers.james_avery_scraper import james_avery_scraper
+    from scrapers.poshmark_scraper import poshmark_scraper
+    from services.pipeline import shutdown_pools
+    from services.scheduler import BackgroundScheduler
+
+    if args.db == os.getenv('DB_NAME'):
+        print(f"❌ Refusing to benchmark in {args.db}: it is the app's DB_NAME and would be dropped")
+        return
+
+    random.seed(args.seed)
+    names = charm_names(max(args.charms, args.catalog or 0))
+
+    client = AsyncIOMotorClient(os.getenv('BENCHMARK_MONGO_URL', 'mongodb://localhost:27017'))
+    await client.drop_database(args.db)
+    db = client[args.db]
+
+    servers = await start_fake_marketplaces(names)
+    report = {
+        'started_at': datetime.utcnow().isoformat(),
+        'args': vars(args),
+        'marketplaces': {name: FakeProfile(name).describe() for name in servers},
+    }
+    try:
+        print(f"🌱 Seeding {args.charms} charms into {args.db}...")
+        await seed_charms(db, names[:args.charms], args.known_url_share, os.environ['JAMES_AVERY_BASE_URL'])
+        request_counts(servers)
+        scheduler = BackgroundScheduler(db)
+
+        if args.workload in ('update', 'both'):
+            print(f"🔄 Running {args.cycles} update cycle(s)...")
+            report['update_cycles'] = await run_update_cycles(scheduler, db, args, servers)
+        if args.workload in ('catalog', 'both'):
+            print("🏪 Running the James Avery catalog sync...")
+            report['catalog_sync'] = await run_catalog_sync(scheduler, db, servers)
+    finally:
+        await poshmark_scraper.close()
+        if james_avery_scraper.session:
+            await james_avery_scraper.session.close()
+        for runner, _ in servers.values():
+            await runner.cleanup()
+        if not args.keep_db:
+            await client.drop_database(args.db)
+        client.close()
+        shutdown_pools()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"💾 Results written to {args.json}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark update cycles against local fake marketplaces")
+    parser.add_argument('--charms', type=int, default=200, help="Synthetic charms to seed and update")
+    parser.add_argument('--catalog', type=int, help="Products in the fake James Avery catalog (at least --charms)")
+    parser.add_argument('--workload', default='both', choices=['update', 'catalog', 'both'])
+    parser.add_argument('--cycles', type=int, default=1, help="Update cycles to run (later ones hit a warm cache)")
+    parser.add_argument('--latency-ms', type=float, help="Mean fake response time (FAKE_LATENCY_MS)")
+    parser.add_argument('--jitter', type=float, help="Latency spread as a fraction (FAKE_LATENCY_JITTER)")
+    parser.add_argument('--error-rate', type=float, help="Share of requests answered with a 503 (FAKE_ERROR_RATE)")
+    parser.add_argument('--listings', type=int, help="Listings per marketplace search (FAKE_LISTINGS)")
+    parser.add_argument('--page-kb', type=int, help="James Avery product page size (FAKE_PAGE_KB)")
+    parser.add_argument('--apify-run-seconds', type=float, default=1.0, help="How long a fake Poshmark run takes")
+    parser.add_argument('--known-url-share', type=float, default=0.5, help="Share of charms with a stored James Avery URL")
+    parser.add_argument('--batch-size', type=int, help="Searches in flight (UPDATE_BATCH_SIZE)")
+    parser.add_argument('--unthrottled', action='store_true', help="Lift the marketplace rate limits (concurrency caps stay)")
+    parser.add_argument('--no-cache', action='store_true', help="Disable the search cache")
+    parser.add_argument('--db', default=os.getenv('BENCHMARK_DB_NAME', 'charmtracker_benchmark'))
+    parser.add_argument('--keep-db', action='store_true', help="Leave the scratch database for inspection")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed for the synthetic data")
+    parser.add_argument('--json', help="Also write the results to this file")
+    parser.add_argument('--verbose', action='store_true', help="Show the backend's own logging")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    asyncio.run(benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
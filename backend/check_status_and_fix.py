@@ -5,6 +5,7 @@ import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
+from services.detail_renderer import invalidate_rendered_detail
 
 load_dotenv()
 
@@ -79,7 +80,7 @@ async def check_and_fix():
             {'$set': {
                 'status': 'Active',
                 'is_retired': False
-            }}
+            }, **invalidate_rendered_detail()}
         )
         
         print(f"✅ Updated {result.modified_count} charms to Active status")
@@ -10,6 +10,7 @@ from datetime import datetime, timedelta, timezone
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
+from services.detail_renderer import invalidate_rendered_detail
 import random
 
 load_dotenv()
@@ -193,7 +194,7 @@ async def seed_database():
         
         await db.charms.update_one(
             {'id': charm['id']},
-            {'$set': {'related_charm_ids': related_ids}}
+            {'$set': {'related_charm_ids': related_ids}, **invalidate_rendered_detail()}
         )
     
     print("✅ Related charm relationships added")
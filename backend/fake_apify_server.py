@@ -0,0 +1,103 @@
+"""
+Fake Apify API for CharmTracker
+Local stand-in for the Poshmark actor: starts runs, reports RUNNING for a few
+seconds, then serves a dataset with a few listings per search URL
+
+Usage:
+    python fake_apify_server.py            # serves http://localhost:8765/v2
+    APIFY_BASE_URL=http://localhost:8765/v2 APIFY_API_TOKEN=fake python test_poshmark_batch.py
+"""
+
+import itertools
+import os
+import random
+import time
+from urllib.parse import parse_qs, urlparse
+
+from aiohttp import web
+
+FAKE_APIFY_PORT = int(os.getenv('FAKE_APIFY_PORT', '8765'))
+# How long a run stays RUNNING, and how many items each search URL yields
+FAKE_RUN_SECONDS = float(os.getenv('FAKE_RUN_SECONDS', '3'))
+FAKE_ITEMS_PER_SEARCH = int(os.getenv('FAKE_ITEMS_PER_SEARCH', '5'))
+
+_run_ids = itertools.count(1)
+
+
+def _items_for(search_url: str):
+    query = parse_qs(urlparse(search_url).query).get('query', ['charm'])[0]
+    rng = random.Random(query)
+    return [
+        {
+            'searchUrl': search_url,
+            'title': f"{query} {'NWT' if i % 2 else 'pre-loved'} #{i}",
+            'price': f"${rng.randint(20, 300)}.00",
+            'link': f"https://poshmark.com/listing/{abs(hash((query, i))) % 10**8}",
+            'image': f"https://cdn.example/poshmark/{i}.jpg",
+            'seller': f"closet{rng.randint(1, 999)}",
+            'brand': 'James Avery',
+        }
+        for i in range(FAKE_ITEMS_PER_SEARCH)
+    ]
+
+
+def create_app() -> web.Application:
+    """aiohttp app; request counters are kept in app['stats']"""
+    app = web.Application()
+    app['runs'] = {}
+    app['stats'] = {'runs_started': 0, 'search_urls': 0, 'status_polls': 0, 'dataset_reads': 0}
+
+    async def start_run(request):
+        body = await request.json()
+        search_urls = body.get('searchUrls') or []
+        run_id = f"fake-run-{next(_run_ids)}"
+        request.app['runs'][run_id] = {
+            'started': time.monotonic(),
+            'items': [item for url in search_urls for item in _items_for(url)],
+        }
+        request.app['stats']['runs_started'] += 1
+        request.app['stats']['search_urls'] += len(search_urls)
+        return web.json_response({'data': {'id': run_id, 'status': 'RUNNING'}}, status=201)
+
+    def _run_or_404(request):
+        run = request.app['runs'].get(request.match_info['run_id'])
+        if run is None:
+            raise web.HTTPNotFound()
+        return run
+
+    async def run_status(request):
+        run = _run_or_404(request)
+        request.app['stats']['status_polls'] += 1
+        done = time.monotonic() - run['started'] >= FAKE_RUN_SECONDS
+        return web.json_response({'data': {
+            'id': request.match_info['run_id'],
+            'status': 'SUCCEEDED' if done else 'RUNNING',
+        }})
+
+    async def dataset_items(request):
+        run = _run_or_404(request)
+        request.app['stats']['dataset_reads'] += 1
+        done = time.monotonic() - run['started'] >= FAKE_RUN_SECONDS
+        return web.json_response(run['items'] if done else [])
+
+    async def stats(request):
+        return web.json_response(request.app['stats'])
+
+    app.router.add_post('/v2/acts/{actor_id}/runs', start_run)
+    app.router.add_get('/v2/actor-runs/{run_id}', run_status)
+    app.router.add_get('/v2/actor-runs/{run_id}/dataset/items', dataset_items)
+    app.router.add_get('/stats', stats)
+    return app
+
+
+async def start_fake_apify(port: int = FAKE_APIFY_PORT) -> web.AppRunner:
+    """Serve the fake API in the running event loop; call runner.cleanup() to stop"""
+    runner = web.AppRunner(create_app())
+    await runner.setup()
+    await web.TCPSite(runner, 'localhost', port).start()
+    return runner
+
+
+if __name__ == "__main__":
+    print(f"🧪 Fake Apify API on http://localhost:{FAKE_APIFY_PORT}/v2")
+    web.run_app(create_app(), host='localhost', port=FAKE_APIFY_PORT)
@@ -0,0 +1,367 @@
+"""
+Fake Marketplaces for CharmTracker
+Local stand-ins for the James Avery site, the eBay Finding API, the Etsy API
+and (from fake_apify_server.py) the Apify Poshmark actor. Every server adds
+latency, injects errors and sizes its payloads from FAKE_* settings, so
+update cycles and catalog syncs can be measured without touching the real
+sites (see benchmark_update_cycle.py).
+
+Settings apply to every marketplace unless overridden per marketplace, e.g.
+FAKE_LATENCY_MS=80 with FAKE_EBAY_LATENCY_MS=250:
+
+    FAKE_LATENCY_MS      mean response delay (default 50)
+    FAKE_LATENCY_JITTER  delay varies by +/- this fraction (default 0.5)
+    FAKE_ERROR_RATE      share of requests answered with a 503 (default 0)
+    FAKE_LISTINGS        listings per marketplace search (default 20)
+    FAKE_PAGE_KB         size of a James Avery product page (default 150)
+
+Usage:
+    python fake_marketplaces.py     # serves all four; prints the env vars to point the backend at them
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+from datetime import datetime, timedelta
+from html import escape
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+import fake_apify_server
+
+FAKE_HOST = os.getenv('FAKE_HOST', 'localhost')
+FAKE_PORTS = {
+    'apify': fake_apify_server.FAKE_APIFY_PORT,
+    'james_avery': int(os.getenv('FAKE_JAMES_AVERY_PORT', '8766')),
+    'ebay': int(os.getenv('FAKE_EBAY_PORT', '8767')),
+    'etsy': int(os.getenv('FAKE_ETSY_PORT', '8768')),
+}
+
+SCENE7 = 'https://jamesavery.scene7.com/is/image/JamesAvery'
+METALS = ['Sterling Silver', '14K Gold', 'Bronze']
+
+
+class FakeProfile:
+    """How one fake marketplace behaves"""
+
+    def __init__(self, name: str):
+        def setting(key: str, default: str) -> str:
+            return os.getenv(f'FAKE_{name.upper()}_{key}', os.getenv(f'FAKE_{key}', default))
+
+        self.name = name
+        self.latency_ms = float(setting('LATENCY_MS', '50'))
+        self.jitter = float(setting('LATENCY_JITTER', '0.5'))
+        self.error_rate = float(setting('ERROR_RATE', '0'))
+        self.listings = int(setting('LISTINGS', '20'))
+        self.page_kb = int(setting('PAGE_KB', '150'))
+
+    def delay(self) -> float:
+        spread = self.latency_ms * self.jitter
+        return max(0.0, random.uniform(self.latency_ms - spread, self.latency_ms + spread)) / 1000
+
+    def describe(self) -> Dict:
+        return {
+            'latency_ms': self.latency_ms,
+            'jitter': self.jitter,
+            'error_rate': self.error_rate,
+            'listings': self.listings,
+            'page_kb': self.page_kb,
+        }
+
+
+def _conditions(profile: FakeProfile):
+    """Middleware adding latency and 503s; counts requests in app['stats']"""
+    @web.middleware
+    async def middleware(request, handler):
+        stats = request.app['stats']
+        stats['requests'] = stats.get('requests', 0) + 1
+        await asyncio.sleep(profile.delay())
+        if random.random() < profile.error_rate:
+            stats['errors'] = stats.get('errors', 0) + 1
+            return web.Response(status=503, text='Service Unavailable', headers={'Retry-After': '1'})
+        return await handler(request)
+    return middleware
+
+
+def _slug(name: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+def catalog_products(names: List[str]) -> List[Dict]:
+    """James Avery product records for charm names (stable across runs)"""
+    products = []
+    for i, name in enumerate(names):
+        rng = random.Random(name)
+        sku = f"CM-{1000 + i}"
+        products.append({
+            'name': name,
+            'sku': sku,
+            'path': f"/charms/{_slug(name)}/{sku}.html",
+            'price': float(rng.randint(28, 140)),
+            'material': rng.choice(METALS),
+            'retired': rng.random() < 0.1,
+            'lastmod': (datetime(2026, 1, 1) + timedelta(days=rng.randint(0, 180))).strftime('%Y-%m-%d'),
+        })
+    return products
+
+
+def _product_page(product: Dict, base_url: str, page_kb: int) -> str:
+    images = [f"{SCENE7}/{product['sku']}_{view}" for view in ('front', 'side', 'back')]
+    json_ld = json.dumps({
+        '@context': 'https://schema.org',
+        '@type': 'Product',
+        'name': product['name'],
+        'sku': product['sku'],
+        'material': product['material'],
+        'image': images,
+        'offers': {
+            'price': f"{product['price']:.2f}",
+            'priceCurrency': 'USD',
+            'availability': f"https://schema.org/{'Discontinued' if product['retired'] else 'InStock'}",
+        },
+    })
+    body = f"""<!DOCTYPE html>
+<html><head><title>{escape(product['name'])} | James Avery</title>
+<script type="application/ld+json">{json_ld}</script>
+<link rel="canonical" href="{base_url}{product['path']}">
+</head><body>
+<nav aria-label="Breadcrumb"><a href="/">Home</a><a href="/charms">Charms</a></nav>
+<div class="product-detail" data-product-id="{product['sku']}">
+<h1 class="product-name">{escape(product['name'])}</h1>
+<span class="price-sales">${product['price']:.2f}</span>
+<span class="product-sku">{product['sku']}</span>
+<div class="product-description">{escape(product['name'])} in {product['material']}, designed and handcrafted by James Avery.</div>
+{''.join(f'<img itemprop="image" src="{url}" alt="{escape(product["name"])}">' for url in images)}
+<button class="add-to-cart">Add to Bag</button>
+</div>
+"""
+    # Real pages are mostly navigation and scripts; pad to the configured size
+    filler = '<li class="nav-item"><a href="/charms/category">Category</a></li>\n'
+    padding = max(0, page_kb * 1024 - len(body)) // len(filler)
+    return body + '<ul class="site-navigation">\n' + filler * padding + '</ul>\n</body></html>'
+
+
+def create_james_avery_app(products: List[Dict], profile: Optional[FakeProfile] = None) -> web.Application:
+    """Sitemaps, search and product pages for `products`"""
+    profile = profile or FakeProfile('james_avery')
+    app = web.Application(middlewares=[_conditions(profile)])
+    app['stats'] = {'requests': 0, 'errors': 0, 'product_pages': 0, 'searches': 0}
+    by_path = {product['path']: product for product in products}
+
+    def base_url(request) -> str:
+        return f"{request.scheme}://{request.host}"
+
+    async def sitemap_index(request):
+        return web.Response(content_type='application/xml', text=(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            f'<sitemap><loc>{base_url(request)}/sitemap_0-product.xml</loc></sitemap>'
+            f'<sitemap><loc>{base_url(request)}/sitemap_1-content.xml</loc></sitemap>'
+            '</sitemapindex>'
+        ))
+
+    async def product_sitemap(request):
+        urls = ''.join(
+            f"<url><loc>{base_url(request)}{product['path']}</loc><lastmod>{product['lastmod']}</lastmod></url>"
+            for product in products
+        )
+        return web.Response(content_type='application/xml', text=(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+        ))
+
+    async def content_sitemap(request):
+        # Listed in the index so discovery has to pick the product sitemap
+        return web.Response(content_type='application/xml', text=(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"><url><loc>{base_url(request)}/stores</loc></url></urlset>'
+        ))
+
+    async def search(request):
+        request.app['stats']['searches'] += 1
+        query = request.query.get('q', '').lower()
+        matches = [product for product in products if query and query in product['name'].lower()]
+        matches.sort(key=lambda product: product['name'].lower() != query)
+        tiles = ''.join(
+            f'<div class="product-tile"><a class="product-tile__link" href="{product["path"]}">'
+            f'<img src="{SCENE7}/{product["sku"]}_front" alt="{escape(product["name"])}"></a>'
+            f'<h3 class="product-tile__name">{escape(product["name"])}</h3></div>'
+            for product in matches[:24]
+        )
+        return web.Response(content_type='text/html', text=f"<html><body><div class=\"search-results\">{tiles}</div></body></html>")
+
+    async def product_page(request):
+        product = by_path.get(request.path)
+        if product is None:
+            raise web.HTTPNotFound()
+        request.app['stats']['product_pages'] += 1
+        return web.Response(content_type='text/html', text=_product_page(product, base_url(request), profile.page_kb))
+
+    async def stats(request):
+        return web.json_response(request.app['stats'])
+
+    app.router.add_get('/sitemap_index.xml', sitemap_index)
+    app.router.add_get('/sitemap_0-product.xml', product_sitemap)
+    app.router.add_get('/sitemap_1-content.xml', content_sitemap)
+    app.router.add_get('/search', search)
+    app.router.add_get('/charms/{slug}/{sku}', product_page)
+    app.router.add_get('/stats', stats)
+    return app
+
+
+def _ebay_items(keywords: str, count: int, completed: bool) -> List[Dict]:
+    rng = random.Random(f"{keywords}|{completed}")
+    now = datetime.utcnow()
+    items = []
+    for i in range(count):
+        item_id = str(rng.randint(10**11, 10**12))
+        ends = now - timedelta(days=rng.uniform(0, 29)) if completed else now + timedelta(days=rng.uniform(1, 30))
+        items.append({
+            'itemId': [item_id],
+            'title': [f"{keywords} {'Retired' if i % 5 == 0 else 'Sterling Silver'} #{i}"],
+            'viewItemURL': [f"https://www.ebay.com/itm/{item_id}"],
+            'sellingStatus': [{'currentPrice': [{'@currencyId': 'USD', '__value__': f"{rng.uniform(20, 250):.2f}"}]}],
+            'condition': [{'conditionDisplayName': [rng.choice(['New', 'Pre-owned'])]}],
+            'sellerInfo': [{'sellerUserName': [f"seller{rng.randint(1, 9999)}"]}],
+            'listingInfo': [{
+                'listingType': [rng.choice(['FixedPrice', 'Auction'])],
+                'endTime': [ends.strftime('%Y-%m-%dT%H:%M:%S.000Z')],
+            }],
+            'shippingInfo': [{'shippingServiceCost': [{'@currencyId': 'USD', '__value__': f"{rng.choice([0, 4.5, 5.99]):.2f}"}]}],
+        })
+    return items
+
+
+def create_ebay_app(profile: Optional[FakeProfile] = None) -> web.Application:
+    """Finding API: findItemsAdvanced and findCompletedItems"""
+    profile = profile or FakeProfile('ebay')
+    app = web.Application(middlewares=[_conditions(profile)])
+    app['stats'] = {'requests': 0, 'errors': 0, 'searches': 0, 'completed_searches': 0}
+
+    async def finding(request):
+        operation = request.query.get('OPERATION-NAME', '')
+        keywords = request.query.get('keywords', 'James Avery charm')
+        if operation not in ('findItemsAdvanced', 'findCompletedItems'):
+            return web.json_response({'errorMessage': [{'error': [{'message': [f"Unknown operation {operation}"]}]}]}, status=400)
+        completed = operation == 'findCompletedItems'
+        request.app['stats']['completed_searches' if completed else 'searches'] += 1
+        items = _ebay_items(keywords, profile.listings, completed)
+        return web.json_response({f'{operation}Response': [{
+            'ack': ['Success'],
+            'searchResult': [{'@count': str(len(items)), 'item': items}],
+        }]})
+
+    async def stats(request):
+        return web.json_response(request.app['stats'])
+
+    app.router.add_get('/services/search/FindingService/v1', finding)
+    app.router.add_get('/stats', stats)
+    return app
+
+
+def create_etsy_app(profile: Optional[FakeProfile] = None) -> web.Application:
+    """Open API v3 active listing search"""
+    profile = profile or FakeProfile('etsy')
+    app = web.Application(middlewares=[_conditions(profile)])
+    app['stats'] = {'requests': 0, 'errors': 0, 'searches': 0}
+
+    async def active_listings(request):
+        request.app['stats']['searches'] += 1
+        keywords = request.query.get('keywords', 'james avery charm')
+        limit = min(int(request.query.get('limit', '25')), profile.listings)
+        offset = int(request.query.get('offset', '0'))
+        rng = random.Random(f"{keywords}|{offset}")
+        results = [
+            {
+                'listing_id': rng.randint(10**8, 10**9),
+                'title': f"{keywords.title()} {'Vintage' if i % 4 == 0 else 'Sterling Silver'} #{offset + i}",
+                'price': {'amount': rng.randint(1800, 22000), 'divisor': 100, 'currency_code': 'USD'},
+                'images': [{'url_570xN': f"https://i.etsystatic.com/fake/{offset + i}.jpg"}],
+                'shop': {'shop_name': f"shop{rng.randint(1, 999)}"},
+            }
+            for i in range(limit)
+        ]
+        return web.json_response({'count': len(results) * 5, 'results': results})
+
+    async def stats(request):
+        return web.json_response(request.app['stats'])
+
+    app.router.add_get('/v3/application/listings/active', active_listings)
+    app.router.add_get('/stats', stats)
+    return app
+
+
+def create_apify_app(profile: Optional[FakeProfile] = None) -> web.Application:
+    """fake_apify_server's app with the shared latency and error settings"""
+    app = fake_apify_server.create_app()
+    app.middlewares.append(_conditions(profile or FakeProfile('apify')))
+    app['stats'].update({'requests': 0, 'errors': 0})
+    return app
+
+
+def create_apps(charm_names: List[str]) -> Dict[str, web.Application]:
+    return {
+        'james_avery': create_james_avery_app(catalog_products(charm_names)),
+        'ebay': create_ebay_app(),
+        'etsy': create_etsy_app(),
+        'apify': create_apify_app(),
+    }
+
+
+def marketplace_env(host: str = FAKE_HOST, ports: Dict[str, int] = FAKE_PORTS) -> Dict[str, str]:
+    """Settings that point the scrapers at the fakes (with placeholder credentials)"""
+    return {
+        'JAMES_AVERY_BASE_URL': f"http://{host}:{ports['james_avery']}",
+        'EBAY_FINDING_URL': f"http://{host}:{ports['ebay']}/services/search/FindingService/v1",
+        'ETSY_API_BASE_URL': f"http://{host}:{ports['etsy']}/v3",
+        'APIFY_BASE_URL': f"http://{host}:{ports['apify']}/v2",
+        'EBAY_APP_ID': 'fake-app-id',
+        'EBAY_CERT_ID': 'fake-cert-id',
+        'EBAY_DEV_ID': 'fake-dev-id',
+        'ETSY_API_KEY': 'fake-etsy-key',
+        'APIFY_API_TOKEN': 'fake-token',
+    }
+
+
+async def start_fake_marketplaces(
+    charm_names: List[str],
+    host: str = FAKE_HOST,
+    ports: Dict[str, int] = FAKE_PORTS
+) -> Dict[str, Tuple[web.AppRunner, web.Application]]:
+    """Serve every fake in the running event loop; call runner.cleanup() on each to stop"""
+    servers = {}
+    try:
+        for name, app in create_apps(charm_names).items():
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            await web.TCPSite(runner, host, ports[name]).start()
+            servers[name] = (runner, app)
+    except BaseException:
+        for runner, _ in servers.values():
+            await runner.cleanup()
+        raise
+    return servers
+
+
+async def _serve_forever():
+    from seed import SAMPLE_CHARMS
+
+    servers = await start_fake_marketplaces([charm['name'] for charm in SAMPLE_CHARMS])
+    print("🧪 Fake marketplaces running; point the backend at them with:\n")
+    for name, value in marketplace_env().items():
+        print(f"   {name}={value}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        for runner, _ in servers.values():
+            await runner.cleanup()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(_serve_forever())
+    except KeyboardInterrupt:
+        pass
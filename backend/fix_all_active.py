@@ -7,6 +7,7 @@ import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
+from services.detail_renderer import invalidate_rendered_detail
 
 load_dotenv()
 
@@ -30,7 +31,7 @@ async def fix_status():
             "price_change_7d": 0.0,
             "price_change_30d": 0.0,
             "price_change_90d": 0.0
-        }}
+        }, **invalidate_rendered_detail()}
     )
     
     print(f"\n✅ Updated {result.modified_count} charm(s)")
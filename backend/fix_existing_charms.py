@@ -5,6 +5,7 @@ import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
+from services.detail_renderer import invalidate_rendered_detail
 
 load_dotenv()
 
@@ -25,7 +26,7 @@ async def fix_charms():
             'price_change_30d': 0.0,
             'price_change_90d': 0.0,
             'popularity': 75
-        }}
+        }, **invalidate_rendered_detail()}
     )
     
     print(f"✅ Updated {result.modified_count} charms with missing fields")
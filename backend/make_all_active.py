@@ -2,6 +2,7 @@ import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
+from services.detail_renderer import invalidate_rendered_detail
 from datetime import datetime
 import logging
 import sys
@@ -57,7 +58,7 @@ async def fix_all():
                 'price_change_7d': charm.get('price_change_7d', 0.0),
                 'price_change_30d': charm.get('price_change_30d', 0.0),
                 'price_change_90d': charm.get('price_change_90d', 0.0)
-            }}
+            }, **invalidate_rendered_detail()}
         )
         print(f"  ✅ Updated to Active")
         print()
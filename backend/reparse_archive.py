@@ -0,0 +1,149 @@
+"""
+Re-parse archived pages after a parser fix
+Reads a slice of the raw page archive (scrapers/page_archive.py), parses it
+again on every core and bulk-writes the catalog fields that changed, so a
+selector fix needs CPU minutes instead of a rate-limited re-crawl.
+
+Usage:
+    python reparse_archive.py                          # latest copy of every James Avery product page
+    python reparse_archive.py --since 2026-01-01 --url-contains cross
+    python reparse_archive.py --source ebay --dry-run  # eBay search pages: parse and report only
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scrapers.page_archive import page_archive, read_frame
+from scrapers.james_avery_scraper import PRODUCT_URL_PATTERN, catalog_fields, parse_product_page
+from services.catalog_snapshot import publish_snapshot
+from services.detail_renderer import refresh_rendered_detail
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WRITE_BATCH_SIZE = 200
+
+
+def reparse_page(job):
+    """Worker: decompress and parse one archived page -> (url, result or None)"""
+    url, source, path, offset, length = job
+    html = read_frame(path, offset, length).decode('utf-8', 'replace')
+    if source == 'james_avery':
+        parsed = parse_product_page((url, html))
+        return url, catalog_fields(*parsed) if parsed else None
+    if source == 'ebay':
+        from scrapers.ebay_scraper import EbayScraper
+        listings = EbayScraper()._parse_html_response(html, 1000)
+        return url, {'listings': len(listings)}
+    return url, None
+
+
+async def write_changes(db, results, dry_run: bool) -> Counter:
+    """Bulk-write catalog fields that differ from what is stored; counts changes per field"""
+    field_changes = Counter()
+    changed = 0
+    for start in range(0, len(results), WRITE_BATCH_SIZE):
+        batch = dict(results[start:start + WRITE_BATCH_SIZE])
+        ops = []
+        projection = {field: 1 for field in ['id', 'url', *next(iter(batch.values()))]}
+        batch_ids = []
+        async for doc in db.charms.find({'url': {'$in': list(batch)}}, projection):
+            fields = batch[doc['url']]
+            changes = {name: value for name, value in fields.items() if doc.get(name) != value}
+            if not changes:
+                continue
+            field_changes.update(changes.keys())
+            batch_ids.append(doc.get('id'))
+            ops.append(UpdateOne({'_id': doc['_id']}, {'$set': {**changes, 'last_updated': datetime.utcnow()}}))
+        changed += len(batch_ids)
+        if ops and not dry_run:
+            await db.charms.bulk_write(ops, ordered=False)
+            await asyncio.gather(*(refresh_rendered_detail(db, charm_id) for charm_id in batch_ids))
+
+    if changed and not dry_run:
+        await publish_snapshot(db)
+    field_changes['documents'] = changed
+    return field_changes
+
+
+async def reparse(args):
+    if not page_archive.enabled:
+        print("❌ Page archive disabled: set PAGE_ARCHIVE_DIR and install zstandard")
+        return
+
+    refs = page_archive.select(
+        source=args.source,
+        since=datetime.fromisoformat(args.since) if args.since else None,
+        until=datetime.fromisoformat(args.until) if args.until else None,
+        url_contains=args.url_contains,
+        latest_only=not args.all_versions
+    )
+    if args.source == 'james_avery':
+        refs = [ref for ref in refs if PRODUCT_URL_PATTERN.search(ref['url'].split('?')[0])]
+
+    print("=" * 70)
+    print(f"RE-PARSING {len(refs)} ARCHIVED {args.source.upper()} PAGES ({args.workers} workers)")
+    print("=" * 70)
+    if not refs:
+        return
+
+    started = time.perf_counter()
+    jobs = [(ref['url'], ref['source'], ref['path'], ref['offset'], ref['length']) for ref in refs]
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        parsed = list(pool.map(reparse_page, jobs, chunksize=max(1, len(jobs) // (args.workers * 8))))
+    parse_seconds = time.perf_counter() - started
+
+    results = [(url, result) for url, result in parsed if result]
+    print(f"\n✅ Parsed {len(results)}/{len(jobs)} pages in {parse_seconds:.1f}s "
+          f"({len(jobs) / parse_seconds:.0f} pages/s)")
+
+    if args.source != 'james_avery':
+        listings = sum(result['listings'] for _, result in results)
+        print(f"📊 {listings} listings found ({listings / max(len(results), 1):.1f} per page)")
+        return
+
+    mongo_uri = os.getenv('MONGO_URL') or os.getenv('MONGO_URI')
+    client = AsyncIOMotorClient(mongo_uri)
+    db = client[os.getenv('DB_NAME', 'charmstracker')]
+    try:
+        changes = await write_changes(db, results, args.dry_run)
+    finally:
+        client.close()
+
+    verb = "Would update" if args.dry_run else "Updated"
+    print(f"✏️  {verb} {changes.pop('documents')} charms")
+    for field, count in changes.most_common():
+        print(f"   {field}: {count}")
+    print(f"⏱️  Total {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-parse archived pages and backfill corrected fields")
+    parser.add_argument('--source', default='james_avery', choices=['james_avery', 'ebay'])
+    parser.add_argument('--since', help="ISO date/time, inclusive")
+    parser.add_argument('--until', help="ISO date/time, exclusive")
+    parser.add_argument('--url-contains', help="Only URLs containing this text")
+    parser.add_argument('--all-versions', action='store_true', help="Every archived copy, not just the latest per URL")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--dry-run', action='store_true', help="Report changes without writing")
+    asyncio.run(reparse(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
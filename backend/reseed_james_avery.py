@@ -18,6 +18,7 @@ import random
 # Import scrapers
 from scrapers.james_avery_scraper import james_avery_scraper
 from scrapers.ebay_scraper import ebay_scraper
+from services.detail_renderer import invalidate_rendered_detail
 
 load_dotenv()
 
@@ -258,7 +259,7 @@ async def reseed_database():
             
             await db.charms.update_one(
                 {'id': charm['id']},
-                {'$set': {'related_charm_ids': related_ids}}
+                {'$set': {'related_charm_ids': related_ids}, **invalidate_rendered_detail()}
             )
     
     print("✅ Related charm relationships added")
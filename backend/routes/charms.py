@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, Response
 from typing import Optional, List
 from models.charm import (
     Charm,
@@ -6,6 +6,18 @@ from models.charm import (
     CharmResponse,
     CharmListResponse,
     MarketOverview,
+    PriceHistoryEntry,
+)
+from services.catalog_engine import catalog_engine
+from services.catalog_snapshot import snapshot_reader
+from services.downsampling import HISTORY_RANGES, history_cache
+from services.detail_renderer import (
+    RENDERED_FIELDS,
+    RENDERED_PROJECTION,
+    build_charm_response,
+    is_current,
+    refresh_rendered_detail,
+    store_rendered_detail,
 )
 from datetime import datetime
 import logging
@@ -34,6 +46,24 @@ async def get_all_charms(
     """Get all charms with filtering, sorting, and search"""
     try:
         db = get_database()
+
+        # Serve from the in-memory catalog when it is loaded
+        if catalog_engine.ready:
+            if snapshot_reader.enabled:
+                snapshot_reader.maybe_refresh(catalog_engine)
+            elif catalog_engine.is_stale():
+                catalog_engine.reload_in_background(db)
+            return catalog_engine.query(
+                sort=sort,
+                material=material,
+                status=status,
+                min_price=min_price,
+                max_price=max_price,
+                page=page,
+                limit=limit,
+                search=search,
+            )
+
         # Build filter query
         filter_query = {}
         
@@ -69,7 +99,7 @@ async def get_all_charms(
 
         # Get paginated results
         skip = (page - 1) * limit
-        cursor = db.charms.find(filter_query).sort(list(sort_query.items())).skip(skip).limit(limit)
+        cursor = db.charms.find(filter_query, {field: 0 for field in RENDERED_FIELDS}).sort(list(sort_query.items())).skip(skip).limit(limit)
         charms = await cursor.to_list(length=limit)
 
         # Format response
@@ -101,33 +131,106 @@ async def get_all_charms(
         raise HTTPException(status_code=500, detail=f"Error fetching charms: {str(e)}")
 
 
+HISTORY_RANGE_PATTERN = "^(" + "|".join(HISTORY_RANGES) + ")$"
+
+
+def _select_history(charm: dict, points: Optional[int], range_key: Optional[str]) -> list:
+    """Return the charm's price history, downsampled when requested"""
+    price_history = charm.get("price_history", [])
+    if not points and not range_key:
+        return price_history
+    return history_cache.get_or_compute(
+        charm["id"],
+        charm.get("last_updated"),
+        price_history,
+        points,
+        range_key,
+    )
+
+
+@router.get("/{charm_id}/history", response_model=dict)
+async def get_charm_history(
+    charm_id: str,
+    points: Optional[int] = Query(None, ge=3, le=5000),
+    history_range: Optional[str] = Query(None, alias="range", regex=HISTORY_RANGE_PATTERN),
+):
+    """Get a charm's price history, optionally downsampled for charting"""
+    try:
+        db = get_database()
+        charm = await db.charms.find_one(
+            {"id": charm_id},
+            {"_id": 0, "id": 1, "last_updated": 1, "price_history": 1},
+        )
+        if not charm:
+            raise HTTPException(status_code=404, detail="Charm not found")
+
+        history = _select_history(charm, points, history_range)
+
+        return {
+            "charm_id": charm_id,
+            "price_history": [PriceHistoryEntry(**entry).dict() for entry in history],
+            "total_points": len(charm.get("price_history", [])),
+            "returned_points": len(history),
+            "range": history_range or "all",
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching history for {charm_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error fetching history: {str(e)}")
+
+
+def _rendered_response(request: Request, rendered: dict) -> Response:
+    """Stream a pre-rendered detail payload"""
+    gzipped = bool(rendered.get("detail_gzip")) and "gzip" in request.headers.get("accept-encoding", "")
+    # Each representation gets its own strong tag
+    etag = f'"{rendered["detail_version"]}{"-gz" if gzipped else ""}"'
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    body = rendered["detail_json"]
+    if gzipped:
+        body = rendered["detail_gzip"]
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @router.get("/{charm_id}", response_model=CharmResponse)
-async def get_charm_by_id(charm_id: str):
+async def get_charm_by_id(
+    request: Request,
+    charm_id: str,
+    points: Optional[int] = Query(None, ge=3, le=5000),
+    history_range: Optional[str] = Query(None, alias="range", regex=HISTORY_RANGE_PATTERN),
+):
     """Get detailed charm information"""
     try:
         db = get_database()
-        charm = await db.charms.find_one({"id": charm_id})
+        full_history = not points and not history_range
+
+        # Fast path: bytes rendered when the charm was last written
+        if full_history:
+            rendered = await db.charms.find_one({"id": charm_id}, RENDERED_PROJECTION)
+            if not rendered:
+                raise HTTPException(status_code=404, detail="Charm not found")
+            if is_current(rendered):
+                return _rendered_response(request, rendered)
+
+        charm = await db.charms.find_one(
+            {"id": charm_id},
+            {field: 0 for field in RENDERED_FIELDS},
+        )
         if not charm:
             raise HTTPException(status_code=404, detail="Charm not found")
 
-        return CharmResponse(
-            id=charm["id"],
-            name=charm["name"],
-            description=charm["description"],
-            material=charm["material"],
-            status=charm["status"],
-            is_retired=charm["is_retired"],
-            avg_price=charm["avg_price"],
-            price_change_7d=charm["price_change_7d"],
-            price_change_30d=charm["price_change_30d"],
-            price_change_90d=charm["price_change_90d"],
-            popularity=charm["popularity"],
-            images=charm["images"],
-            listings=charm.get("listings", []),
-            price_history=charm.get("price_history", []),
-            related_charm_ids=charm.get("related_charm_ids", []),
-            last_updated=charm["last_updated"],
-        )
+        if full_history:
+            # Missing or stale rendering - rebuild it for the next reader
+            rendered = await store_rendered_detail(db, charm)
+            if rendered:
+                return _rendered_response(request, rendered)
+
+        return build_charm_response(charm, _select_history(charm, points, history_range))
 
     except HTTPException:
         raise
@@ -151,6 +254,8 @@ async def create_charm(charm: CharmCreate):
         result = await db.charms.insert_one(charm_dict)
         if result.inserted_id:
             created_charm = await db.charms.find_one({"_id": result.inserted_id})
+            catalog_engine.upsert(created_charm)
+            await refresh_rendered_detail(db, created_charm["id"])
             return CharmResponse(**created_charm)
         else:
             raise HTTPException(status_code=500, detail="Failed to create charm")
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException
 from models.charm import MarketOverview
+from services.detail_renderer import RENDERED_FIELDS
 from datetime import datetime
 import logging
 
@@ -20,7 +21,7 @@ async def get_trending_charms():
         db = get_database()
         # Get top 6 charms sorted by popularity and positive price change
         cursor = (
-            db.charms.find({})
+            db.charms.find({}, {field: 0 for field in RENDERED_FIELDS})
             .sort([("popularity", -1), ("price_change_7d", -1)])
             .limit(6)
         )
@@ -52,7 +53,7 @@ async def get_market_overview():
     try:
         db = get_database()
         # Get all charms for calculations
-        all_charms = await db.charms.find({}).to_list(length=1000)
+        all_charms = await db.charms.find({}, {field: 0 for field in RENDERED_FIELDS}).to_list(length=1000)
 
         if not all_charms:
             return MarketOverview(
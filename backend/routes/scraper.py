@@ -9,6 +9,17 @@ from datetime import datetime
 import logging
 
 from services.data_aggregator import DataAggregator
+from services.catalog_engine import catalog_engine
+from services.detail_renderer import refresh_rendered_detail
+from scrapers.rate_limiter import limiter_stats
+from scrapers.hedging import hedging_stats
+from scrapers.circuit_breaker import breaker_stats
+from scrapers.search_cache import search_cache
+from scrapers.product_resolver import ja_products
+from scrapers.page_archive import page_archive
+from scrapers.scraperapi_client import scraperapi_credits
+from services.singleflight import charm_updates, marketplace_searches
+from services.pipeline import pipeline_stats
 
 logger = logging.getLogger(__name__)
 
@@ -43,6 +54,14 @@ async def update_charm(
     Runs in background to avoid blocking
     """
     try:
+        # Repeated clicks join the update already running for this charm
+        if charm_updates.in_flight(charm_id):
+            return {
+                "message": f"Update already in progress for charm {charm_id}",
+                "status": "processing",
+                "charm_id": charm_id
+            }
+        
         # Run update in background
         aggregator = get_aggregator()
         background_tasks.add_task(aggregator.update_charm_data, charm_id)
@@ -82,6 +101,32 @@ async def update_all_charms(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/recalculate-price-changes")
+async def recalculate_price_changes():
+    """
+    Recalculate 7/30/90-day price changes for all charms
+    Uses stored price history only - no scraping
+    """
+    try:
+        aggregator = get_aggregator()
+        stats = await aggregator.recalculate_price_changes()
+        
+        if stats.get('error'):
+            raise HTTPException(status_code=500, detail=stats['error'])
+        
+        return {
+            "message": "Price changes recalculated",
+            "status": "completed",
+            **stats
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error recalculating price changes: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/status")
 async def get_scraper_status():
     """Get status of scraper service and scheduler"""
@@ -109,6 +154,11 @@ async def get_scraper_status():
         scheduler_status = {
             "running": scheduler.running if scheduler else False,
             "update_interval_hours": scheduler.update_interval_hours if scheduler else None,
+            "refresh_queue_size": len(scheduler.refresh_queue) if scheduler else 0,
+            "next_refresh_due": (
+                scheduler.refresh_queue.next_due().isoformat()
+                if scheduler and scheduler.refresh_queue.next_due() else None
+            ),
             "scraper_interval_hours": 6 if scheduler else None,
             "next_auto_scrape": "Every 6 hours" if (scheduler and scheduler.running) else "Not scheduled"
         }
@@ -118,6 +168,18 @@ async def get_scraper_status():
             "total_charms": total_charms,
             "updated_last_24h": recent_count,
             "scheduler": scheduler_status,
+            "rate_limits": limiter_stats(),
+            "latency": hedging_stats(),
+            "circuit_breakers": breaker_stats(),
+            "search_cache": search_cache.stats(),
+            "ja_resolutions": ja_products.stats(),
+            "page_archive": page_archive.stats(),
+            "scraperapi_credits": scraperapi_credits.stats(),
+            "pipelines": pipeline_stats(),
+            "coalescing": {
+                "charm_updates": charm_updates.stats(),
+                "marketplace_searches": marketplace_searches.stats(),
+            },
             "recent_updates": [
                 {
                     "id": charm["id"],
@@ -228,7 +290,7 @@ async def fetch_live_prices(charm_id: str):
     Updates the database with fresh marketplace data
     """
     try:
-        from scrapers.scraperapi_client import ScraperAPIClient
+        from scrapers.scraperapi_client import scraperapi_client
         
         # Get charm from database
         db = get_database()
@@ -240,13 +302,12 @@ async def fetch_live_prices(charm_id: str):
         charm_name = charm.get('name', '')
         logger.info(f"📡 Fetching live prices with ScraperAPI for: {charm_name}")
         
-        # Use ScraperAPI client (runs synchronously in thread)
-        import asyncio
-        scraper = ScraperAPIClient()
-        
-        # Run in executor to avoid blocking
-        loop = asyncio.get_event_loop()
-        all_listings = await loop.run_in_executor(None, scraper.scrape_all, f"James Avery {charm_name}")
+        # Repeated fetches within the TTL cost no credits
+        query = f"James Avery {charm_name}"
+        hit, all_listings = await search_cache.get('scraperapi', query)
+        if not hit:
+            all_listings = await scraperapi_client.scrape_all(query)
+            await search_cache.put('scraperapi', query, all_listings)
         
         # Organize by platform
         etsy_listings = [l for l in all_listings if l.get('platform') == 'etsy']
@@ -278,6 +339,8 @@ async def fetch_live_prices(charm_id: str):
             {"_id": charm_id},
             {"$set": update_data}
         )
+        await catalog_engine.refresh_charm(db, charm.get('id'))
+        await refresh_rendered_detail(db, charm.get('id'))
         
         logger.info(f"✅ Updated {charm_name}: {len(all_listings)} listings, avg ${average_price:.2f}")
         
@@ -3,56 +3,58 @@ AgentQL Scraper - AI-powered web scraping that bypasses bot detection
 Uses natural language queries to extract data from marketplace pages
 """
 import agentql
-from playwright.sync_api import sync_playwright
+import asyncio
 import os
 from dotenv import load_dotenv
-import time
+
+from .browser_pool import BrowserPool, browser_pool
 
 load_dotenv()
 
+# Selectors that show search results have rendered, per marketplace
+RESULT_SELECTORS = {
+    'etsy': '[data-listing-id], .v2-listing-card',
+    'ebay': '.s-item, .srp-results',
+    'poshmark': '[data-et-name="listing"], .card--small, .tile',
+}
+RESULT_WAIT_MS = int(os.getenv('AGENTQL_RESULT_WAIT_MS', '10000'))
+
 class AgentQLMarketplaceScraper:
-    def __init__(self, headless=True):
+    def __init__(self, headless=True, pool=None):
         self.api_key = os.getenv('AGENTQL_API_KEY')
         if not self.api_key:
             raise ValueError("❌ AGENTQL_API_KEY not found in .env file")
         
         self.headless = headless
+        # Headless scrapers share the process-wide pool; a visible browser gets its own
+        self.pool = pool or (browser_pool if headless else BrowserPool(size=1, headless=False))
         print(f"🤖 [AGENTQL] Initialized with API key: {self.api_key[:20]}... (headless={headless})")
     
-    def scrape_etsy(self, charm_name):
+    async def _wait_for_results(self, page, platform):
+        """Wait until the result list renders instead of sleeping a fixed time"""
+        try:
+            await page.wait_for_selector(RESULT_SELECTORS[platform], timeout=RESULT_WAIT_MS)
+        except Exception:
+            # AgentQL queries the page as-is; a missing selector is not fatal
+            print(f"⚠️ [{platform.upper()}] Results selector not seen after {RESULT_WAIT_MS}ms")
+    
+    async def scrape_etsy(self, charm_name):
         """Scrape Etsy using AgentQL's AI-powered queries"""
         print(f"🎨 [ETSY-AGENTQL] Scraping Etsy for: {charm_name}")
         
-        with sync_playwright() as playwright:
-            try:
-                # Launch browser with stealth settings
-                browser = playwright.chromium.launch(
-                    headless=self.headless,
-                    args=[
-                        '--disable-blink-features=AutomationControlled',
-                        '--disable-dev-shm-usage',
-                        '--no-sandbox'
-                    ]
-                )
-                context = browser.new_context(
-                    viewport={'width': 1920, 'height': 1080},
-                    user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                )
-                
-                # Wrap page with AgentQL
-                page = agentql.wrap(context.new_page())
+        try:
+            async with self.pool.page() as browser_page:
+                page = await agentql.wrap_async(browser_page)
                 
                 # Navigate to Etsy search
                 url = f"https://www.etsy.com/search?q={charm_name.replace(' ', '+')}"
                 print(f"🔗 [ETSY] Navigating to: {url}")
-                page.goto(url, wait_until="load", timeout=60000)
-                
-                # Wait a bit for JavaScript to render
-                time.sleep(4)
+                await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+                await self._wait_for_results(browser_page, 'etsy')
                 
                 # Take screenshot for debugging (only if visible)
                 if not self.headless:
-                    page.screenshot(path="etsy_agentql_debug.png")
+                    await page.screenshot(path="etsy_agentql_debug.png")
                     print("📸 [ETSY] Screenshot saved")
                 
                 # Try Etsy-specific query first
@@ -70,7 +72,7 @@ class AgentQLMarketplaceScraper:
                 """
                 
                 print("🔍 [ETSY] Querying page with Etsy-specific selectors...")
-                response = page.query_data(ETSY_QUERY)
+                response = await page.query_data(ETSY_QUERY)
                 
                 # If first query fails, try generic query
                 if not response or 'search_results' not in response or not response.get('search_results'):
@@ -86,7 +88,7 @@ class AgentQLMarketplaceScraper:
                         }
                     }
                     """
-                    response = page.query_data(GENERIC_QUERY)
+                    response = await page.query_data(GENERIC_QUERY)
                 
                 # Check which field structure we got back
                 products = []
@@ -99,7 +101,6 @@ class AgentQLMarketplaceScraper:
                 else:
                     print("⚠️ [ETSY] No products found in response")
                     print(f"Response keys: {list(response.keys()) if response else 'None'}")
-                    browser.close()
                     return []
                 
                 print(f"✅ [ETSY] Found {len(products)} products")
@@ -166,53 +167,35 @@ class AgentQLMarketplaceScraper:
                         traceback.print_exc()
                         continue
                 
-                context.close()
-                browser.close()
                 return listings
                 
-            except Exception as e:
-                print(f"❌ [ETSY] AgentQL error: {e}")
-                import traceback
-                traceback.print_exc()
-                return []
+        except Exception as e:
+            print(f"❌ [ETSY] AgentQL error: {e}")
+            import traceback
+            traceback.print_exc()
+            return []
     
-    def scrape_ebay(self, charm_name):
+    async def scrape_ebay(self, charm_name):
         """Scrape eBay using AgentQL's AI-powered queries"""
         print(f"🛒 [EBAY-AGENTQL] Scraping eBay for: {charm_name}")
         
-        with sync_playwright() as playwright:
-            try:
-                browser = playwright.chromium.launch(
-                    headless=self.headless,
-                    args=[
-                        '--disable-blink-features=AutomationControlled',
-                        '--disable-dev-shm-usage',
-                        '--no-sandbox'
-                    ]
-                )
-                context = browser.new_context(
-                    viewport={'width': 1920, 'height': 1080},
-                    user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                )
-                
-                page = agentql.wrap(context.new_page())
+        try:
+            async with self.pool.page() as browser_page:
+                page = await agentql.wrap_async(browser_page)
                 
                 url = f"https://www.ebay.com/sch/i.html?_nkw={charm_name.replace(' ', '+')}&_sop=12"
                 print(f"🔗 [EBAY] Navigating to: {url}")
-                page.goto(url, wait_until="load", timeout=60000)
-                
-                time.sleep(3)
+                await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+                await self._wait_for_results(browser_page, 'ebay')
                 
                 if not self.headless:
-                    page.screenshot(path="ebay_agentql_debug.png")
+                    await page.screenshot(path="ebay_agentql_debug.png")
                     print("📸 [EBAY] Screenshot saved")
                 
                 # Check for bot detection
-                html = page.content()
+                html = await page.content()
                 if 'interrupt' in html.lower() or 'captcha' in html.lower() or 'challenge' in html.lower():
                     print("❌ [EBAY] Bot detection triggered even with AgentQL")
-                    context.close()
-                    browser.close()
                     return []
                 
                 QUERY = """
@@ -229,12 +212,10 @@ class AgentQLMarketplaceScraper:
                 """
                 
                 print("🔍 [EBAY] Querying page with AgentQL...")
-                response = page.query_data(QUERY)
+                response = await page.query_data(QUERY)
                 
                 if not response or 'items' not in response:
                     print("⚠️ [EBAY] No items found in response")
-                    context.close()
-                    browser.close()
                     return []
                 
                 items = response['items']
@@ -261,45 +242,29 @@ class AgentQLMarketplaceScraper:
                         print(f"  ⚠️ Error parsing item: {e}")
                         continue
                 
-                context.close()
-                browser.close()
                 return listings
                 
-            except Exception as e:
-                print(f"❌ [EBAY] AgentQL error: {e}")
-                import traceback
-                traceback.print_exc()
-                return []
+        except Exception as e:
+            print(f"❌ [EBAY] AgentQL error: {e}")
+            import traceback
+            traceback.print_exc()
+            return []
     
-    def scrape_poshmark(self, charm_name):
+    async def scrape_poshmark(self, charm_name):
         """Scrape Poshmark using AgentQL's AI-powered queries"""
         print(f"👗 [POSHMARK-AGENTQL] Scraping Poshmark for: {charm_name}")
         
-        with sync_playwright() as playwright:
-            try:
-                browser = playwright.chromium.launch(
-                    headless=self.headless,
-                    args=[
-                        '--disable-blink-features=AutomationControlled',
-                        '--disable-dev-shm-usage',
-                        '--no-sandbox'
-                    ]
-                )
-                context = browser.new_context(
-                    viewport={'width': 1920, 'height': 1080},
-                    user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                )
-                
-                page = agentql.wrap(context.new_page())
+        try:
+            async with self.pool.page() as browser_page:
+                page = await agentql.wrap_async(browser_page)
                 
                 url = f"https://poshmark.com/search?query={charm_name.replace(' ', '+')}"
                 print(f"🔗 [POSHMARK] Navigating to: {url}")
-                page.goto(url, wait_until="load", timeout=60000)
-                
-                time.sleep(3)
+                await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+                await self._wait_for_results(browser_page, 'poshmark')
                 
                 if not self.headless:
-                    page.screenshot(path="poshmark_agentql_debug.png")
+                    await page.screenshot(path="poshmark_agentql_debug.png")
                     print("📸 [POSHMARK] Screenshot saved")
                 
                 QUERY = """
@@ -316,12 +281,10 @@ class AgentQLMarketplaceScraper:
                 """
                 
                 print("🔍 [POSHMARK] Querying page with AgentQL...")
-                response = page.query_data(QUERY)
+                response = await page.query_data(QUERY)
                 
                 if not response or 'listings' not in response:
                     print("⚠️ [POSHMARK] No listings found in response")
-                    context.close()
-                    browser.close()
                     return []
                 
                 listings_data = response['listings']
@@ -348,48 +311,41 @@ class AgentQLMarketplaceScraper:
                         print(f"  ⚠️ Error parsing listing: {e}")
                         continue
                 
-                context.close()
-                browser.close()
                 return listings
                 
-            except Exception as e:
-                print(f"❌ [POSHMARK] AgentQL error: {e}")
-                import traceback
-                traceback.print_exc()
-                return []
+        except Exception as e:
+            print(f"❌ [POSHMARK] AgentQL error: {e}")
+            import traceback
+            traceback.print_exc()
+            return []
     
-    def scrape_all(self, charm_name):
-        """Scrape all marketplaces with AgentQL"""
+    async def scrape_all(self, charm_name):
+        """Scrape all marketplaces with AgentQL, each in its own pooled page"""
         print(f"\n🤖 [AGENTQL] Starting AI-powered scraping for: {charm_name}\n")
         
-        all_listings = []
-        
-        # Scrape Etsy
-        etsy_listings = self.scrape_etsy(charm_name)
-        all_listings.extend(etsy_listings)
-        print(f"\n✅ [ETSY] Collected {len(etsy_listings)} listings\n")
-        
-        # Scrape eBay
-        ebay_listings = self.scrape_ebay(charm_name)
-        all_listings.extend(ebay_listings)
-        print(f"\n✅ [EBAY] Collected {len(ebay_listings)} listings\n")
+        etsy_listings, ebay_listings, poshmark_listings = await asyncio.gather(
+            self.scrape_etsy(charm_name),
+            self.scrape_ebay(charm_name),
+            self.scrape_poshmark(charm_name),
+        )
+        print(f"\n✅ [ETSY] Collected {len(etsy_listings)} listings")
+        print(f"✅ [EBAY] Collected {len(ebay_listings)} listings")
+        print(f"✅ [POSHMARK] Collected {len(poshmark_listings)} listings\n")
         
-        # Scrape Poshmark
-        poshmark_listings = self.scrape_poshmark(charm_name)
-        all_listings.extend(poshmark_listings)
-        print(f"\n✅ [POSHMARK] Collected {len(poshmark_listings)} listings\n")
+        all_listings = etsy_listings + ebay_listings + poshmark_listings
         
         print(f"\n📊 [AGENTQL] TOTAL: {len(all_listings)} listings from all platforms\n")
         return all_listings
 
 
-def test_agentql_scraper():
+async def test_agentql_scraper():
     """Test the AgentQL scraper"""
     print("🧪 Testing AgentQL Scraper...\n")
     
     # Use headless=False for testing so you can see browsers
     scraper = AgentQLMarketplaceScraper(headless=False)
-    results = scraper.scrape_all("West Virginia charm")
+    results = await scraper.scrape_all("West Virginia charm")
+    await scraper.pool.close()
     
     print(f"\n{'='*60}")
     print(f"📊 FINAL RESULTS: {len(results)} total listings")
@@ -402,4 +358,4 @@ def test_agentql_scraper():
 
 
 if __name__ == "__main__":
-    test_agentql_scraper()
+    asyncio.run(test_agentql_scraper())
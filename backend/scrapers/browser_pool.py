@@ -0,0 +1,186 @@
+"""
+Browser Pool for CharmTracker
+Long-lived Playwright Chromium instances shared by the browser-based scrapers.
+Each browser keeps one context (cookies survive between searches) and serves a
+bounded number of pages at a time; images, fonts and trackers are never fetched.
+"""
+
+import asyncio
+import logging
+import os
+import re
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+from playwright.async_api import async_playwright
+
+logger = logging.getLogger(__name__)
+
+BROWSER_POOL_SIZE = int(os.getenv('BROWSER_POOL_SIZE', '1'))
+BROWSER_MAX_PAGES = int(os.getenv('BROWSER_MAX_PAGES', '4'))
+# Relaunch a browser after this many pages to keep its memory in check
+BROWSER_RECYCLE_PAGES = int(os.getenv('BROWSER_RECYCLE_PAGES', '200'))
+BLOCKED_RESOURCE_TYPES = {
+    t.strip() for t in os.getenv('BROWSER_BLOCK_RESOURCES', 'image,font,media').split(',') if t.strip()
+}
+TRACKER_PATTERN = re.compile(
+    r'google-analytics|googletagmanager|doubleclick|facebook\.net|hotjar|'
+    r'segment\.(io|com)|criteo|taboola|scorecardresearch|bat\.bing\.com|px\.ads'
+)
+
+LAUNCH_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--disable-dev-shm-usage',
+    '--no-sandbox'
+]
+CONTEXT_OPTIONS = {
+    'viewport': {'width': 1920, 'height': 1080},
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+}
+
+
+class _PooledBrowser:
+    def __init__(self, browser, context):
+        self.browser = browser
+        self.context = context
+        self.active = 0
+        self.pages_served = 0
+        # Set while a replacement launches; retiring browsers get no new pages
+        self.retiring = False
+
+
+class BrowserPool:
+    """
+    `async with browser_pool.page() as page:` borrows a page on the least
+    busy browser; the browsers start on first use and stay up until close()
+    """
+
+    def __init__(
+        self,
+        size: int = BROWSER_POOL_SIZE,
+        max_pages: int = BROWSER_MAX_PAGES,
+        headless: bool = True
+    ):
+        self.size = size
+        self.max_pages = max_pages
+        self.headless = headless
+        self._playwright = None
+        self._browsers: List[_PooledBrowser] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._start_lock: Optional[asyncio.Lock] = None
+        # Browser being retired -> task launching its replacement
+        self._replacing: Dict[_PooledBrowser, asyncio.Task] = {}
+        self.blocked_requests = 0
+        self.launches = 0
+
+    async def start(self):
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._playwright is not None:
+                return
+            self._playwright = await async_playwright().start()
+            self._browsers = [await self._launch() for _ in range(self.size)]
+            self._slots = asyncio.Semaphore(self.size * self.max_pages)
+            logger.info(f"🌐 Browser pool started: {self.size} browser(s) x {self.max_pages} pages")
+
+    async def _launch(self) -> _PooledBrowser:
+        browser = await self._playwright.chromium.launch(headless=self.headless, args=LAUNCH_ARGS)
+        context = await browser.new_context(**CONTEXT_OPTIONS)
+        await context.route('**/*', self._filter_request)
+        self.launches += 1
+        return _PooledBrowser(browser, context)
+
+    async def _filter_request(self, route):
+        request = route.request
+        if request.resource_type in BLOCKED_RESOURCE_TYPES or TRACKER_PATTERN.search(request.url):
+            self.blocked_requests += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    @asynccontextmanager
+    async def page(self):
+        await self.start()
+        async with self._slots:
+            # The semaphore admits at most size * max_pages, so the least busy
+            # browser always has a free page slot
+            slot = await self._pick()
+            page = None
+            try:
+                slot.active += 1
+                page = await slot.context.new_page()
+                yield page
+            finally:
+                slot.active -= 1
+                if page is not None:
+                    slot.pages_served += 1
+                    try:
+                        await page.close()
+                    except Exception as e:
+                        logger.debug(f"Error closing page: {str(e)}")
+                if slot.pages_served >= BROWSER_RECYCLE_PAGES and slot.active == 0:
+                    await self._replace(slot)
+
+    async def _pick(self) -> _PooledBrowser:
+        """Least busy connected browser, waiting out any relaunch in progress"""
+        while True:
+            ready = [b for b in self._browsers if not b.retiring]
+            if not ready:
+                await asyncio.wait(set(self._replacing.values()))
+                continue
+            slot = min(ready, key=lambda b: b.active)
+            if slot.browser.is_connected():
+                return slot
+            logger.warning("🌐 Browser disconnected, relaunching")
+            try:
+                await self._replace(slot)
+            except Exception as e:
+                logger.error(f"Error relaunching browser: {str(e)}")
+                raise
+
+    async def _replace(self, slot: _PooledBrowser):
+        """Relaunch a browser once, however many callers ask for it"""
+        task = self._replacing.get(slot)
+        if task is None:
+            slot.retiring = True
+            task = self._replacing[slot] = asyncio.ensure_future(self._swap(slot))
+        await asyncio.shield(task)
+
+    async def _swap(self, slot: _PooledBrowser):
+        try:
+            replacement = await self._launch()
+        except Exception:
+            slot.retiring = False
+            raise
+        finally:
+            self._replacing.pop(slot, None)
+        self._browsers[self._browsers.index(slot)] = replacement
+        try:
+            await slot.browser.close()
+        except Exception as e:
+            logger.debug(f"Error closing browser: {str(e)}")
+
+    async def close(self):
+        for slot in self._browsers:
+            try:
+                await slot.browser.close()
+            except Exception as e:
+                logger.debug(f"Error closing browser: {str(e)}")
+        self._browsers = []
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def stats(self):
+        return {
+            'browsers': len(self._browsers),
+            'active_pages': sum(b.active for b in self._browsers),
+            'pages_served': sum(b.pages_served for b in self._browsers),
+            'launches': self.launches,
+            'blocked_requests': self.blocked_requests,
+        }
+
+
+# Shared pool for headless scraping in the API process
+browser_pool = BrowserPool()
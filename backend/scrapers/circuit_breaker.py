@@ -0,0 +1,116 @@
+"""
+Per-Platform Circuit Breakers for CharmTracker
+Stops calling a marketplace that keeps failing and probes it again later
+"""
+
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', '5'))
+BREAKER_RESET_SECONDS = float(os.getenv('BREAKER_RESET_SECONDS', '60'))
+BREAKER_MAX_RESET_SECONDS = float(os.getenv('BREAKER_MAX_RESET_SECONDS', '900'))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures
+    open -> half_open once the reset timeout passes; one probe is let through
+    half_open -> closed on success, back to open (with a longer timeout) on failure
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_seconds: float = BREAKER_RESET_SECONDS
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_reset_seconds = reset_seconds
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_started = 0.0
+        self.rejected = 0
+        self.total_failures = 0
+        self.last_failure_at: Optional[datetime] = None
+
+    def allow(self) -> bool:
+        """True if a request may be sent now"""
+        now = time.monotonic()
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and now - self.opened_at >= self.reset_seconds:
+            self.state = HALF_OPEN
+            logger.info(f"🔌 [{self.name}] Circuit half-open, sending probe")
+        if self.state == HALF_OPEN and now - self.probe_started >= self.reset_seconds:
+            # One probe at a time; a probe that never reports expires after reset_seconds
+            self.probe_started = now
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        if self.state != CLOSED:
+            logger.info(f"🔌 [{self.name}] Circuit closed")
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.reset_seconds = self.base_reset_seconds
+        self.probe_started = 0.0
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self.total_failures += 1
+        self.last_failure_at = datetime.utcnow()
+        if self.state == HALF_OPEN:
+            self.reset_seconds = min(self.reset_seconds * 2, BREAKER_MAX_RESET_SECONDS)
+            self._open()
+        elif self.state == CLOSED and self.consecutive_failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.probe_started = 0.0
+        logger.warning(
+            f"🔌 [{self.name}] Circuit open after {self.consecutive_failures} failures, "
+            f"retrying in {self.reset_seconds:.0f}s"
+        )
+
+    def stats(self) -> Dict:
+        retry_in = None
+        if self.state == OPEN:
+            retry_in = max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'total_failures': self.total_failures,
+            'rejected': self.rejected,
+            'retry_in_seconds': round(retry_in, 1) if retry_in is not None else None,
+            'last_failure_at': self.last_failure_at.isoformat() if self.last_failure_at else None,
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def circuit_breaker(platform: str) -> CircuitBreaker:
+    """Shared breaker for a marketplace, created on first use"""
+    breaker = _breakers.get(platform)
+    if breaker is None:
+        breaker = _breakers[platform] = CircuitBreaker(platform)
+    return breaker
+
+
+def breaker_stats() -> Dict[str, Dict]:
+    return {platform: breaker.stats() for platform, breaker in _breakers.items()}
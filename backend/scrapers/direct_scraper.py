@@ -10,6 +10,8 @@ import aiohttp
 from bs4 import BeautifulSoup
 import re
 
+from .http_transport import client_session
+
 logger = logging.getLogger(__name__)
 
 
@@ -56,7 +58,7 @@ class DirectMarketplaceScraper:
             await asyncio.sleep(0.8)
             
             connector = aiohttp.TCPConnector(ssl=False)  # Bypass SSL verification
-            async with aiohttp.ClientSession(connector=connector) as session:
+            async with client_session(connector=connector) as session:
                 async with session.get(url, headers=self.get_headers(), timeout=30) as response:
                     if response.status != 200:
                         print(f"❌ [ETSY] Status {response.status}")
@@ -150,7 +152,7 @@ class DirectMarketplaceScraper:
             await asyncio.sleep(0.8)
             
             connector = aiohttp.TCPConnector(ssl=False)
-            async with aiohttp.ClientSession(connector=connector) as session:
+            async with client_session(connector=connector) as session:
                 async with session.get(url, headers=self.get_headers(), timeout=30) as response:
                     if response.status != 200:
                         print(f"❌ [EBAY] Status {response.status}")
@@ -255,7 +257,7 @@ class DirectMarketplaceScraper:
             await asyncio.sleep(0.8)
             
             connector = aiohttp.TCPConnector(ssl=False)
-            async with aiohttp.ClientSession(connector=connector) as session:
+            async with client_session(connector=connector) as session:
                 async with session.get(url, headers=self.get_headers(), timeout=30) as response:
                     if response.status != 200:
                         print(f"❌ [POSHMARK] Status {response.status}")
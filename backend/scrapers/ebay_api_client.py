@@ -7,11 +7,17 @@ import os
 import logging
 from typing import List, Dict, Optional
 from datetime import datetime
-import aiohttp
 from datetime import datetime, timedelta
 
+from .circuit_breaker import circuit_breaker
+from .hedging import hedged
+from .http_transport import client_session
+from .search_cache import cached_search
+
 logger = logging.getLogger(__name__)
 
+EBAY_FINDING_URL = os.getenv('EBAY_FINDING_URL', 'https://svcs.ebay.com/services/search/FindingService/v1')
+
 class EbayAPIClient:
     """eBay API client for fetching real-time listing data"""
     
@@ -19,17 +25,25 @@ class EbayAPIClient:
         self.app_id = os.getenv('EBAY_APP_ID')
         self.cert_id = os.getenv('EBAY_CERT_ID')
         self.dev_id = os.getenv('EBAY_DEV_ID')
-        self.finding_url = 'https://svcs.ebay.com/services/search/FindingService/v1'
+        self.finding_url = EBAY_FINDING_URL
         self.shopping_url = 'https://open.api.ebay.com/shopping'
         
         if not all([self.app_id, self.cert_id, self.dev_id]):
             raise ValueError("Missing eBay API credentials")
     
-    async def search_listings(self, charm_name: str) -> List[Dict]:
+    @cached_search('ebay_api')
+    async def search_listings(self, charm_name: str) -> Optional[List[Dict]]:
         """
         Search for active listings of a specific charm
-        Returns normalized listing data
+        Returns normalized listing data (None on error or an open circuit)
         """
+        if not circuit_breaker('ebay_api').allow():
+            logger.info(f"eBay circuit open, skipping search for {charm_name}")
+            return None
+        return await hedged('ebay', lambda: self._search_listings(charm_name))
+    
+    async def _search_listings(self, charm_name: str, page: int = 1) -> Optional[List[Dict]]:
+        """Single findItemsAdvanced request for active listings"""
         try:
             params = {
                 'OPERATION-NAME': 'findItemsAdvanced',
@@ -44,17 +58,20 @@ class EbayAPIClient:
                 'itemFilter(1).name': 'ListingType',
                 'itemFilter(1).value': 'FixedPrice',
                 'sortOrder': 'StartTimeNewest',
-                'paginationInput.entriesPerPage': 100
+                'paginationInput.entriesPerPage': 100,
+                'paginationInput.pageNumber': page
             }
             
-            async with aiohttp.ClientSession() as session:
+            async with client_session() as session:
                 async with session.get(self.finding_url, params=params) as response:
                     data = await response.json()
                     
                     if 'findItemsAdvancedResponse' not in data:
                         logger.error(f"Invalid eBay API response: {data}")
-                        return []
+                        circuit_breaker('ebay_api').record_failure()
+                        return None
                     
+                    circuit_breaker('ebay_api').record_success()
                     items = data['findItemsAdvancedResponse'][0].get('searchResult', [{}])[0].get('item', [])
                     
                     listings = []
@@ -64,7 +81,7 @@ class EbayAPIClient:
                                 'platform': 'eBay',
                                 'price': float(item['sellingStatus'][0]['currentPrice'][0]['__value__']),
                                 'url': item['viewItemURL'][0],
-                                'condition': item['condition'][0]['conditionDisplayName'],
+                                'condition': item['condition'][0]['conditionDisplayName'][0],
                                 'seller': item['sellerInfo'][0]['sellerUserName'][0],
                                 'scraped_at': datetime.utcnow(),
                                 'title': item['title'][0],
@@ -82,12 +99,15 @@ class EbayAPIClient:
                     
         except Exception as e:
             logger.error(f"Error fetching eBay listings: {str(e)}")
-            return []
+            circuit_breaker('ebay_api').record_failure()
+            return None
     
     async def get_completed_listings(self, charm_name: str, days: int = 30) -> List[Dict]:
         """
         Get completed listings for historical price analysis
         """
+        if not circuit_breaker('ebay_api').allow():
+            return []
         try:
             params = {
                 'OPERATION-NAME': 'findCompletedItems',
@@ -103,14 +123,16 @@ class EbayAPIClient:
                 'paginationInput.entriesPerPage': 100
             }
             
-            async with aiohttp.ClientSession() as session:
+            async with client_session() as session:
                 async with session.get(self.finding_url, params=params) as response:
                     data = await response.json()
                     
                     if 'findCompletedItemsResponse' not in data:
                         logger.error(f"Invalid eBay API response: {data}")
+                        circuit_breaker('ebay_api').record_failure()
                         return []
                     
+                    circuit_breaker('ebay_api').record_success()
                     items = data['findCompletedItemsResponse'][0].get('searchResult', [{}])[0].get('item', [])
                     cutoff_date = datetime.utcnow() - timedelta(days=days)
                     
@@ -125,7 +147,7 @@ class EbayAPIClient:
                                 'platform': 'eBay',
                                 'price': float(item['sellingStatus'][0]['currentPrice'][0]['__value__']),
                                 'end_time': end_time,
-                                'condition': item['condition'][0]['conditionDisplayName'],
+                                'condition': item['condition'][0]['conditionDisplayName'][0],
                                 'url': item['viewItemURL'][0],
                                 'item_id': item['itemId'][0]
                             }
@@ -138,4 +160,5 @@ class EbayAPIClient:
                     
         except Exception as e:
             logger.error(f"Error fetching completed eBay listings: {str(e)}")
+            circuit_breaker('ebay_api').record_failure()
             return []
\ No newline at end of file
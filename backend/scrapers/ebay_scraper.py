@@ -12,6 +12,13 @@ import asyncio
 from bs4 import BeautifulSoup
 import re
 
+from .circuit_breaker import circuit_breaker
+from .ebay_api_client import EBAY_FINDING_URL
+from .hedging import hedged
+from .http_transport import client_session
+from .page_archive import page_archive
+from .search_cache import cached_search
+
 logger = logging.getLogger(__name__)
 
 
@@ -24,40 +31,62 @@ class EbayScraper:
         
         # Use Sandbox URL for testing with SBX credentials
         is_sandbox = 'SBX' in self.app_id if self.app_id else False
+        self.is_sandbox = is_sandbox
         if is_sandbox:
             self.base_url = "https://svcs.sandbox.ebay.com/services/search/FindingService/v1"
             logger.info("🧪 eBay Sandbox API detected - NOTE: Sandbox has no real listings!")
             logger.info("   Using web scraping as primary method for real data")
             self.use_web_scraping = True  # Force web scraping for sandbox
         else:
-            self.base_url = "https://svcs.ebay.com/services/search/FindingService/v1"
+            self.base_url = EBAY_FINDING_URL
             logger.info("🔴 Using eBay PRODUCTION API")
         
         self.search_url = "https://www.ebay.com/sch/i.html"
         
+    @cached_search('ebay')
     async def search_charm(
         self, 
         charm_name: str, 
         limit: int = 20
-    ) -> Dict:
+    ) -> Optional[Dict]:
         """
         Search eBay for a specific charm
-        Returns dict with 'listings' (list) and 'avg_price' (float)
+        Returns dict with 'listings' (list) and 'avg_price' (float);
+        None when the search failed or every method's circuit is open
         """
         try:
             logger.info(f"🛒 [EBAY] Starting search for: {charm_name}")
             
-            # Use web scraping as primary method (more reliable for real listings)
+            # Web scraping and the Finding API fail independently, so each has its
+            # own breaker; whichever is open is skipped and the other one is used
+            scrape = (lambda: self._search_with_scraping(charm_name, limit), 'ebay_web')
+            api = (lambda: self._search_with_api(charm_name, limit), 'ebay_api')
             if self.use_web_scraping:
                 logger.info(f"   🌐 Using web scraping (primary method)")
-                result = await self._search_with_scraping(charm_name, limit)
+                # A slow scrape is hedged against the production API when we have a key
+                use_api = self.app_id and not self.is_sandbox
+                methods = [scrape, api] if use_api else [scrape]
             elif self.app_id:
                 logger.info(f"   🔑 Using eBay API with app_id: {self.app_id[:20]}...")
-                result = await self._search_with_api(charm_name, limit)
+                methods = [api, scrape]
             else:
                 # Fallback to web scraping
                 logger.info(f"   🌐 No API key - using web scraping")
-                result = await self._search_with_scraping(charm_name, limit)
+                methods = [scrape]
+            
+            # Skip methods whose breaker is open; the next one becomes the primary
+            allowed = next(
+                (index for index, (_, breaker) in enumerate(methods) if circuit_breaker(breaker).allow()),
+                None
+            )
+            if allowed is None:
+                logger.info(f"🛒 [EBAY] Circuits open, skipping search for {charm_name}")
+                return None
+            primary = methods[allowed][0]
+            rest = methods[allowed + 1:]
+            backup = self._guarded(*rest[0]) if rest else None
+            
+            result = await hedged('ebay_web', primary, backup, limiter='ebay')
             
             if result and result.get('listings'):
                 logger.info(f"   ✅ [EBAY] Found {len(result['listings'])} listings, avg: ${result.get('avg_price', 0):.2f}")
@@ -68,13 +97,22 @@ class EbayScraper:
                 
         except Exception as e:
             logger.error(f"   ❌ [EBAY] Error searching for {charm_name}: {str(e)}")
-            return {'listings': [], 'avg_price': None}
+            return None
+    
+    @staticmethod
+    def _guarded(call, breaker: str):
+        """A hedge backup that is only sent if its breaker allows it when the hedge fires"""
+        async def run():
+            if not circuit_breaker(breaker).allow():
+                return None
+            return await call()
+        return run
     
     async def _search_with_api(
         self, 
         charm_name: str, 
         limit: int = 20
-    ) -> Dict:
+    ) -> Optional[Dict]:
         """Search using eBay Finding API - returns dict with listings and avg_price"""
         try:
             logger.info(f"🛒 [EBAY API] Searching for: {charm_name}")
@@ -97,34 +135,42 @@ class EbayScraper:
                 'itemFilter(2).value': '500',
             }
             
-            async with aiohttp.ClientSession() as session:
+            async with client_session() as session:
                 async with session.get(self.base_url, params=params, timeout=aiohttp.ClientTimeout(total=10)) as response:
                     logger.info(f"   📡 eBay API Response Status: {response.status}")
                     
                     if response.status == 200:
+                        circuit_breaker('ebay_api').record_success()
                         data = await response.json()
                         return self._parse_api_response(data, charm_name)
                     else:
                         error_text = await response.text()
                         logger.warning(f"   ⚠️  eBay API error {response.status}: {error_text[:200]}")
+                        circuit_breaker('ebay_api').record_failure()
                         # Fallback to web scraping
                         logger.info(f"   🔄 Falling back to web scraping...")
-                        return await self._search_with_scraping(charm_name, limit)
+                        return await self._scrape_fallback(charm_name, limit)
                         
         except asyncio.TimeoutError:
             logger.error(f"   ⏱️  eBay API timeout - falling back to scraping")
-            return await self._search_with_scraping(charm_name, limit)
+            circuit_breaker('ebay_api').record_failure()
+            return await self._scrape_fallback(charm_name, limit)
         except Exception as e:
             logger.error(f"   ❌ Error with eBay API: {str(e)}")
+            circuit_breaker('ebay_api').record_failure()
             logger.info(f"   🔄 Falling back to web scraping...")
-            return await self._search_with_scraping(charm_name, limit)
+            return await self._scrape_fallback(charm_name, limit)
+    
+    async def _scrape_fallback(self, charm_name: str, limit: int) -> Optional[Dict]:
+        """Web scraping after an API failure, unless scraping's own breaker is open"""
+        return await self._guarded(lambda: self._search_with_scraping(charm_name, limit), 'ebay_web')()
     
     async def _search_with_scraping(
         self, 
         charm_name: str, 
         limit: int = 20
-    ) -> Dict:
-        """Fallback web scraping method - returns dict with listings and avg_price"""
+    ) -> Optional[Dict]:
+        """Fallback web scraping method - returns dict with listings and avg_price (None on error)"""
         try:
             logger.info(f"   🌐 [EBAY WEB] Scraping for: {charm_name}")
             search_query = f"James Avery {charm_name} charm"
@@ -140,7 +186,7 @@ class EbayScraper:
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
             }
             
-            async with aiohttp.ClientSession() as session:
+            async with client_session() as session:
                 async with session.get(
                     self.search_url, 
                     params=params, 
@@ -150,7 +196,9 @@ class EbayScraper:
                     logger.info(f"   📡 eBay Web Response Status: {response.status}")
                     
                     if response.status == 200:
+                        circuit_breaker('ebay_web').record_success()
                         html = await response.text()
+                        await page_archive.store(str(response.url), html, 'ebay')
                         listings = self._parse_html_response(html, limit)
                         
                         # Calculate average price
@@ -163,13 +211,15 @@ class EbayScraper:
                         return {'listings': listings, 'avg_price': avg_price}
                     else:
                         logger.warning(f"   ⚠️  eBay scraping returned status {response.status}")
-                        return {'listings': [], 'avg_price': None}
+                        circuit_breaker('ebay_web').record_failure()
+                        return None
                         
         except Exception as e:
             logger.error(f"   ❌ Error scraping eBay: {str(e)}")
-            return {'listings': [], 'avg_price': None}
+            circuit_breaker('ebay_web').record_failure()
+            return None
     
-    def _parse_api_response(self, data: Dict, charm_name: str) -> Dict:
+    def _parse_api_response(self, data: Dict, charm_name: str) -> Optional[Dict]:
         """Parse eBay API JSON response - returns dict with listings and avg_price"""
         listings = []
         try:
@@ -180,7 +230,7 @@ class EbayScraper:
             if ack == 'Failure':
                 error_msg = search_result.get('errorMessage', [{}])[0]
                 logger.error(f"   ❌ eBay API Error: {error_msg}")
-                return {'listings': [], 'avg_price': None}
+                return None
             
             items = search_result.get('searchResult', [{}])[0].get('item', [])
             logger.info(f"   📦 eBay API returned {len(items)} items")
@@ -234,7 +284,7 @@ class EbayScraper:
                     
         except Exception as e:
             logger.error(f"   ❌ Error parsing API response: {str(e)}")
-            return {'listings': [], 'avg_price': None}
+            return None
     
     def _parse_html_response(self, html: str, limit: int) -> List[Dict]:
         """Parse eBay HTML response"""
@@ -331,7 +381,7 @@ class EbayScraper:
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             }
             
-            async with aiohttp.ClientSession() as session:
+            async with client_session() as session:
                 async with session.get(
                     self.search_url, 
                     params=params, 
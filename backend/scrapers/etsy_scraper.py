@@ -8,10 +8,14 @@ import asyncio
 import logging
 from typing import List, Dict, Optional
 from datetime import datetime
-import aiohttp
 import os
 from dotenv import load_dotenv
 
+from .circuit_breaker import circuit_breaker
+from .hedging import hedged
+from .http_transport import client_session
+from .search_cache import cached_search
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -22,7 +26,7 @@ class EtsyScraper:
     
     def __init__(self):
         self.api_key = os.getenv('ETSY_API_KEY', '')
-        self.base_url = "https://openapi.etsy.com/v3"
+        self.base_url = os.getenv('ETSY_API_BASE_URL', 'https://openapi.etsy.com/v3').rstrip('/')
         
         if not self.api_key:
             logger.warning("Etsy API key not configured. Get one from https://www.etsy.com/developers/")
@@ -30,19 +34,28 @@ class EtsyScraper:
         else:
             self.use_api = True
     
+    @cached_search('etsy')
     async def search_charm(
         self, 
         charm_name: str, 
         limit: int = 20
-    ) -> List[Dict]:
+    ) -> Optional[List[Dict]]:
         """
         Search Etsy for a specific charm using API v3
-        Returns list of listings with prices and details
+        Returns list of listings with prices and details (None on error or an open circuit)
         """
         if not self.use_api:
             logger.warning("Etsy API not configured, returning empty results")
             return []
-            
+        
+        if not circuit_breaker('etsy').allow():
+            logger.info(f"Etsy circuit open, skipping search for {charm_name}")
+            return None
+        
+        return await hedged('etsy', lambda: self._search_api(charm_name, limit))
+    
+    async def _search_api(self, charm_name: str, limit: int, offset: int = 0) -> Optional[List[Dict]]:
+        """Single Etsy API v3 search request"""
         try:
             query = f"james avery {charm_name}"
             url = f"{self.base_url}/application/listings/active"
@@ -50,6 +63,7 @@ class EtsyScraper:
             params = {
                 'keywords': query,
                 'limit': limit,
+                'offset': offset,
                 'sort_on': 'relevancy',
                 'includes': 'Images,Shop'
             }
@@ -61,14 +75,16 @@ class EtsyScraper:
             
             logger.info(f"Searching Etsy API for: {charm_name}")
             
-            async with aiohttp.ClientSession() as session:
+            async with client_session() as session:
                 async with session.get(url, params=params, headers=headers) as response:
                     if response.status != 200:
                         error_text = await response.text()
                         logger.error(f"Etsy API error: {response.status} - {error_text}")
-                        return []
+                        circuit_breaker('etsy').record_failure()
+                        return None
                     
                     data = await response.json()
+                    circuit_breaker('etsy').record_success()
                     results = data.get('results', [])
                     
                     listings = []
@@ -86,7 +102,8 @@ class EtsyScraper:
                     
         except Exception as e:
             logger.error(f"Error searching Etsy: {str(e)}")
-            return []
+            circuit_breaker('etsy').record_failure()
+            return None
     
     def _parse_api_listing(self, item: Dict) -> Optional[Dict]:
         """Parse Etsy API listing response"""
@@ -158,7 +175,7 @@ class EtsyScraper:
                 'Accept': 'application/json'
             }
             
-            async with aiohttp.ClientSession() as session:
+            async with client_session() as session:
                 async with session.get(url, headers=headers) as response:
                     if response.status != 200:
                         return None
@@ -186,7 +203,7 @@ etsy_scraper = EtsyScraper()
 async def test_etsy_scraper():
     """Test the Etsy scraper"""
     scraper = EtsyScraper()
-    results = await scraper.search_charm("cross charm", limit=5)
+    results = await scraper.search_charm("cross charm", limit=5) or []
     
     print(f"\n✅ Found {len(results)} Etsy listings:")
     for listing in results:
@@ -0,0 +1,125 @@
+"""
+Hedged Requests for CharmTracker
+If a marketplace search is slower than its usual tail latency, start a second
+copy (or an alternate backend) and keep whichever answers first
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from .latency import LatencyTracker
+from .rate_limiter import platform_limiter
+from .search_cache import is_empty_result
+
+logger = logging.getLogger(__name__)
+
+HEDGED_REQUESTS = os.getenv('HEDGED_REQUESTS', 'false').lower() == 'true'
+HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', '95'))
+HEDGE_MIN_DELAY_SECONDS = float(os.getenv('HEDGE_MIN_DELAY_SECONDS', '0.5'))
+HEDGE_DEFAULT_DELAY_SECONDS = float(os.getenv('HEDGE_DEFAULT_DELAY_SECONDS', '5'))
+HEDGE_MIN_SAMPLES = int(os.getenv('HEDGE_MIN_SAMPLES', '20'))
+HEDGE_LATENCY_WINDOW = int(os.getenv('HEDGE_LATENCY_WINDOW', '500'))
+
+
+class HedgeTracker(LatencyTracker):
+    """A platform's recent latencies plus how often hedging fired and won"""
+
+    def __init__(self, window: int = HEDGE_LATENCY_WINDOW):
+        super().__init__(window)
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait before sending the hedge"""
+        if len(self.samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY_SECONDS
+        return max(HEDGE_MIN_DELAY_SECONDS, self.percentile(HEDGE_PERCENTILE))
+
+    def stats(self) -> Dict:
+        return {
+            **super().stats(),
+            'hedge_delay_ms': round(self.hedge_delay() * 1000, 1),
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+        }
+
+
+_trackers: Dict[str, HedgeTracker] = {}
+
+
+def latency_tracker(platform: str) -> HedgeTracker:
+    tracker = _trackers.get(platform)
+    if tracker is None:
+        tracker = _trackers[platform] = HedgeTracker()
+    return tracker
+
+
+def hedging_stats() -> Dict[str, Dict]:
+    return {platform: tracker.stats() for platform, tracker in _trackers.items()}
+
+
+async def _timed(tracker: LatencyTracker, call: Callable[[], Awaitable]):
+    started = time.perf_counter()
+    try:
+        return await call()
+    finally:
+        # Cancelled losers still count (as a lower bound) so the tail is not hidden
+        tracker.record(time.perf_counter() - started)
+
+
+async def _limited(limiter: str, tracker: LatencyTracker, call: Callable[[], Awaitable]):
+    async with platform_limiter(limiter):
+        return await _timed(tracker, call)
+
+
+async def hedged(
+    platform: str,
+    primary: Callable[[], Awaitable],
+    backup: Optional[Callable[[], Awaitable]] = None,
+    limiter: Optional[str] = None
+):
+    """
+    Await `primary()`, hedging with `backup()` (default: a second `primary()`)
+    once it runs past the platform's percentile latency
+    The hedge takes its own slot from `platform_limiter(limiter or platform)`;
+    an empty result only wins once the other request has finished too
+    Latency is recorded whether or not hedging is enabled
+    """
+    tracker = latency_tracker(platform)
+    if not HEDGED_REQUESTS:
+        return await _timed(tracker, primary)
+
+    first = asyncio.ensure_future(_timed(tracker, primary))
+    second = None
+    try:
+        done, _ = await asyncio.wait({first}, timeout=tracker.hedge_delay())
+        if done:
+            return first.result()
+
+        tracker.hedges += 1
+        logger.info(f"🪃 [{platform}] Slow response, sending hedged request")
+        second = asyncio.ensure_future(_limited(limiter or platform, tracker, backup or primary))
+        pending = {first, second}
+        error = None
+        empty = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                elif is_empty_result(task.result()):
+                    empty = empty or task
+                else:
+                    if task is second:
+                        tracker.hedge_wins += 1
+                    return task.result()
+        if empty is not None:
+            return empty.result()
+        raise error
+    finally:
+        for task in (first, second):
+            if task is not None and not task.done():
+                task.cancel()
@@ -0,0 +1,372 @@
+"""
+HTTP Transport for CharmTracker
+Scrapers open their aiohttp sessions through client_session(), which picks
+the transport from HTTP_TRANSPORT:
+
+    passthrough  plain aiohttp session (default)
+    record       live requests, every exchange also appended to HTTP_ARCHIVE_PATH
+    replay       responses served from the archive, no network; optional latency
+
+Archives are gzipped JSON lines. Credentials in query strings and headers are
+redacted before anything is written, and requests are matched on method, URL
+(sorted, redacted query) and body, so replays are deterministic.
+"""
+
+import abc
+import asyncio
+import atexit
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+logger = logging.getLogger(__name__)
+
+HTTP_TRANSPORT = os.getenv('HTTP_TRANSPORT', 'passthrough').lower()
+HTTP_ARCHIVE_PATH = os.getenv('HTTP_ARCHIVE_PATH', 'recordings/http_archive.jsonl.gz')
+# Milliseconds added to every replayed response, or 'recorded' for the original timing
+HTTP_REPLAY_LATENCY = os.getenv('HTTP_REPLAY_LATENCY', '0')
+
+REDACTED_PARAMS = {'api_key', 'apikey', 'key', 'token', 'access_token', 'security-appname', 'appid'}
+REDACTED_HEADERS = {'authorization', 'x-api-key', 'cookie', 'set-cookie'}
+REDACTED = 'REDACTED'
+# The archive stores decoded bodies, so these no longer describe them
+BODY_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding'}
+
+
+def _redact_url(url: URL) -> URL:
+    query = sorted(
+        (name, REDACTED if name.lower() in REDACTED_PARAMS else value)
+        for name, value in url.query.items()
+    )
+    return url.with_query(query)
+
+
+def request_key(method: str, url: str, params: Any = None, json_body: Any = None, data: Any = None) -> str:
+    """Stable identity of a request, independent of credentials and parameter order"""
+    full = URL(url)
+    if params:
+        full = full.extend_query(params)
+    if json_body is not None:
+        body = json.dumps(json_body, sort_keys=True)
+    elif isinstance(data, (bytes, str)):
+        body = data.decode('utf-8', 'replace') if isinstance(data, bytes) else data
+    elif data:
+        body = json.dumps(data, sort_keys=True, default=str)
+    else:
+        body = ''
+    raw = f"{method.upper()} {_redact_url(full)}\n{body}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class HttpArchive:
+    """Append-only gzip JSON-lines file of recorded exchanges"""
+
+    def __init__(self, path: str = HTTP_ARCHIVE_PATH):
+        self.path = path
+        self._writer = None
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, List[Dict]]] = None
+        self._served: Dict[str, int] = defaultdict(int)
+        self.recorded = 0
+        self.replayed = 0
+        self.missed = 0
+
+    def append(self, entry: Dict):
+        line = json.dumps(entry) + '\n'
+        with self._lock:
+            if self._writer is None:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                self._writer = gzip.open(self.path, 'at', encoding='utf-8')
+                atexit.register(self.close)
+            self._writer.write(line)
+            # Sync flush: a crash loses at most the exchange being written
+            self._writer.flush()
+            self.recorded += 1
+
+    async def store(self, entry: Dict):
+        """Append one exchange off the event loop; never fails the request"""
+        try:
+            await asyncio.to_thread(self.append, entry)
+        except Exception as e:
+            logger.error(f"Error recording exchange {entry.get('url')}: {str(e)}")
+
+    def close(self):
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def _load(self) -> Dict[str, List[Dict]]:
+        entries = defaultdict(list)
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    entry = json.loads(line)
+                    entries[entry['key']].append(entry)
+        except FileNotFoundError:
+            logger.warning(f"HTTP archive {self.path} not found, every request will miss")
+        except (EOFError, zlib.error, json.JSONDecodeError) as e:
+            # Recording was interrupted; everything before the cut is usable
+            logger.warning(f"HTTP archive {self.path} is truncated: {str(e)}")
+        logger.info(f"📼 Loaded {sum(len(v) for v in entries.values())} recorded exchanges from {self.path}")
+        return entries
+
+    def next(self, key: str) -> Optional[Dict]:
+        """The n-th recording for the n-th identical request (the last one repeats)"""
+        if self._entries is None:
+            self._entries = self._load()
+        recordings = self._entries.get(key)
+        if not recordings:
+            self.missed += 1
+            return None
+        index = min(self._served[key], len(recordings) - 1)
+        self._served[key] += 1
+        self.replayed += 1
+        return recordings[index]
+
+    def stats(self) -> Dict:
+        return {
+            'mode': HTTP_TRANSPORT,
+            'path': self.path,
+            'recorded': self.recorded,
+            'replayed': self.replayed,
+            'missed': self.missed,
+        }
+
+
+class _Body:
+    """The parts of aiohttp's StreamReader the scrapers use"""
+
+    def __init__(self, body: bytes):
+        self._body = body
+        self._position = 0
+
+    async def read(self, n: int = -1) -> bytes:
+        end = len(self._body) if n < 0 else self._position + n
+        chunk = self._body[self._position:end]
+        self._position += len(chunk)
+        return chunk
+
+    async def iter_chunked(self, n: int):
+        for start in range(0, len(self._body), n):
+            yield self._body[start:start + n]
+
+
+class RecordedResponse:
+    """Fully buffered response with the aiohttp.ClientResponse methods scrapers call"""
+
+    def __init__(self, method: str, url: str, status: int, reason: str, headers: Dict, body: bytes):
+        self.method = method
+        self.url = URL(url)
+        self.status = status
+        self.reason = reason
+        self.headers = CIMultiDictProxy(CIMultiDict(headers))
+        self._body = body
+        self.content = _Body(body)
+
+    @property
+    def ok(self) -> bool:
+        return self.status < 400
+
+    @property
+    def charset(self) -> Optional[str]:
+        content_type = self.headers.get('Content-Type', '')
+        for part in content_type.split(';')[1:]:
+            name, _, value = part.strip().partition('=')
+            if name.lower() == 'charset':
+                return value.strip('"')
+        return None
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def text(self, encoding: Optional[str] = None, errors: str = 'strict') -> str:
+        return self._body.decode(encoding or self.charset or 'utf-8', errors)
+
+    async def json(self, *, encoding: Optional[str] = None, loads=json.loads, content_type: Optional[str] = 'application/json'):
+        return loads(await self.text(encoding))
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise aiohttp.ClientResponseError(
+                None, (), status=self.status, message=self.reason, headers=self.headers
+            )
+
+    def release(self):
+        pass
+
+    def close(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+class _RequestContext:
+    """Lets `async with session.get(...)` and `await session.get(...)` both work"""
+
+    def __init__(self, coro):
+        self._coro = coro
+
+    def __await__(self):
+        return self._coro.__await__()
+
+    async def __aenter__(self) -> RecordedResponse:
+        return await self._coro
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+class _ArchiveSession(abc.ABC):
+    """Common session surface for the record and replay transports"""
+
+    def __init__(self, archive: HttpArchive, **session_kwargs):
+        self.archive = archive
+        self._closed = False
+
+    def request(self, method: str, url, **kwargs) -> _RequestContext:
+        return _RequestContext(self._request(method, str(url), **kwargs))
+
+    def get(self, url, **kwargs) -> _RequestContext:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs) -> _RequestContext:
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs) -> _RequestContext:
+        return self.request('PUT', url, **kwargs)
+
+    def delete(self, url, **kwargs) -> _RequestContext:
+        return self.request('DELETE', url, **kwargs)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    async def close(self):
+        self._closed = True
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @abc.abstractmethod
+    async def _request(self, method: str, url: str, **kwargs) -> RecordedResponse:
+        """Perform or look up one exchange"""
+
+
+class RecordingSession(_ArchiveSession):
+    """Real aiohttp session that appends every exchange to the archive"""
+
+    def __init__(self, archive: HttpArchive, **session_kwargs):
+        super().__init__(archive)
+        self._session = aiohttp.ClientSession(**session_kwargs)
+
+    @property
+    def closed(self) -> bool:
+        return self._session.closed
+
+    async def close(self):
+        await self._session.close()
+
+    async def _request(self, method: str, url: str, **kwargs) -> RecordedResponse:
+        key = request_key(method, url, kwargs.get('params'), kwargs.get('json'), kwargs.get('data'))
+        full = URL(url).extend_query(kwargs['params']) if kwargs.get('params') else URL(url)
+        entry = {'key': key, 'method': method.upper(), 'url': str(_redact_url(full)), 'recorded_at': time.time()}
+        started = time.perf_counter()
+        try:
+            async with self._session.request(method, url, **kwargs) as response:
+                body = await response.read()
+                status, reason = response.status, response.reason or ''
+                headers = {
+                    name: value for name, value in response.headers.items()
+                    if name.lower() not in REDACTED_HEADERS | BODY_HEADERS
+                }
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # Failures are part of the recording too
+            entry.update({
+                'elapsed': time.perf_counter() - started,
+                'error': type(e).__name__,
+                'message': str(e),
+                # aiohttp's own timeout errors subclass asyncio.TimeoutError
+                'timeout': isinstance(e, asyncio.TimeoutError),
+            })
+            await self.archive.store(entry)
+            raise
+
+        entry.update({
+            'elapsed': time.perf_counter() - started,
+            'status': status,
+            'reason': reason,
+            'headers': headers,
+        })
+        try:
+            entry['body'] = body.decode('utf-8')
+        except UnicodeDecodeError:
+            entry['body_b64'] = base64.b64encode(body).decode('ascii')
+        await self.archive.store(entry)
+        return RecordedResponse(method, url, status, reason, headers, body)
+
+
+class ReplaySession(_ArchiveSession):
+    """Serves recorded exchanges; unrecorded requests fail like a connection error"""
+
+    def __init__(self, archive: HttpArchive, **session_kwargs):
+        super().__init__(archive)
+        # Scrapers may hand us a connector; nothing will use it
+        self._connector = session_kwargs.get('connector')
+
+    async def close(self):
+        if self._connector is not None:
+            await self._connector.close()
+        self._closed = True
+
+    async def _request(self, method: str, url: str, **kwargs) -> RecordedResponse:
+        key = request_key(method, url, kwargs.get('params'), kwargs.get('json'), kwargs.get('data'))
+        entry = self.archive.next(key)
+        if entry is None:
+            raise aiohttp.ClientConnectionError(f"No recorded response for {method.upper()} {url}")
+
+        delay = entry.get('elapsed', 0.0) if HTTP_REPLAY_LATENCY == 'recorded' else float(HTTP_REPLAY_LATENCY) / 1000
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if entry.get('error'):
+            # Archives recorded before the flag existed: match by name
+            if entry.get('timeout', entry['error'] in ('TimeoutError', 'ServerTimeoutError')):
+                raise asyncio.TimeoutError(entry.get('message', ''))
+            raise aiohttp.ClientConnectionError(entry.get('message', entry['error']))
+
+        body = base64.b64decode(entry['body_b64']) if 'body_b64' in entry else entry.get('body', '').encode('utf-8')
+        return RecordedResponse(method, url, entry['status'], entry.get('reason', ''), entry.get('headers', {}), body)
+
+
+# One archive per process, shared by every session
+http_archive = HttpArchive()
+
+
+def client_session(**session_kwargs):
+    """aiohttp.ClientSession, or its record/replay stand-in (see HTTP_TRANSPORT)"""
+    if HTTP_TRANSPORT == 'record':
+        return RecordingSession(http_archive, **session_kwargs)
+    if HTTP_TRANSPORT == 'replay':
+        return ReplaySession(http_archive, **session_kwargs)
+    return aiohttp.ClientSession(**session_kwargs)
@@ -4,8 +4,8 @@ Fetches official product details, images, and retired status
 """
 
 import logging
-from typing import Dict, Optional, List, Set
-from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, List, Set, Tuple
+from datetime import datetime, timezone
 import aiohttp
 from bs4 import BeautifulSoup
 import re
@@ -13,27 +13,78 @@ import asyncio
 import json
 import os
 import time
-from urllib.parse import urljoin
+import zlib
+from urllib.parse import urlencode, urljoin, urlparse
+from xml.etree import ElementTree
 from dotenv import load_dotenv
 
+from .circuit_breaker import circuit_breaker
+from .http_transport import client_session
+from .page_archive import page_archive
+from .rate_limiter import host_limiter, parse_retry_after
+from .search_cache import cached_search
+
 # Load environment variables
 load_dotenv('.env.scraper')
 
 logger = logging.getLogger(__name__)
 
 # Constants
-DELAY = float(os.getenv('SCRAPER_DELAY', '2'))  # Delay between requests
+DELAY = float(os.getenv('SCRAPER_DELAY', '2'))  # Base backoff after failed requests (pacing: JAMES_AVERY_*_RATE)
 TIMEOUT = int(os.getenv('REQUEST_TIMEOUT', '30'))
 USER_AGENT = os.getenv('USER_AGENT', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
 # Only use proxy if properly configured
 PROXY = os.getenv('AIOHTTP_PROXY') if os.getenv('AIOHTTP_PROXY', '').startswith(('http://', 'https://')) else None
 
+JA_HOST = 'www.jamesavery.com'
+# Override to point the scraper at a stand-in (see fake_marketplaces.py)
+JA_BASE_URL = os.getenv('JAMES_AVERY_BASE_URL', f'https://{JA_HOST}').rstrip('/')
+JA_SITEMAP_URL = os.getenv('JAMES_AVERY_SITEMAP_URL', f'{JA_BASE_URL}/sitemap_index.xml')
+SITEMAP_NS = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+SITEMAP_CHUNK_BYTES = 64 * 1024
+# Same product pages the /charms pagination finds
+PRODUCT_URL_PATTERN = re.compile(r'/charms/.+\.html$')
+
+
+def product_url_of(charm: Dict) -> Optional[str]:
+    """The James Avery product page stored on a charm document, if any"""
+    for field in ('james_avery_url', 'url'):
+        url = charm.get(field)
+        if not url or not url.split('?')[0].endswith('.html'):
+            continue
+        host = urlparse(url).netloc
+        if host.endswith('jamesavery.com') or host == urlparse(JA_BASE_URL).netloc:
+            return url
+    return None
+
+
+class SitemapUnavailable(Exception):
+    """The sitemap could not be fetched; discovery falls back to paging"""
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[datetime]:
+    """W3C datetime from a sitemap <lastmod> as naive UTC (None if missing or malformed)"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def ja_host_limiter():
+    """Process-wide AIMD limiter shared by every James Avery request"""
+    return host_limiter(JA_HOST, env_prefix='JAMES_AVERY')
+
 
 class JamesAveryScraper:
     """James Avery official website scraper"""
     
     def __init__(self):
-        self.base_url = "https://www.jamesavery.com"
+        self.base_url = JA_BASE_URL
         self.browse_url = f"{self.base_url}/charms"
         self.search_url = f"{self.base_url}/search"
         self.headers = {
@@ -47,14 +98,13 @@ class JamesAveryScraper:
             'Pragma': 'no-cache'
         }
         self.session = None
-        self.last_request_time = 0  # Track time of last request for rate limiting
         self.timeout = aiohttp.ClientTimeout(total=TIMEOUT)
         
     async def __aenter__(self):
         """Set up async context manager"""
         if not self.session:
             connector = aiohttp.TCPConnector(ssl=False, limit=5)
-            self.session = aiohttp.ClientSession(
+            self.session = client_session(
                 connector=connector,
                 timeout=self.timeout,
                 trust_env=True
@@ -68,23 +118,29 @@ class JamesAveryScraper:
             self.session = None
         
     async def _make_request(self, url: str, params: Optional[Dict] = None) -> Optional[str]:
-        """Make an HTTP request with retry logic and adaptive rate limiting"""
+        """
+        Make an HTTP request with retry logic
+        Pacing comes from the shared adaptive limiter for the James Avery host
+        """
         MAX_RETRIES = 3
         MIN_DELAY = DELAY
         MAX_DELAY = DELAY * 10
         
+        breaker = circuit_breaker('james_avery')
+        if not breaker.allow():
+            logger.info(f"James Avery circuit open, skipping {url}")
+            return None
+        
         if not self.session:
             await self.__aenter__()
         
-        # Ensure minimum delay between requests
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        if time_since_last < MIN_DELAY:
-            await asyncio.sleep(MIN_DELAY - time_since_last)
-            
+        # Archived under the URL as requested, which is what charm documents store,
+        # not the post-redirect one
+        archive_url = f"{url}{'&' if '?' in url else '?'}{urlencode(params)}" if params else url
+        
+        limiter = ja_host_limiter()
         for attempt in range(MAX_RETRIES):
             try:
-                self.last_request_time = time.time()
                 delay = MIN_DELAY * (2 ** attempt)  # Exponential backoff
                 delay = min(delay, MAX_DELAY)
                 
@@ -95,56 +151,69 @@ class JamesAveryScraper:
                 }
                 if PROXY:
                     request_kwargs['proxy'] = PROXY
-                    
-                async with self.session.get(url, **request_kwargs) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        # Log successful request timing
-                        duration = time.time() - self.last_request_time
-                        logger.debug(f"Request to {url} completed in {duration:.2f}s")
-                        return content
-                        
-                    elif response.status == 429:  # Too Many Requests
-                        logger.warning(f"Rate limited on attempt {attempt + 1}")
-                        # Get retry_after from headers or use exponential backoff
-                        retry_after = int(response.headers.get('Retry-After', delay))
-                        retry_delay = max(retry_after, delay)
-                        logger.info(f"Waiting {retry_delay}s before retry")
-                        await asyncio.sleep(retry_delay)
-                        continue
-                        
-                    elif response.status >= 500:
-                        logger.warning(f"Server error {response.status} on attempt {attempt + 1}")
-                        await asyncio.sleep(delay)
-                        continue
+                
+                async with limiter:
+                    started = time.time()
+                    async with self.session.get(url, **request_kwargs) as response:
+                        if response.status == 200:
+                            content = await response.text()
+                            await page_archive.store(archive_url, content, 'james_avery')
+                            limiter.on_success()
+                            # Log successful request timing
+                            duration = time.time() - started
+                            logger.debug(f"Request to {url} completed in {duration:.2f}s")
+                            breaker.record_success()
+                            return content
                         
-                    else:
-                        logger.warning(f"Request failed with status {response.status}")
-                        if attempt == MAX_RETRIES - 1:
-                            return None
-                        await asyncio.sleep(delay)
+                        status = response.status
+                        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                
+                if status == 429 or status >= 500:
+                    # Slows every James Avery request in the process, not just this one
+                    logger.warning(f"James Avery returned {status} on attempt {attempt + 1}")
+                    limiter.on_throttle(retry_after)
+                    continue
+                
+                # Client errors (404 etc.) say nothing about the site's health
+                logger.warning(f"Request failed with status {status}")
+                if attempt == MAX_RETRIES - 1:
+                    breaker.record_success()
+                    return None
+                await asyncio.sleep(delay)
                         
             except (aiohttp.ClientError, asyncio.TimeoutError) as e:
                 logger.error(f"Network error on attempt {attempt + 1}: {str(e)}")
+                limiter.on_throttle()
                 if attempt == MAX_RETRIES - 1:
+                    breaker.record_failure()
                     raise
-                await asyncio.sleep(delay)
                 
             except Exception as e:
                 logger.error(f"Unexpected error on attempt {attempt + 1}: {str(e)}")
                 if attempt == MAX_RETRIES - 1:
+                    breaker.record_failure()
                     raise
                 await asyncio.sleep(delay)
-                
+        
+        # Retries exhausted on 429/5xx
+        breaker.record_failure()
         return None
             
-    async def _get_all_product_urls(self) -> Set[str]:
-        """Get all product URLs from main James Avery charms page"""
+    async def _get_all_product_urls(
+        self,
+        start_page: int = 0,
+        on_page: Optional[Callable[[int, Set[str]], Awaitable[None]]] = None
+    ) -> Set[str]:
+        """
+        Get all product URLs from main James Avery charms page
+        `on_page(page, urls)` is awaited after each page so a crawl can
+        checkpoint discovery and later resume from `start_page`
+        """
         all_product_urls = set()
         
         # Use main charms page with pagination - NO CATEGORIES
         base_url = f"{self.base_url}/charms"
-        page = 0
+        page = start_page
         consecutive_empty_pages = 0
         MAX_PAGES = 100  # Adjust if needed
         
@@ -192,12 +261,102 @@ class JamesAveryScraper:
                 all_product_urls.update(product_links)
                 logger.info(f"Found {len(product_links)} products on page {page + 1} (Total: {len(all_product_urls)})")
             
+            if on_page:
+                await on_page(page, product_links)
             page += 1
-            await asyncio.sleep(DELAY)
         
         logger.info(f"Total products discovered: {len(all_product_urls)}")
         return all_product_urls
     
+    async def get_sitemap_products(self) -> Optional[Dict[str, Optional[datetime]]]:
+        """
+        Product URL -> <lastmod> for every charm in the site's XML sitemaps
+        Returns None when the sitemaps can't be read, so callers fall back to paging
+        """
+        try:
+            products: Dict[str, Optional[datetime]] = {}
+            children = []
+            async for kind, loc, lastmod in self._stream_sitemap(JA_SITEMAP_URL):
+                if kind == 'sitemap':
+                    children.append(loc)
+                elif PRODUCT_URL_PATTERN.search(loc):
+                    products[loc] = lastmod
+            
+            # Only the product sitemaps matter when the index names them
+            product_maps = [loc for loc in children if 'product' in loc.lower()] or children
+            for child in product_maps:
+                async for kind, loc, lastmod in self._stream_sitemap(child):
+                    if kind == 'url' and PRODUCT_URL_PATTERN.search(loc):
+                        products[loc] = lastmod
+            
+            logger.info(f"🗺️  Sitemap: {len(products)} products in {len(product_maps) + 1} sitemap(s)")
+            return products or None
+            
+        except SitemapUnavailable as e:
+            logger.warning(f"James Avery sitemap unavailable: {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"Error reading James Avery sitemap: {str(e)}")
+            return None
+    
+    async def _stream_sitemap(self, url: str) -> AsyncIterator[Tuple[str, str, Optional[datetime]]]:
+        """
+        Yield ('sitemap' | 'url', loc, lastmod) while the document downloads,
+        without holding the whole (possibly gzipped) XML in memory
+        """
+        breaker = circuit_breaker('james_avery')
+        if not breaker.allow():
+            raise SitemapUnavailable("circuit open")
+        if not self.session:
+            await self.__aenter__()
+        
+        limiter = ja_host_limiter()
+        parser = ElementTree.XMLPullParser(events=('end',))
+        inflate = zlib.decompressobj(16 + zlib.MAX_WBITS) if url.endswith('.gz') else None
+        request_kwargs = {'headers': self.headers}
+        if PROXY:
+            request_kwargs['proxy'] = PROXY
+        
+        try:
+            async with limiter:
+                async with self.session.get(url, **request_kwargs) as response:
+                    if response.status != 200:
+                        if response.status == 429 or response.status >= 500:
+                            limiter.on_throttle(parse_retry_after(response.headers.get('Retry-After')))
+                        breaker.record_failure()
+                        raise SitemapUnavailable(f"{url} returned {response.status}")
+                    
+                    async for chunk in response.content.iter_chunked(SITEMAP_CHUNK_BYTES):
+                        parser.feed(inflate.decompress(chunk) if inflate else chunk)
+                        for entry in self._sitemap_entries(parser):
+                            yield entry
+                    if inflate:
+                        parser.feed(inflate.flush())
+                    parser.close()
+                    limiter.on_success()
+                    breaker.record_success()
+        except SitemapUnavailable:
+            raise
+        except Exception:
+            # Dropped connections and truncated documents count against the site, as in _make_request
+            breaker.record_failure()
+            raise
+        
+        for entry in self._sitemap_entries(parser):
+            yield entry
+    
+    @staticmethod
+    def _sitemap_entries(parser: ElementTree.XMLPullParser):
+        for _, element in parser.read_events():
+            tag = element.tag.rsplit('}', 1)[-1]
+            if tag not in ('url', 'sitemap'):
+                continue
+            loc = element.findtext(f'{SITEMAP_NS}loc') or element.findtext('loc')
+            lastmod = element.findtext(f'{SITEMAP_NS}lastmod') or element.findtext('lastmod')
+            element.clear()
+            if loc:
+                yield tag, loc.strip(), parse_lastmod(lastmod)
+    
     async def get_all_charms(self) -> List[Dict]:
         """
         Fetch all charms from James Avery website
@@ -207,11 +366,48 @@ class JamesAveryScraper:
         try:
             logger.info("Starting charm collection process...")
             
+            # The sitemap lists every product in a few requests; category
+            # paging is the fallback
+            sitemap_products = await self.get_sitemap_products()
+            if sitemap_products:
+                all_product_urls = set(sitemap_products)
+            else:
+                all_product_urls = await self._get_category_product_urls()
+            if not all_product_urls:
+                return []
+            
+            logger.info(f"Found {len(all_product_urls)} total charm URLs")            # Fetch details for each charm in parallel batches
+            all_charms = []
+            batch_size = 5  # Process 5 charms at a time
+            
+            for i in range(0, len(all_product_urls), batch_size):
+                batch_urls = list(all_product_urls)[i:i + batch_size]
+                tasks = [self._get_product_page(url) for url in batch_urls]
+                batch_results = await asyncio.gather(*tasks, return_exceptions=True)
+                
+                # Filter out errors and add successful results
+                valid_results = [
+                    result for result in batch_results 
+                    if isinstance(result, dict)
+                ]
+                all_charms.extend(valid_results)
+                
+                logger.info(f"Processed {len(all_charms)}/{len(all_product_urls)} charms")
+            
+            return all_charms
+            
+        except Exception as e:
+            logger.error(f"Error fetching all charms: {str(e)}")
+            return []
+            
+    async def _get_category_product_urls(self) -> Set[str]:
+        """Product URLs found by paging through every charm category"""
+        try:
             # Get initial charm listing page
             html = await self._make_request(self.browse_url)
             if not html:
                 logger.error("Failed to get main charms page")
-                return []
+                return set()
             
             # Parse category URLs
             soup = BeautifulSoup(html, 'html.parser')
@@ -295,35 +491,15 @@ class JamesAveryScraper:
                         logger.info(f"Found {len(product_links)} products on page {page} of category {category_url}")
                     
                     page += 1
-                    await asyncio.sleep(DELAY)  # Respect rate limits
                 
                 if page > MAX_PAGES_PER_CATEGORY:
                     logger.warning(f"Reached maximum page limit for category {category_url}")
             
-            logger.info(f"Found {len(all_product_urls)} total charm URLs")            # Fetch details for each charm in parallel batches
-            all_charms = []
-            batch_size = 5  # Process 5 charms at a time
-            
-            for i in range(0, len(all_product_urls), batch_size):
-                batch_urls = list(all_product_urls)[i:i + batch_size]
-                tasks = [self._get_product_page(url) for url in batch_urls]
-                batch_results = await asyncio.gather(*tasks, return_exceptions=True)
-                
-                # Filter out errors and add successful results
-                valid_results = [
-                    result for result in batch_results 
-                    if isinstance(result, dict)
-                ]
-                all_charms.extend(valid_results)
-                
-                logger.info(f"Processed {len(all_charms)}/{len(all_product_urls)} charms")
-                await asyncio.sleep(DELAY)  # Delay between batches
-            
-            return all_charms
+            return all_product_urls
             
         except Exception as e:
-            logger.error(f"Error fetching all charms: {str(e)}")
-            return []
+            logger.error(f"Error paging charm categories: {str(e)}")
+            return set()
             
     async def _get_category_urls(self) -> List[str]:
         """Get all charm category URLs"""
@@ -368,12 +544,17 @@ class JamesAveryScraper:
         while True:
             try:
                 url = f"{category_url}?page={page}"
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url, headers=self.headers) as response:
+                limiter = ja_host_limiter()
+                async with client_session() as session:
+                    async with limiter, session.get(url, headers=self.headers) as response:
+                        if response.status == 429 or response.status >= 500:
+                            limiter.on_throttle(parse_retry_after(response.headers.get('Retry-After')))
+                            break
                         if response.status != 200:
                             break
                             
                         html = await response.text()
+                        limiter.on_success()
                         soup = BeautifulSoup(html, 'html.parser')
                         
                         # Find product links - try multiple selectors
@@ -405,29 +586,30 @@ class JamesAveryScraper:
                         product_urls.update(page_urls)
                         page += 1
                         
-                        # Small delay between pages
-                        await asyncio.sleep(0.5)
-                        
             except Exception as e:
                 logger.error(f"Error on category page {page}: {str(e)}")
                 break
                 
         return product_urls
         
+    @cached_search('james_avery')
     async def get_charm_details(
         self, 
         charm_name: str
     ) -> Optional[Dict]:
         """
         Get official charm details from James Avery website
-        Returns charm info including images, description, material, and status
+        Returns charm info including images, description, material, and status;
+        {} when the site has no such charm, None when the lookup failed
         """
         try:
             # First, search for the charm
             search_results = await self._search_charm(charm_name)
+            if search_results is None:
+                return None
             if not search_results:
                 logger.info(f"No results found for {charm_name} on James Avery")
-                return None
+                return {}
             
             # Get the first matching result
             product_url = search_results[0].get('url')
@@ -443,8 +625,13 @@ class JamesAveryScraper:
             logger.error(f"Error getting James Avery details for {charm_name}: {str(e)}")
             return None
     
-    async def _search_charm(self, charm_name: str) -> List[Dict]:
-        """Search James Avery website"""
+    @cached_search('james_avery_product')
+    async def get_product_details(self, product_url: str) -> Optional[Dict]:
+        """Official details from a known product page, without searching"""
+        return await self._get_product_page(product_url)
+    
+    async def _search_charm(self, charm_name: str) -> Optional[List[Dict]]:
+        """Search James Avery website (None when the search request failed)"""
         try:
             params = {
                 'q': charm_name,
@@ -461,26 +648,30 @@ class JamesAveryScraper:
             }
             
             timeout = aiohttp.ClientTimeout(total=30)
+            limiter = ja_host_limiter()
             
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.get(
+            async with client_session(timeout=timeout) as session:
+                async with limiter, session.get(
                     self.search_url, 
                     params=params, 
                     headers=headers,
                     allow_redirects=True
                 ) as response:
+                    if response.status == 429 or response.status >= 500:
+                        limiter.on_throttle(parse_retry_after(response.headers.get('Retry-After')))
                     if response.status == 200:
                         html = await response.text()
+                        limiter.on_success()
                         results = self._parse_search_results(html)
                         logger.info(f"Found {len(results)} results for '{charm_name}'")
                         return results
                     else:
                         logger.warning(f"Search returned status {response.status}")
-                    return []
+                    return None
                     
         except Exception as e:
             logger.error(f"Error searching James Avery: {str(e)}", exc_info=True)
-            return []
+            return None
     
     def _parse_search_results(self, html: str) -> List[Dict]:
         """Parse search results page"""
@@ -830,12 +1021,12 @@ class JamesAveryScraper:
                     if isinstance(data, dict):
                         img_url = data.get('image', '')
                         if isinstance(img_url, list):
-                            for url in img_url:
-                                if is_valid_product_image(url):
-                                    if not url.startswith('http'):
-                                        url = f"{self.base_url}{url}"
-                                    if url not in images:
-                                        images.append(url)
+                            for image_url in img_url:
+                                if is_valid_product_image(image_url):
+                                    if not image_url.startswith('http'):
+                                        image_url = f"{self.base_url}{image_url}"
+                                    if image_url not in images:
+                                        images.append(image_url)
                         elif img_url and is_valid_product_image(img_url):
                             if not img_url.startswith('http'):
                                 img_url = f"{self.base_url}{img_url}"
@@ -1050,7 +1241,7 @@ async def test_scraper():
         test_searches = ["heart charm", "cross charm", "baby feet"]
         for search_term in test_searches:
             try:
-                results = await scraper._search_charm(search_term)
+                results = await scraper._search_charm(search_term) or []
                 logger.info(f"\nSearch results for '{search_term}':")
                 logger.info(f"Found {len(results)} results")
                 if results:
@@ -1065,6 +1256,43 @@ async def test_scraper():
 # Initialize scraper instance
 james_avery_scraper = JamesAveryScraper()
 
+
+def catalog_fields(url: str, data: Dict) -> Dict:
+    """Catalog document fields for a parsed product page (shared by sync and re-parse)"""
+    name = data['name']
+    
+    # Format images
+    formatted_images = []
+    for img_url in data.get('images', []):
+        if 'scene7.com' in img_url and '?' not in img_url:
+            img_url = f"{img_url}?wid=800&hei=800&fmt=jpeg&qlt=90"
+        formatted_images.append(img_url)
+    
+    return {
+        'name': name,
+        'description': data.get('description', f"Beautiful {name} from James Avery"),
+        'price': data.get('price', data.get('official_price')),
+        'official_price': data.get('official_price'),
+        'material': data.get('material', 'Sterling Silver'),
+        'images': formatted_images,
+        'url': data.get('url', url),
+        'sku': data.get('sku'),
+        'status': data.get('status', 'Active'),
+        'is_retired': data.get('status') == 'Retired',
+    }
+
+
+def parse_product_page(page: Tuple[str, str]) -> Optional[Tuple[str, Dict]]:
+    """
+    (url, html) -> (url, product data), or None if the page has no product
+    Module-level so the catalog sync can run it in a worker process
+    """
+    url, html = page
+    data = james_avery_scraper._parse_product_page(html, url)
+    if not data or not data.get('name'):
+        return None
+    return url, data
+
 # Run test if executed directly
 if __name__ == "__main__":
     import asyncio
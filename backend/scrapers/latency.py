@@ -0,0 +1,39 @@
+"""
+Latency Percentiles for CharmTracker
+Rolling window of recent durations with percentile summaries, shared by the
+request hedging (scrapers/hedging.py) and the update pipeline stage stats
+"""
+
+from collections import deque
+from typing import Dict, Optional
+
+# Samples kept per tracker
+LATENCY_WINDOW = 500
+
+
+class LatencyTracker:
+    """Rolling window of recent latencies, in seconds"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def stats(self) -> Dict:
+        p50 = self.percentile(50)
+        p95 = self.percentile(95)
+        p99 = self.percentile(99)
+        return {
+            'samples': len(self.samples),
+            'p50_ms': round(p50 * 1000, 1) if p50 is not None else None,
+            'p95_ms': round(p95 * 1000, 1) if p95 is not None else None,
+            'p99_ms': round(p99 * 1000, 1) if p99 is not None else None,
+        }
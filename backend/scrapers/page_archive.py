@@ -0,0 +1,199 @@
+"""
+Raw Page Archive for CharmTracker
+Keeps fetched HTML so a parser fix can be backfilled without re-crawling.
+Each distinct page body is stored once, addressed by its SHA-256, as a zstd
+frame appended to a segment file; a SQLite index maps URL and fetch time to
+the frame. Disabled unless PAGE_ARCHIVE_DIR is set (needs `zstandard`).
+
+Re-parse an archive slice with reparse_archive.py.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+PAGE_ARCHIVE_DIR = os.getenv('PAGE_ARCHIVE_DIR', '')
+PAGE_ARCHIVE_LEVEL = int(os.getenv('PAGE_ARCHIVE_LEVEL', '6'))
+# Start a new segment file once the current one reaches this size
+PAGE_ARCHIVE_SEGMENT_MB = int(os.getenv('PAGE_ARCHIVE_SEGMENT_MB', '256'))
+
+INDEX_FILE = 'index.sqlite'
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    segment TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT NOT NULL,
+    source TEXT NOT NULL,
+    fetched_at TEXT NOT NULL,
+    sha256 TEXT NOT NULL REFERENCES blobs(sha256)
+);
+CREATE INDEX IF NOT EXISTS pages_url ON pages (url, fetched_at);
+CREATE INDEX IF NOT EXISTS pages_source ON pages (source, fetched_at);
+"""
+
+
+def read_frame(path: Union[str, Path], offset: int, length: int) -> bytes:
+    """Decompress one stored page (module-level so re-parse workers can call it)"""
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        frame = f.read(length)
+    return zstandard.ZstdDecompressor().decompress(frame)
+
+
+class PageArchive:
+    """Append-only, content-addressed store of raw pages"""
+
+    def __init__(self, directory: str = PAGE_ARCHIVE_DIR, level: int = PAGE_ARCHIVE_LEVEL):
+        self.directory = Path(directory) if directory else None
+        self.level = level
+        self.enabled = self.directory is not None
+        if self.enabled and zstandard is None:
+            logger.warning("PAGE_ARCHIVE_DIR is set but zstandard is not installed; page archive disabled")
+            self.enabled = False
+        self._index: Optional[sqlite3.Connection] = None
+        self._segment = None
+        self._segment_name: Optional[str] = None
+        self._compressor = None
+        # put() runs in worker threads
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.blobs = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def _open_index(self) -> sqlite3.Connection:
+        if self._index is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # The scheduler and API processes may both write
+            self._index = sqlite3.connect(self.directory / INDEX_FILE, timeout=30, check_same_thread=False)
+            self._index.execute('PRAGMA journal_mode=WAL')
+            self._index.executescript(SCHEMA)
+        return self._index
+
+    def _segment_file(self):
+        if self._segment is None or self._segment.tell() >= PAGE_ARCHIVE_SEGMENT_MB * 1024 * 1024:
+            if self._segment is not None:
+                self._segment.close()
+            # One writer per segment: processes never append to the same file
+            self._segment_name = f"segment-{int(time.time())}-{os.getpid()}.zst"
+            self._segment = open(self.directory / self._segment_name, 'ab')
+            self._compressor = zstandard.ZstdCompressor(level=self.level, write_content_size=True)
+        return self._segment
+
+    def put(self, url: str, body: Union[str, bytes], source: str, fetched_at: Optional[datetime] = None) -> str:
+        """Archive one page; returns its content hash"""
+        data = body.encode('utf-8') if isinstance(body, str) else body
+        sha256 = hashlib.sha256(data).hexdigest()
+        fetched_at = (fetched_at or datetime.utcnow()).isoformat()
+        with self._lock:
+            index = self._open_index()
+            known = index.execute('SELECT 1 FROM blobs WHERE sha256 = ?', (sha256,)).fetchone()
+            if not known:
+                segment = self._segment_file()
+                frame = self._compressor.compress(data)
+                offset = segment.tell()
+                segment.write(frame)
+                segment.flush()
+                index.execute(
+                    'INSERT OR IGNORE INTO blobs VALUES (?, ?, ?, ?, ?)',
+                    (sha256, self._segment_name, offset, len(frame), len(data))
+                )
+                self.blobs += 1
+                self.bytes_out += len(frame)
+            index.execute('INSERT INTO pages VALUES (?, ?, ?, ?)', (url, source, fetched_at, sha256))
+            index.commit()
+            self.pages += 1
+            self.bytes_in += len(data)
+        return sha256
+
+    async def store(self, url: str, body: Union[str, bytes], source: str):
+        """Archive a fetched page off the event loop; never fails the fetch"""
+        if not self.enabled:
+            return
+        try:
+            await asyncio.to_thread(self.put, url, body, source)
+        except Exception as e:
+            logger.error(f"Error archiving page {url}: {str(e)}")
+
+    def select(
+        self,
+        source: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        url_contains: Optional[str] = None,
+        latest_only: bool = True
+    ) -> List[Dict]:
+        """
+        Index entries of an archive slice, oldest first
+        With latest_only, each URL appears once with its most recent fetch
+        """
+        clauses, params = [], []
+        if source:
+            clauses.append('p.source = ?')
+            params.append(source)
+        if since:
+            clauses.append('p.fetched_at >= ?')
+            params.append(since.isoformat())
+        if until:
+            clauses.append('p.fetched_at < ?')
+            params.append(until.isoformat())
+        if url_contains:
+            clauses.append('p.url LIKE ?')
+            params.append(f'%{url_contains}%')
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        # SQLite returns the row holding MAX() for the bare columns
+        fetched = 'MAX(p.fetched_at)' if latest_only else 'p.fetched_at'
+        group = 'GROUP BY p.url' if latest_only else ''
+        query = f"""
+            SELECT p.url, p.source, {fetched}, b.sha256, b.segment, b.offset, b.length
+            FROM pages p JOIN blobs b ON b.sha256 = p.sha256
+            {where} {group}
+            ORDER BY 3
+        """
+        with self._lock:
+            rows = self._open_index().execute(query, params).fetchall()
+        return [
+            {
+                'url': url,
+                'source': source,
+                'fetched_at': fetched_at,
+                'sha256': sha256,
+                'path': str(self.directory / segment),
+                'offset': offset,
+                'length': length,
+            }
+            for url, source, fetched_at, sha256, segment, offset, length in rows
+        ]
+
+    def stats(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'pages': self.pages,
+            'blobs': self.blobs,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'compression_ratio': round(self.bytes_in / self.bytes_out, 1) if self.bytes_out else 0.0,
+        }
+
+
+# Shared by every scraper in the process
+page_archive = PageArchive()
@@ -5,18 +5,37 @@ Documentation: https://apify.com/piotrv1001/poshmark-listings-scraper
 """
 
 import logging
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set
 from datetime import datetime
 import aiohttp
 import asyncio
 import os
 import re
+from urllib.parse import parse_qs, urlparse
 from dotenv import load_dotenv
 
+from .circuit_breaker import circuit_breaker
+from .http_transport import client_session
+from .rate_limiter import platform_limiter
+from .search_cache import cached_search
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Searches collected into one actor run; 1 starts a run per search
+POSHMARK_BATCH_SIZE = int(os.getenv('POSHMARK_BATCH_SIZE', '20'))
+# How long the first search of a batch waits for others to join
+POSHMARK_BATCH_WINDOW_SECONDS = float(os.getenv('POSHMARK_BATCH_WINDOW_SECONDS', '2'))
+POSHMARK_RUN_TIMEOUT_SECONDS = float(os.getenv('POSHMARK_RUN_TIMEOUT_SECONDS', '70'))
+# Run status polling backoff: first delay, doubling up to the cap
+APIFY_POLL_INITIAL_SECONDS = 1.0
+APIFY_POLL_MAX_SECONDS = 10.0
+
+APIFY_FINISHED_STATUSES = {'SUCCEEDED', 'FAILED', 'ABORTED', 'TIMED-OUT'}
+# Dataset item fields that may carry the search URL an item came from
+ORIGIN_FIELDS = ('searchUrl', 'search_url', 'sourceUrl', 'startUrl')
+
 
 class PoshmarkScraper:
     """Poshmark scraper using Apify API"""
@@ -24,27 +43,68 @@ class PoshmarkScraper:
     def __init__(self):
         self.api_token = os.getenv('APIFY_API_TOKEN', '')
         self.actor_id = os.getenv('APIFY_POSHMARK_ACTOR_ID', 'piotrv1001/poshmark-listings-scraper')
-        self.base_url = "https://api.apify.com/v2"
+        self.base_url = os.getenv('APIFY_BASE_URL', 'https://api.apify.com/v2').rstrip('/')
         self.poshmark_url = "https://poshmark.com"
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Searches waiting for the next batched run: search URL -> future of its items
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # Running batches, held so they are not garbage-collected mid-run
+        self._batch_tasks: Set[asyncio.Task] = set()
         
         if not self.api_token or self.api_token == 'your_apify_token_here':
             logger.warning("Apify API token not configured. Get one from https://console.apify.com/account/integrations")
             self.use_api = False
         else:
             self.use_api = True
+    
+    @property
+    def paces_itself(self) -> bool:
+        """Batched searches are paced per actor run, not per search"""
+        return POSHMARK_BATCH_SIZE > 1
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """One HTTP session for every Apify call"""
+        if self._session is None or self._session.closed:
+            self._session = client_session(
+                headers={"Authorization": f"Bearer {self.api_token}"}
+            )
+        return self._session
+    
+    async def close(self):
+        # Searches still waiting for a batch get None instead of hanging
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, {}
+        for future in batch.values():
+            if not future.done():
+                future.set_result(None)
+        for task in list(self._batch_tasks):
+            task.cancel()
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
+        if self._session and not self._session.closed:
+            await self._session.close()
         
+    @cached_search('poshmark')
     async def search_charm(
         self, 
         charm_name: str, 
         limit: int = 20
-    ) -> List[Dict]:
+    ) -> Optional[List[Dict]]:
         """
         Search Poshmark for a specific charm using Apify API
-        Returns list of listings with prices and details
+        Returns list of listings with prices and details (None on error or an open circuit)
         """
         if not self.use_api:
             logger.warning("Apify API not configured, returning empty results")
             return []
+        
+        breaker = circuit_breaker('poshmark')
+        if not breaker.allow():
+            logger.info(f"👗 [POSHMARK] Circuit open, skipping search for {charm_name}")
+            return None
             
         try:
             search_query = f"James Avery {charm_name}"
@@ -54,13 +114,14 @@ class PoshmarkScraper:
             logger.info(f"👗 [POSHMARK] Searching for: {charm_name}")
             logger.info(f"   Search URL: {search_url}")
             
-            # Start Apify actor
-            run_id = await self._start_apify_actor(search_url)
-            if not run_id:
-                return []
-            
-            # Wait for results
-            results = await self._get_apify_results(run_id, timeout=60)
+            # The actor run records its own outcome on the breaker, once per run
+            if self.paces_itself:
+                results = await self._batched_results(search_url)
+            else:
+                by_url = await self._run_batch_actor([search_url])
+                results = None if by_url is None else by_url[search_url]
+            if results is None:
+                return None
             
             # Parse and format results
             listings = self._parse_apify_results(results, limit)
@@ -77,63 +138,169 @@ class PoshmarkScraper:
                         
         except Exception as e:
             logger.error(f"Error searching Poshmark for {charm_name}: {str(e)}")
-            return []
+            return None
     
-    async def _start_apify_actor(self, search_url: str) -> Optional[str]:
-        """Start Apify actor and return run ID"""
+    async def _batched_results(self, search_url: str) -> Optional[List[Dict]]:
+        """
+        Queue a search for the next batched actor run and wait for its items
+        A batch starts when it is full or its window closes; None means the run failed
+        """
+        loop = asyncio.get_running_loop()
+        future = self._pending.get(search_url)
+        if future is None:
+            future = loop.create_future()
+            self._pending[search_url] = future
+            if len(self._pending) >= POSHMARK_BATCH_SIZE:
+                self._flush_batch()
+            elif self._flush_handle is None:
+                self._flush_handle = loop.call_later(POSHMARK_BATCH_WINDOW_SECONDS, self._flush_batch)
+        # Other searches share this future; one caller giving up must not cancel it
+        return await asyncio.shield(future)
+    
+    def _flush_batch(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+    
+    async def _run_batch(self, batch: Dict[str, asyncio.Future]):
+        by_url = None
         try:
-            url = f"{self.base_url}/acts/{self.actor_id}/runs"
+            by_url = await self._run_batch_actor(list(batch))
+        finally:
+            # Also on cancellation: every waiter must be released
+            for search_url, future in batch.items():
+                if not future.done():
+                    future.set_result(None if by_url is None else by_url.get(search_url, []))
+    
+    async def _run_batch_actor(self, search_urls: List[str]) -> Optional[Dict[str, List[Dict]]]:
+        """
+        One rate-limited actor run, recorded once on the breaker however many
+        searches it answers (waiting searches never touch the breaker)
+        """
+        breaker = circuit_breaker('poshmark')
+        try:
+            async with platform_limiter('poshmark'):
+                by_url = await self._run_actor(search_urls)
+        except Exception as e:
+            logger.error(f"Error running Poshmark batch: {str(e)}")
+            by_url = None
+        if by_url is None:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return by_url
+    
+    async def _run_actor(self, search_urls: List[str]) -> Optional[Dict[str, List[Dict]]]:
+        """One actor run over all search URLs; items grouped by originating URL"""
+        run = await self._start_apify_actor(search_urls)
+        if not run:
+            return None
+        status = await self._wait_for_run(run['id'], POSHMARK_RUN_TIMEOUT_SECONDS)
+        if status != 'SUCCEEDED':
+            logger.warning(f"Apify run {run['id']} ended as {status}")
+            # A timed-out or aborted run may still have produced items
+            if status is None or status == 'FAILED':
+                return None
+        results = await self._get_apify_results(run['id'])
+        return self._split_by_origin(results, search_urls)
+    
+    async def _start_apify_actor(self, search_urls: List[str]) -> Optional[Dict]:
+        """Start Apify actor and return the run object"""
+        try:
+            url = f"{self.base_url}/acts/{self.actor_id.replace('/', '~')}/runs"
             
             input_data = {
-                "searchUrls": [search_url]
+                "searchUrls": search_urls
             }
             
-            headers = {
-                "Authorization": f"Bearer {self.api_token}",
-                "Content-Type": "application/json"
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=input_data, headers=headers) as response:
-                    if response.status != 201:
-                        error_text = await response.text()
-                        logger.error(f"Apify API error: {response.status} - {error_text}")
-                        return None
-                    
-                    data = await response.json()
-                    run_id = data.get('data', {}).get('id')
-                    logger.info(f"Apify actor started: {run_id}")
-                    return run_id
+            async with self._get_session().post(url, json=input_data) as response:
+                if response.status != 201:
+                    error_text = await response.text()
+                    logger.error(f"Apify API error: {response.status} - {error_text}")
+                    return None
+                
+                data = await response.json()
+                run = data.get('data', {})
+                logger.info(f"Apify actor started: {run.get('id')} ({len(search_urls)} searches)")
+                return run if run.get('id') else None
                     
         except Exception as e:
             logger.error(f"Error starting Apify actor: {str(e)}")
             return None
     
-    async def _get_apify_results(self, run_id: str, timeout: int = 60) -> List[Dict]:
-        """Wait for Apify actor to finish and get results"""
+    async def _wait_for_run(self, run_id: str, timeout: float) -> Optional[str]:
+        """Poll the run with exponential backoff; returns its final status (None if still running)"""
+        url = f"{self.base_url}/actor-runs/{run_id}"
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        delay = APIFY_POLL_INITIAL_SECONDS
+        status = None
+        while True:
+            try:
+                async with self._get_session().get(url) as response:
+                    if response.status == 200:
+                        data = await response.json()
+                        status = data.get('data', {}).get('status')
+                        if status in APIFY_FINISHED_STATUSES:
+                            return status
+            except Exception as e:
+                logger.debug(f"Error polling Apify run {run_id}: {str(e)}")
+            
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                logger.warning(f"Apify run {run_id} still {status} after {timeout:.0f}s")
+                return None
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, APIFY_POLL_MAX_SECONDS)
+    
+    async def _get_apify_results(self, run_id: str) -> List[Dict]:
+        """Dataset items of a finished run"""
         try:
             dataset_url = f"{self.base_url}/actor-runs/{run_id}/dataset/items"
-            headers = {"Authorization": f"Bearer {self.api_token}"}
-            
-            # Poll for completion
-            for _ in range(timeout):
-                await asyncio.sleep(1)
-                
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(dataset_url, headers=headers) as response:
-                        if response.status == 200:
-                            results = await response.json()
-                            if results:
-                                logger.info(f"Got {len(results)} results from Apify")
-                                return results
-            
-            logger.warning("Apify actor timed out")
-            return []
+            async with self._get_session().get(dataset_url) as response:
+                if response.status == 200:
+                    results = await response.json()
+                    logger.info(f"Got {len(results)} results from Apify")
+                    return results
+                logger.error(f"Apify dataset error: {response.status}")
+                return []
             
         except Exception as e:
             logger.error(f"Error getting Apify results: {str(e)}")
             return []
     
+    @staticmethod
+    def _split_by_origin(results: List[Dict], search_urls: List[str]) -> Dict[str, List[Dict]]:
+        """
+        Group dataset items by the search URL they came from
+        Items without an origin field are matched on the query words in their title
+        """
+        by_url: Dict[str, List[Dict]] = {url: [] for url in search_urls}
+        if len(search_urls) == 1:
+            by_url[search_urls[0]] = list(results)
+            return by_url
+        
+        query_words = {}
+        for url in search_urls:
+            query = parse_qs(urlparse(url).query).get('query', [''])[0]
+            query_words[url] = set(re.findall(r'[a-z0-9]+', query.lower())) - {'james', 'avery', 'charm'}
+        
+        for item in results:
+            origin = next((item[f] for f in ORIGIN_FIELDS if item.get(f) in by_url), None)
+            if origin:
+                by_url[origin].append(item)
+                continue
+            title_words = set(re.findall(r'[a-z0-9]+', str(item.get('title', '')).lower()))
+            for url, words in query_words.items():
+                if words and words <= title_words:
+                    by_url[url].append(item)
+        return by_url
+    
     def _parse_apify_results(self, results: List[Dict], limit: int) -> List[Dict]:
         """Parse Apify actor results into our format"""
         listings = []
@@ -0,0 +1,93 @@
+"""
+James Avery Product Resolution Cache for CharmTracker
+Remembers which product page (URL and SKU) a charm name resolved to, so a
+charm without a stored URL is searched on jamesavery.com once rather than on
+every update. Memory first, optional MongoDB collection so entries survive a
+restart.
+"""
+
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+from .search_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+JA_RESOLUTION_COLLECTION = os.getenv('JA_RESOLUTION_COLLECTION', 'ja_resolutions')
+
+
+class ProductResolver:
+    """charm name -> {'url', 'sku'} of its James Avery product page"""
+
+    def __init__(self):
+        self._entries: Dict[str, Dict] = {}
+        self.collection = None
+        self.hits = 0
+        self.misses = 0
+
+    async def attach(self, db):
+        """Persist resolutions in MongoDB"""
+        if not JA_RESOLUTION_COLLECTION:
+            return
+        self.collection = db[JA_RESOLUTION_COLLECTION]
+        logger.info(f"🗃️  James Avery resolutions persisted to '{JA_RESOLUTION_COLLECTION}'")
+
+    async def get(self, charm_name: str) -> Optional[Dict]:
+        key = normalize_query(charm_name)
+        entry = self._entries.get(key)
+        if entry is None and self.collection is not None:
+            try:
+                doc = await self.collection.find_one({'_id': key})
+            except Exception as e:
+                logger.debug(f"Could not read resolution for '{key}': {str(e)}")
+                doc = None
+            if doc:
+                entry = {'url': doc.get('url'), 'sku': doc.get('sku')}
+                self._entries[key] = entry
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    async def put(self, charm_name: str, url: str, sku: Optional[str] = None):
+        key = normalize_query(charm_name)
+        entry = {'url': url, 'sku': sku}
+        if self._entries.get(key) == entry:
+            return
+        self._entries[key] = entry
+        if self.collection is not None:
+            try:
+                await self.collection.update_one(
+                    {'_id': key},
+                    {'$set': {**entry, 'resolved_at': datetime.utcnow()}},
+                    upsert=True
+                )
+            except Exception as e:
+                logger.debug(f"Could not persist resolution for '{key}': {str(e)}")
+
+    async def forget(self, charm_name: str):
+        """Drop a resolution whose product page no longer loads"""
+        key = normalize_query(charm_name)
+        self._entries.pop(key, None)
+        if self.collection is not None:
+            try:
+                await self.collection.delete_one({'_id': key})
+            except Exception as e:
+                logger.debug(f"Could not delete resolution for '{key}': {str(e)}")
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0,
+            'persisted': self.collection is not None,
+        }
+
+
+# Shared by every aggregator in the process
+ja_products = ProductResolver()
@@ -0,0 +1,211 @@
+"""
+Per-Platform Rate Limiting for CharmTracker
+Token buckets with a concurrency cap, shared by every caller of a marketplace
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# platform -> (requests per second, burst, max concurrent requests)
+DEFAULT_LIMITS = {
+    'ebay': (5.0, 5, 5),
+    'etsy': (5.0, 5, 4),
+    'poshmark': (0.5, 2, 3),
+    # Request pacing for the site itself is done by the AIMD host limiter below
+    'james_avery': (0.0, 1, 2),
+    # Concurrent requests allowed by the ScraperAPI plan
+    'scraperapi': (0.0, 1, 5),
+}
+
+# Adaptive per-host limits: (initial, min, max) requests per second, max concurrent
+HOST_LIMITS = {
+    'www.jamesavery.com': (0.5, 0.1, 5.0, 4),
+}
+AIMD_INCREASE = float(os.getenv('AIMD_RATE_INCREASE', '0.05'))
+AIMD_DECREASE_FACTOR = float(os.getenv('AIMD_DECREASE_FACTOR', '0.5'))
+
+
+class RateLimiter:
+    """
+    Token bucket plus semaphore
+    Use as `async with limiter:` around one outbound request
+    """
+
+    def __init__(self, name: str, rate: float, burst: int = 1, max_concurrent: int = 1):
+        self.name = name
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_concurrent = max(1, max_concurrent)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self.in_flight = 0
+        self.total_wait = 0.0
+        self.requests = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire_token(self):
+        """Wait until the bucket allows another request"""
+        if self.rate <= 0:
+            return
+        started = time.monotonic()
+        async with self._lock:
+            await self._wait_until_open()
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+        self.total_wait += time.monotonic() - started
+
+    async def _wait_until_open(self):
+        """Hook for limiters that can pause all requests (see AdaptiveRateLimiter)"""
+    
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        try:
+            await self.acquire_token()
+        except BaseException:
+            self._semaphore.release()
+            raise
+        self.in_flight += 1
+        self.requests += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.in_flight -= 1
+        self._semaphore.release()
+        return False
+
+    def stats(self) -> Dict:
+        return {
+            'rate_per_second': self.rate,
+            'burst': self.burst,
+            'max_concurrent': self.max_concurrent,
+            'in_flight': self.in_flight,
+            'requests': self.requests,
+            'avg_wait_seconds': round(self.total_wait / self.requests, 3) if self.requests else 0.0,
+        }
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    """
+    Token bucket whose rate follows AIMD: every success adds AIMD_INCREASE
+    requests/second, every 429/5xx multiplies the rate by AIMD_DECREASE_FACTOR.
+    A Retry-After header pauses all requests to the host until it expires.
+    """
+
+    def __init__(self, name: str, rate: float, min_rate: float, max_rate: float, max_concurrent: int):
+        super().__init__(name, rate=rate, burst=1, max_concurrent=max_concurrent)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self._paused_until = 0.0
+        self.throttled = 0
+
+    async def _wait_until_open(self):
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+
+    def on_success(self):
+        self._refill()
+        self.rate = min(self.max_rate, self.rate + AIMD_INCREASE)
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        """Back off after a 429/5xx (or a timeout)"""
+        self._refill()
+        self.throttled += 1
+        self.rate = max(self.min_rate, self.rate * AIMD_DECREASE_FACTOR)
+        self._tokens = min(self._tokens, 0.0)
+        if retry_after:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        logger.warning(
+            f"🐢 [{self.name}] Throttled, rate now {self.rate:.2f}/s"
+            + (f", paused {retry_after:.0f}s" if retry_after else "")
+        )
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        stats.update({
+            'rate_per_second': round(self.rate, 3),
+            'min_rate': self.min_rate,
+            'max_rate': self.max_rate,
+            'throttled': self.throttled,
+            'paused_for_seconds': round(max(0.0, self._paused_until - time.monotonic()), 1),
+        })
+        return stats
+
+
+def _limiter_from_env(platform: str) -> RateLimiter:
+    rate, burst, concurrent = DEFAULT_LIMITS.get(platform, (1.0, 1, 2))
+    prefix = platform.upper()
+    return RateLimiter(
+        platform,
+        rate=float(os.getenv(f'{prefix}_REQUESTS_PER_SECOND', str(rate))),
+        burst=int(os.getenv(f'{prefix}_BURST', str(burst))),
+        max_concurrent=int(os.getenv(f'{prefix}_MAX_CONCURRENT', str(concurrent))),
+    )
+
+
+_limiters: Dict[str, RateLimiter] = {}
+
+
+def platform_limiter(platform: str) -> RateLimiter:
+    """Shared limiter for a marketplace, created on first use"""
+    limiter = _limiters.get(platform)
+    if limiter is None:
+        limiter = _limiters[platform] = _limiter_from_env(platform)
+    return limiter
+
+
+def host_limiter(host: str, env_prefix: Optional[str] = None) -> AdaptiveRateLimiter:
+    """
+    Shared adaptive limiter for one host, created on first use
+    Configured via <PREFIX>_INITIAL_RATE, _MIN_RATE, _MAX_RATE, _HOST_MAX_CONCURRENT
+    """
+    key = f'host:{host}'
+    limiter = _limiters.get(key)
+    if limiter is None:
+        initial, low, high, concurrent = HOST_LIMITS.get(host, (1.0, 0.1, 5.0, 2))
+        prefix = (env_prefix or host).upper().replace('.', '_').replace('-', '_')
+        limiter = _limiters[key] = AdaptiveRateLimiter(
+            host,
+            rate=float(os.getenv(f'{prefix}_INITIAL_RATE', str(initial))),
+            min_rate=float(os.getenv(f'{prefix}_MIN_RATE', str(low))),
+            max_rate=float(os.getenv(f'{prefix}_MAX_RATE', str(high))),
+            max_concurrent=int(os.getenv(f'{prefix}_HOST_MAX_CONCURRENT', str(concurrent))),
+        )
+    return limiter
+
+
+def limiter_stats() -> Dict[str, Dict]:
+    return {platform: limiter.stats() for platform, limiter in _limiters.items()}
@@ -1,21 +1,332 @@
 """
 ScraperAPI Client - Uses ScraperAPI to bypass bot detection and fetch HTML
 API handles proxies, CAPTCHAs, and JavaScript rendering automatically
+AsyncScraperAPIClient is the aiohttp version used by the API; it shares a
+concurrency cap and a credit ledger across the process
 """
 import requests
+import aiohttp
+import asyncio
 import logging
-from typing import List, Dict, Optional
+import os
+from typing import Callable, List, Dict, Optional
+from urllib.parse import urlparse
 from bs4 import BeautifulSoup
 import re
 import time
 
+from .http_transport import client_session
+from .rate_limiter import platform_limiter
+
 logger = logging.getLogger(__name__)
 
+SCRAPERAPI_KEY = os.getenv('SCRAPERAPI_KEY', '1396d8d4e3704608f7ba6786c3e0497e')
+SCRAPERAPI_URL = os.getenv('SCRAPERAPI_URL', 'https://api.scraperapi.com').rstrip('/')
+SCRAPERAPI_TIMEOUT_SECONDS = float(os.getenv('SCRAPERAPI_TIMEOUT_SECONDS', '70'))
+# Plan credits available to this deployment (0 = no limit enforced locally)
+SCRAPERAPI_CREDIT_BUDGET = int(os.getenv('SCRAPERAPI_CREDIT_BUDGET', '0'))
+# Try a plain fetch first and only render JavaScript when the page needs it
+SCRAPERAPI_BUDGET_MODE = os.getenv('SCRAPERAPI_BUDGET_MODE', 'true').lower() == 'true'
+# How long a host stays marked as needing rendering before a plain fetch is retried
+SCRAPERAPI_RENDER_MEMORY_SECONDS = float(os.getenv('SCRAPERAPI_RENDER_MEMORY_SECONDS', '3600'))
+
+# Credits per successful request, by request kind (ScraperAPI pricing)
+CREDIT_COSTS = {
+    'basic': int(os.getenv('SCRAPERAPI_BASIC_CREDITS', '1')),
+    'render': int(os.getenv('SCRAPERAPI_RENDER_CREDITS', '10')),
+    'structured': int(os.getenv('SCRAPERAPI_STRUCTURED_CREDITS', '5')),
+}
+
+# ScraperAPI only bills these responses
+BILLED_STATUSES = {200, 404, 410}
+
+
+class CreditLedger:
+    """
+    Running count of ScraperAPI credits spent by this process
+    `budget` caps this process's spending; the account-wide usage and limit from
+    the last sync cap it too, advanced by what this process has spent since
+    """
+    
+    def __init__(self, budget: int = SCRAPERAPI_CREDIT_BUDGET):
+        self.budget = budget
+        self.spent = 0
+        self.by_kind: Dict[str, Dict[str, int]] = {}
+        self.account_used: Optional[int] = None
+        self.account_limit: Optional[int] = None
+        # self.spent when the account usage was last synced
+        self._spent_at_sync = 0
+    
+    def cost(self, kind: str) -> int:
+        return CREDIT_COSTS.get(kind, 1)
+    
+    def account_usage(self) -> Optional[int]:
+        """Account-wide credits used, estimated from the last sync"""
+        if self.account_used is None:
+            return None
+        return self.account_used + self.spent - self._spent_at_sync
+    
+    def remaining(self) -> Optional[int]:
+        limits = []
+        if self.budget:
+            limits.append(self.budget - self.spent)
+        if self.account_limit and self.account_usage() is not None:
+            limits.append(self.account_limit - self.account_usage())
+        return max(min(limits), 0) if limits else None
+    
+    def can_afford(self, kind: str) -> bool:
+        remaining = self.remaining()
+        return remaining is None or self.cost(kind) <= remaining
+    
+    def charge(self, kind: str):
+        credits = self.cost(kind)
+        self.spent += credits
+        entry = self.by_kind.setdefault(kind, {'requests': 0, 'credits': 0})
+        entry['requests'] += 1
+        entry['credits'] += credits
+    
+    async def sync(self, session: aiohttp.ClientSession, api_key: str):
+        """Take the account's real usage and limit from ScraperAPI"""
+        try:
+            async with session.get(f"{SCRAPERAPI_URL}/account", params={'api_key': api_key}) as response:
+                if response.status != 200:
+                    return
+                account = await response.json()
+            if 'requestCount' in account:
+                self.account_used = int(account['requestCount'])
+                self._spent_at_sync = self.spent
+            self.account_limit = int(account.get('requestLimit') or 0) or None
+            logger.info(
+                f"💳 ScraperAPI credits: {self.account_used} used of {self.account_limit or 'unlimited'} "
+                f"on the account, {self.spent} by this process"
+            )
+        except Exception as e:
+            logger.debug(f"Could not sync ScraperAPI account usage: {str(e)}")
+    
+    def stats(self) -> Dict:
+        return {
+            'spent': self.spent,
+            'budget': self.budget or None,
+            'remaining': self.remaining(),
+            'account_used': self.account_usage(),
+            'account_limit': self.account_limit,
+            'by_kind': self.by_kind,
+        }
+
+
+# Shared by every ScraperAPI client in the process
+scraperapi_credits = CreditLedger()
+
+
+def parse_etsy_html(html: str, limit: int = 15) -> List[Dict]:
+    """Listing cards from an Etsy market/search page"""
+    soup = BeautifulSoup(html, 'html.parser')
+    listings = []
+    
+    # Find listing cards with multiple selectors
+    listing_cards = soup.find_all('div', class_='v2-listing-card')
+    if not listing_cards:
+        listing_cards = soup.find_all('div', attrs={'data-listing-id': True})
+    
+    logger.info(f"🎨 [ETSY] Found {len(listing_cards)} listing cards")
+    
+    for card in listing_cards[:limit]:
+        try:
+            # Find title - multiple approaches
+            title_elem = card.find('h2', class_='wt-text-caption') or \
+                        card.find('h3', class_='v2-listing-card__title') or \
+                        card.find('h2', id=lambda x: x and 'listing-title' in x)
+            title = title_elem.text.strip() if title_elem else None
+            
+            # Find price - look for currency-value span
+            price_elem = card.find('span', class_='currency-value')
+            price = None
+            if price_elem:
+                price_text = price_elem.text.strip()
+                # Remove all non-numeric except decimal point
+                clean_price = re.sub(r'[^\d.]', '', price_text)
+                if clean_price:
+                    price = float(clean_price)
+            
+            # Fallback: look in price paragraph
+            if not price:
+                price_p = card.find('p', class_='wt-text-title-01')
+                if price_p:
+                    # Match price pattern like $19.99 or 19.99
+                    price_match = re.search(r'\$?\s*([\d]+[.,]?\d*)', price_p.text.replace(',', ''))
+                    if price_match:
+                        price = float(price_match.group(1))
+            
+            # Validate price is reasonable (between $1 and $5000 for charms)
+            if price and (price < 1 or price > 5000):
+                logger.debug(f"⚠️ Skipping listing with unreasonable price: ${price}")
+                continue
+            
+            # Find URL
+            link_elem = card.find('a', class_='listing-link')
+            url_val = link_elem.get('href') if link_elem else None
+            if url_val and not url_val.startswith('http'):
+                url_val = 'https://www.etsy.com' + url_val
+            
+            # Find image
+            img_elem = card.find('img', {'data-listing-card-listing-image': True})
+            if not img_elem:
+                img_elem = card.find('img', class_='wt-image')
+            image_url = img_elem.get('src') if img_elem else None
+            
+            if title and price and url_val:
+                listings.append({
+                    'platform': 'etsy',
+                    'marketplace': 'Etsy',
+                    'title': title[:200],
+                    'price': price,
+                    'url': url_val,
+                    'condition': 'New',
+                    'seller': 'Etsy Seller',
+                    'image_url': image_url
+                })
+            
+        except Exception as e:
+            logger.debug(f"⚠️ Parse error: {e}")
+            continue
+    
+    return listings
+
+
+def parse_ebay_results(json_data, limit: int = 20) -> List[Dict]:
+    """Listings from ScraperAPI's structured eBay search response"""
+    data = json_data.get('results', []) if isinstance(json_data, dict) else json_data
+    logger.info(f"🛒 [EBAY] Found {len(data)} items")
+    
+    listings = []
+    for item in data[:limit]:
+        try:
+            title = item.get('product_title', '').replace('Opens in a new window or tab', '').strip()
+            if not title:
+                continue
+            
+            # Handle price - can be single value or range
+            item_price = item.get('item_price', {})
+            price = None
+            
+            if isinstance(item_price, dict):
+                if 'value' in item_price:
+                    price = float(item_price['value'])
+                elif 'from' in item_price and isinstance(item_price['from'], dict):
+                    price = float(item_price['from'].get('value', 0))
+            
+            if not price or price <= 0:
+                continue
+            
+            # Validate price is reasonable (between $1 and $2000 for charms)
+            if price > 2000:
+                logger.debug(f"⚠️ Skipping eBay listing with high price: ${price}")
+                continue
+            
+            # Get other fields
+            image_url = item.get('image', '')
+            condition = item.get('condition', 'Used')
+            # ScraperAPI eBay structured data uses 'product_url' field
+            url_val = item.get('product_url', '') or item.get('url', '')
+            
+            # Extract seller info if available
+            seller_info = 'eBay Seller'
+            if item.get('seller_has_top_rated_plus'):
+                seller_info = 'Top Rated Plus Seller'
+            
+            listings.append({
+                'platform': 'ebay',
+                'marketplace': 'eBay',
+                'title': title[:200],
+                'price': price,
+                'url': url_val,
+                'condition': condition,
+                'seller': seller_info,
+                'image_url': image_url
+            })
+            
+        except Exception as e:
+            logger.debug(f"⚠️ Parse error: {e}")
+            continue
+    
+    return listings
+
+
+def convert_poshmark_items(poshmark_results: List[Dict]) -> List[Dict]:
+    """AgentQL Poshmark results in our standardized format"""
+    listings = []
+    for item in poshmark_results:
+        try:
+            price = float(item.get('price', 0))
+            
+            # Validate price is reasonable (between $5 and $2000 for charms)
+            if price < 5 or price > 2000:
+                logger.debug(f"⚠️ Skipping Poshmark listing with unreasonable price: ${price}")
+                continue
+            
+            listings.append({
+                'platform': 'poshmark',
+                'marketplace': 'Poshmark',
+                'title': item.get('title', '')[:200],
+                'price': price,
+                'url': item.get('url', ''),
+                'condition': item.get('condition', 'Pre-owned'),
+                'seller': 'Poshmark Seller',
+                'image_url': item.get('image_url', '')
+            })
+        except Exception as e:
+            logger.debug(f"⚠️ Parse error: {e}")
+            continue
+    return listings
+
+
+def log_totals(results_map: Dict[str, List[Dict]]):
+    total = sum(len(listings) for listings in results_map.values())
+    logger.info(f"\n{'='*60}")
+    logger.info(f"📊 TOTAL: {total} listings found")
+    logger.info(f"   🎨 Etsy: {len(results_map['etsy'])}")
+    logger.info(f"   🛒 eBay: {len(results_map['ebay'])}")
+    logger.info(f"   👗 Poshmark: {len(results_map['poshmark'])}")
+    logger.info(f"{'='*60}\n")
+
+
+async def scrape_poshmark_agentql(charm_name: str, shared_pool: bool = True) -> List[Dict]:
+    """Scrape Poshmark using AgentQL (AI-powered scraping)"""
+    try:
+        logger.info(f"👗 [POSHMARK-AGENTQL] Scraping: {charm_name}")
+        
+        # Import AgentQL scraper
+        try:
+            from scrapers.agentql_scraper import AgentQLMarketplaceScraper
+            from scrapers.browser_pool import BrowserPool
+        except ImportError:
+            logger.warning("⚠️ AgentQL not available, skipping Poshmark")
+            return []
+        
+        # The shared browser pool lives on the API's event loop; any other loop gets its own
+        pool = None if shared_pool else BrowserPool(size=1, max_pages=1)
+        try:
+            # Use AgentQL for Poshmark (handles bot detection better)
+            agentql_scraper = AgentQLMarketplaceScraper(headless=True, pool=pool)
+            poshmark_results = await agentql_scraper.scrape_poshmark(charm_name)
+        finally:
+            if pool:
+                await pool.close()
+        
+        listings = convert_poshmark_items(poshmark_results)
+        
+        logger.info(f"✅ [POSHMARK] Parsed {len(listings)} listings via AgentQL")
+        return listings
+        
+    except Exception as e:
+        logger.error(f"❌ [POSHMARK] Error: {e}")
+        return []
+
 
 class ScraperAPIClient:
     """Client for fetching web pages through ScraperAPI"""
     
-    def __init__(self, api_key='1396d8d4e3704608f7ba6786c3e0497e'):
+    def __init__(self, api_key=SCRAPERAPI_KEY):
         self.api_key = api_key
         self.base_url = 'https://api.scraperapi.com/'
         logger.info(f"🔧 ScraperAPI initialized with key: {api_key[:20]}...")
@@ -41,6 +352,8 @@ class ScraperAPIClient:
             logger.info(f"📡 Fetching: {url}")
             response = requests.get(self.base_url, params=payload, timeout=60)
             
+            if response.status_code in BILLED_STATUSES:
+                scraperapi_credits.charge('render' if render_js else 'basic')
             if response.status_code == 200:
                 logger.info(f"✅ Successfully fetched {len(response.text)} bytes")
                 return response.text
@@ -65,75 +378,7 @@ class ScraperAPIClient:
             if not html:
                 return []
             
-            soup = BeautifulSoup(html, 'html.parser')
-            listings = []
-            
-            # Find listing cards with multiple selectors
-            listing_cards = soup.find_all('div', class_='v2-listing-card')
-            if not listing_cards:
-                listing_cards = soup.find_all('div', attrs={'data-listing-id': True})
-            
-            logger.info(f"🎨 [ETSY] Found {len(listing_cards)} listing cards")
-            
-            for card in listing_cards[:15]:
-                try:
-                    # Find title - multiple approaches
-                    title_elem = card.find('h2', class_='wt-text-caption') or \
-                                card.find('h3', class_='v2-listing-card__title') or \
-                                card.find('h2', id=lambda x: x and 'listing-title' in x)
-                    title = title_elem.text.strip() if title_elem else None
-                    
-                    # Find price - look for currency-value span
-                    price_elem = card.find('span', class_='currency-value')
-                    price = None
-                    if price_elem:
-                        price_text = price_elem.text.strip()
-                        # Remove all non-numeric except decimal point
-                        clean_price = re.sub(r'[^\d.]', '', price_text)
-                        if clean_price:
-                            price = float(clean_price)
-                    
-                    # Fallback: look in price paragraph
-                    if not price:
-                        price_p = card.find('p', class_='wt-text-title-01')
-                        if price_p:
-                            # Match price pattern like $19.99 or 19.99
-                            price_match = re.search(r'\$?\s*([\d]+[.,]?\d*)', price_p.text.replace(',', ''))
-                            if price_match:
-                                price = float(price_match.group(1))
-                    
-                    # Validate price is reasonable (between $1 and $5000 for charms)
-                    if price and (price < 1 or price > 5000):
-                        logger.debug(f"⚠️ Skipping listing with unreasonable price: ${price}")
-                        continue
-                    
-                    # Find URL
-                    link_elem = card.find('a', class_='listing-link')
-                    url_val = link_elem.get('href') if link_elem else None
-                    if url_val and not url_val.startswith('http'):
-                        url_val = 'https://www.etsy.com' + url_val
-                    
-                    # Find image
-                    img_elem = card.find('img', {'data-listing-card-listing-image': True})
-                    if not img_elem:
-                        img_elem = card.find('img', class_='wt-image')
-                    image_url = img_elem.get('src') if img_elem else None
-                    
-                    if title and price and url_val:
-                        listings.append({
-                            'platform': 'etsy',
-                            'marketplace': 'Etsy',
-                            'title': title[:200],
-                            'price': price,
-                            'url': url_val,
-                            'condition': 'New',
-                            'seller': 'Etsy Seller',
-                            'image_url': image_url
-                        })
-                    
-                except Exception as e:
-                    logger.debug(f"⚠️ Parse error: {e}")
-                    continue
+            listings = parse_etsy_html(html)
             
             logger.info(f"✅ [ETSY] Parsed {len(listings)} listings")
             return listings
@@ -166,61 +411,8 @@ class ScraperAPIClient:
                 logger.error(f"❌ [EBAY] API returned status {response.status_code}")
                 return []
             
-            # Parse JSON response
-            json_data = response.json()
-            data = json_data.get('results', []) if isinstance(json_data, dict) else json_data
-            logger.info(f"🛒 [EBAY] Found {len(data)} items")
-            
-            listings = []
-            for item in data[:20]:
-                try:
-                    title = item.get('product_title', '').replace('Opens in a new window or tab', '').strip()
-                    if not title:
-                        continue
-                    
-                    # Handle price - can be single value or range
-                    item_price = item.get('item_price', {})
-                    price = None
-                    
-                    if isinstance(item_price, dict):
-                        if 'value' in item_price:
-                            price = float(item_price['value'])
-                        elif 'from' in item_price and isinstance(item_price['from'], dict):
-                            price = float(item_price['from'].get('value', 0))
-                    
-                    if not price or price <= 0:
-                        continue
-                    
-                    # Validate price is reasonable (between $1 and $2000 for charms)
-                    if price > 2000:
-                        logger.debug(f"⚠️ Skipping eBay listing with high price: ${price}")
-                        continue
-                    
-                    # Get other fields
-                    image_url = item.get('image', '')
-                    condition = item.get('condition', 'Used')
-                    # ScraperAPI eBay structured data uses 'product_url' field
-                    url_val = item.get('product_url', '') or item.get('url', '')
-                    
-                    # Extract seller info if available
-                    seller_info = 'eBay Seller'
-                    if item.get('seller_has_top_rated_plus'):
-                        seller_info = 'Top Rated Plus Seller'
-                    
-                    listings.append({
-                        'platform': 'ebay',
-                        'marketplace': 'eBay',
-                        'title': title[:200],
-                        'price': price,
-                        'url': url_val,
-                        'condition': condition,
-                        'seller': seller_info,
-                        'image_url': image_url
-                    })
-                    
-                except Exception as e:
-                    logger.debug(f"⚠️ Parse error: {e}")
-                    continue
+            scraperapi_credits.charge('structured')
+            listings = parse_ebay_results(response.json())
             
             logger.info(f"✅ [EBAY] Parsed {len(listings)} listings")
             return listings
@@ -231,51 +423,7 @@ class ScraperAPIClient:
     
     def scrape_poshmark(self, charm_name: str) -> List[Dict]:
         """Scrape Poshmark using AgentQL (AI-powered scraping)"""
-        try:
-            logger.info(f"👗 [POSHMARK-AGENTQL] Scraping: {charm_name}")
-            
-            # Import AgentQL scraper
-            try:
-                from scrapers.agentql_scraper import AgentQLMarketplaceScraper
-            except ImportError:
-                logger.warning("⚠️ AgentQL not available, skipping Poshmark")
-                return []
-            
-            # Use AgentQL for Poshmark (handles bot detection better)
-            agentql_scraper = AgentQLMarketplaceScraper(headless=True)
-            poshmark_results = agentql_scraper.scrape_poshmark(charm_name)
-            
-            # Convert to our standardized format
-            listings = []
-            for item in poshmark_results:
-                try:
-                    price = float(item.get('price', 0))
-                    
-                    # Validate price is reasonable (between $5 and $2000 for charms)
-                    if price < 5 or price > 2000:
-                        logger.debug(f"⚠️ Skipping Poshmark listing with unreasonable price: ${price}")
-                        continue
-                    
-                    listings.append({
-                        'platform': 'poshmark',
-                        'marketplace': 'Poshmark',
-                        'title': item.get('title', '')[:200],
-                        'price': price,
-                        'url': item.get('url', ''),
-                        'condition': item.get('condition', 'Pre-owned'),
-                        'seller': 'Poshmark Seller',
-                        'image_url': item.get('image_url', '')
-                    })
-                except Exception as e:
-                    logger.debug(f"⚠️ Parse error: {e}")
-                    continue
-            
-            logger.info(f"✅ [POSHMARK] Parsed {len(listings)} listings via AgentQL")
-            return listings
-            
-        except Exception as e:
-            logger.error(f"❌ [POSHMARK] Error: {e}")
-            return []
+        return asyncio.run(scrape_poshmark_agentql(charm_name, shared_pool=False))
     
     def scrape_all(self, charm_name: str) -> List[Dict]:
         """Scrape all marketplaces for a charm in parallel for faster results"""
@@ -308,16 +456,157 @@ class ScraperAPIClient:
                 except Exception as e:
                     logger.error(f"❌ Error scraping {platform}: {e}")
         
-        logger.info(f"\n{'='*60}")
-        logger.info(f"📊 TOTAL: {len(all_listings)} listings found")
-        logger.info(f"   🎨 Etsy: {len(results_map['etsy'])}")
-        logger.info(f"   🛒 eBay: {len(results_map['ebay'])}")
-        logger.info(f"   👗 Poshmark: {len(results_map['poshmark'])}")
-        logger.info(f"{'='*60}\n")
-        
+        log_totals(results_map)
         return all_listings
 
 
+
+class AsyncScraperAPIClient:
+    """
+    aiohttp client for ScraperAPI
+    Requests share the 'scraperapi' concurrency cap (SCRAPERAPI_MAX_CONCURRENT)
+    and are charged to `scraperapi_credits`
+    """
+    
+    def __init__(self, api_key: str = SCRAPERAPI_KEY, budget_mode: bool = SCRAPERAPI_BUDGET_MODE):
+        self.api_key = api_key
+        self.budget_mode = budget_mode
+        self.ledger = scraperapi_credits
+        self._session: Optional[aiohttp.ClientSession] = None
+        # host -> time until which plain fetches are skipped because they came back unusable
+        self._render_needed: Dict[str, float] = {}
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = client_session(
+                timeout=aiohttp.ClientTimeout(total=SCRAPERAPI_TIMEOUT_SECONDS)
+            )
+        return self._session
+    
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+    
+    async def sync_credits(self):
+        await self.ledger.sync(self._get_session(), self.api_key)
+    
+    async def _request(self, endpoint: str, params: Dict, kind: str, as_json: bool = False):
+        """One billed ScraperAPI request; None when it failed or the budget is spent"""
+        if not self.ledger.can_afford(kind):
+            logger.warning(f"💳 ScraperAPI credit budget exhausted, skipping {kind} request")
+            return None
+        try:
+            async with platform_limiter('scraperapi'):
+                async with self._get_session().get(
+                    f"{SCRAPERAPI_URL}{endpoint}",
+                    params={'api_key': self.api_key, **params}
+                ) as response:
+                    if response.status in BILLED_STATUSES:
+                        self.ledger.charge(kind)
+                    if response.status != 200:
+                        logger.error(f"❌ ScraperAPI returned status {response.status}")
+                        return None
+                    return await response.json(content_type=None) if as_json else await response.text()
+        except Exception as e:
+            logger.error(f"❌ Error fetching from ScraperAPI: {str(e)}")
+            return None
+    
+    async def fetch_page(
+        self,
+        url: str,
+        render_js: bool = True,
+        is_enough: Optional[Callable[[str], bool]] = None
+    ) -> Optional[str]:
+        """
+        Fetch HTML through ScraperAPI
+        In budget mode a rendered fetch is first tried without rendering; the
+        rendered fetch (10x the credits) only runs if `is_enough` rejects the page
+        """
+        host = urlparse(url).netloc
+        try_plain = (
+            render_js and self.budget_mode and is_enough is not None
+            and self._render_needed.get(host, 0) <= time.monotonic()
+        )
+        if try_plain:
+            html = await self._request('/', {'url': url, 'render': 'false'}, 'basic')
+            if html and is_enough(html):
+                logger.info(f"📡 Plain fetch was enough for {host} ({len(html)} bytes)")
+                return html
+            # Only a page that arrived but was unusable says the host needs rendering;
+            # a timeout, error status or spent budget says nothing about the page
+            if html is not None:
+                self._render_needed[host] = time.monotonic() + SCRAPERAPI_RENDER_MEMORY_SECONDS
+        
+        kind = 'render' if render_js else 'basic'
+        logger.info(f"📡 Fetching: {url} ({kind})")
+        html = await self._request('/', {'url': url, 'render': 'true' if render_js else 'false'}, kind)
+        if html:
+            logger.info(f"✅ Successfully fetched {len(html)} bytes")
+        return html
+    
+    async def scrape_etsy(self, charm_name: str) -> List[Dict]:
+        """Scrape Etsy marketplace using ScraperAPI"""
+        try:
+            formatted_term = charm_name.lower().replace(' ', '_')
+            url = f"https://www.etsy.com/market/{formatted_term}"
+            
+            logger.info(f"🎨 [ETSY] Scraping: {charm_name}")
+            html = await self.fetch_page(url, render_js=True, is_enough=lambda page: bool(parse_etsy_html(page)))
+            listings = parse_etsy_html(html) if html else []
+            logger.info(f"✅ [ETSY] Parsed {len(listings)} listings")
+            return listings
+            
+        except Exception as e:
+            logger.error(f"❌ [ETSY] Error: {e}")
+            return []
+    
+    async def scrape_ebay(self, charm_name: str) -> List[Dict]:
+        """Scrape eBay using ScraperAPI's structured endpoint"""
+        try:
+            logger.info(f"🛒 [EBAY] Scraping: {charm_name}")
+            json_data = await self._request(
+                '/structured/ebay/search/v2',
+                {'query': charm_name.lower().replace(' ', '-')},
+                'structured',
+                as_json=True
+            )
+            listings = parse_ebay_results(json_data) if json_data else []
+            logger.info(f"✅ [EBAY] Parsed {len(listings)} listings")
+            return listings
+            
+        except Exception as e:
+            logger.error(f"❌ [EBAY] Error: {e}")
+            return []
+    
+    async def scrape_poshmark(self, charm_name: str) -> List[Dict]:
+        """Poshmark via AgentQL in the shared browser pool (not billed by ScraperAPI)"""
+        return await scrape_poshmark_agentql(charm_name)
+    
+    async def scrape_all(self, charm_name: str) -> List[Dict]:
+        """Scrape all marketplaces for a charm concurrently"""
+        logger.info(f"🔍 Scraping all marketplaces for: {charm_name}")
+        platforms = ('etsy', 'ebay', 'poshmark')
+        results = await asyncio.gather(
+            self.scrape_etsy(charm_name),
+            self.scrape_ebay(charm_name),
+            self.scrape_poshmark(charm_name),
+            return_exceptions=True
+        )
+        results_map = {}
+        for platform, listings in zip(platforms, results):
+            if isinstance(listings, Exception):
+                logger.error(f"❌ Error scraping {platform}: {listings}")
+                listings = []
+            results_map[platform] = listings
+        
+        log_totals(results_map)
+        return [listing for platform in platforms for listing in results_map[platform]]
+
+
+# Shared async client (one HTTP session for the process)
+scraperapi_client = AsyncScraperAPIClient()
+
+
 # Test function
 if __name__ == "__main__":
     import json
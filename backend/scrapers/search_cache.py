@@ -0,0 +1,183 @@
+"""
+Marketplace Search Cache for CharmTracker
+TTL cache in front of each scraper's search, keyed by platform and normalized
+query; empty results are cached briefly. Memory first, optional MongoDB
+collection so entries survive a restart.
+"""
+
+import functools
+import inspect
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE_ENABLED = os.getenv('SEARCH_CACHE_ENABLED', 'true').lower() == 'true'
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', '5000'))
+SEARCH_CACHE_NEGATIVE_TTL = float(os.getenv('SEARCH_CACHE_NEGATIVE_TTL', '120'))
+SEARCH_CACHE_COLLECTION = os.getenv('SEARCH_CACHE_COLLECTION', 'search_cache')
+
+# Seconds a non-empty result stays fresh, per platform
+DEFAULT_TTLS = {
+    'ebay': 900,
+    'ebay_api': 900,
+    'etsy': 1800,
+    'poshmark': 3600,      # Each miss starts a paid Apify run
+    'james_avery': 21600,
+    'james_avery_product': 21600,
+    'scraperapi': 3600,    # Paid credits per request
+}
+
+_PUNCTUATION = re.compile(r'[^\w\s-]')
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return ' '.join(_PUNCTUATION.sub(' ', (query or '').lower()).split())
+
+
+def platform_ttl(platform: str) -> float:
+    default = DEFAULT_TTLS.get(platform, 900)
+    return float(os.getenv(f'{platform.upper()}_SEARCH_TTL_SECONDS', str(default)))
+
+
+def is_empty_result(value: Any) -> bool:
+    """True for an empty list, an empty {'listings': [...]} result or None"""
+    if isinstance(value, dict) and 'listings' in value:
+        return not value['listings']
+    return not value
+
+
+class SearchCache:
+    """In-process LRU with expiry, optionally mirrored to MongoDB"""
+
+    def __init__(self, max_entries: int = SEARCH_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Optional[int], Any]]" = OrderedDict()
+        self.collection = None
+        self.hits = 0
+        self.misses = 0
+
+    async def attach(self, db):
+        """Persist entries in MongoDB (expired documents are removed by a TTL index)"""
+        if not SEARCH_CACHE_COLLECTION:
+            return
+        try:
+            self.collection = db[SEARCH_CACHE_COLLECTION]
+            await self.collection.create_index('expires_at', expireAfterSeconds=0)
+            logger.info(f"🗃️  Search cache persisted to '{SEARCH_CACHE_COLLECTION}'")
+        except Exception as e:
+            logger.error(f"Error setting up search cache collection: {str(e)}")
+            self.collection = None
+
+    async def get(self, platform: str, query: str, limit: Optional[int] = None) -> Tuple[bool, Any]:
+        key = (platform, normalize_query(query))
+        entry = self._entries.get(key)
+        if entry is None and self.collection is not None:
+            entry = await self._load(key)
+        if entry is not None:
+            expires_at, cached_limit, value = entry
+            # A result fetched with a smaller limit cannot answer a bigger request
+            enough = limit is None or cached_limit is None or cached_limit >= limit
+            if expires_at > time.time() and enough:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                if limit is not None and isinstance(value, list):
+                    value = value[:limit]
+                elif limit is not None and isinstance(value, dict) and isinstance(value.get('listings'), list):
+                    value = {**value, 'listings': value['listings'][:limit]}
+                return True, value
+        self.misses += 1
+        return False, None
+
+    async def put(
+        self,
+        platform: str,
+        query: str,
+        value: Any,
+        limit: Optional[int] = None,
+        ttl: Optional[float] = None
+    ):
+        key = (platform, normalize_query(query))
+        if ttl is None:
+            ttl = SEARCH_CACHE_NEGATIVE_TTL if is_empty_result(value) else platform_ttl(platform)
+        expires_at = time.time() + ttl
+        self._entries[key] = (expires_at, limit, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        if self.collection is not None:
+            try:
+                await self.collection.update_one(
+                    {'_id': f'{key[0]}:{key[1]}'},
+                    {'$set': {
+                        'platform': key[0],
+                        'query': key[1],
+                        'limit': limit,
+                        'value': value,
+                        'expires_at': datetime.utcnow() + timedelta(seconds=ttl),
+                    }},
+                    upsert=True
+                )
+            except Exception as e:
+                logger.debug(f"Could not persist search cache entry {key}: {str(e)}")
+
+    async def _load(self, key: Tuple[str, str]) -> Optional[Tuple[float, Optional[int], Any]]:
+        try:
+            doc = await self.collection.find_one({'_id': f'{key[0]}:{key[1]}'})
+        except Exception as e:
+            logger.debug(f"Could not read search cache entry {key}: {str(e)}")
+            return None
+        if not doc or doc['expires_at'] <= datetime.utcnow():
+            return None
+        remaining = (doc['expires_at'] - datetime.utcnow()).total_seconds()
+        entry = (time.time() + remaining, doc.get('limit'), doc.get('value'))
+        self._entries[key] = entry
+        return entry
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0,
+            'persisted': self.collection is not None,
+        }
+
+
+# Shared cache for every scraper in the process
+search_cache = SearchCache()
+
+
+def cached_search(platform: str):
+    """
+    Decorator for `async def search(self, charm_name, limit=...)` scraper methods
+    A None result (an error or an open circuit) is returned but never cached
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        
+        @functools.wraps(func)
+        async def wrapper(self, charm_name: str, *args, **kwargs):
+            if not SEARCH_CACHE_ENABLED:
+                return await func(self, charm_name, *args, **kwargs)
+            bound = signature.bind(self, charm_name, *args, **kwargs)
+            bound.apply_defaults()
+            limit = bound.arguments.get('limit')
+            hit, value = await search_cache.get(platform, charm_name, limit)
+            if hit:
+                logger.debug(f"🗃️  [{platform}] Cache hit for '{charm_name}'")
+                return value
+            value = await func(self, charm_name, *args, **kwargs)
+            if value is not None:
+                await search_cache.put(platform, charm_name, value, limit)
+            return value
+        return wrapper
+    return decorator
@@ -18,6 +18,10 @@ from routes.scraper import router as scraper_router
 
 # Import scheduler
 from services.scheduler import start_scheduler, stop_scheduler
+from services.catalog_engine import catalog_engine
+from services.catalog_snapshot import snapshot_reader
+from scrapers.search_cache import search_cache
+from scrapers.product_resolver import ja_products
 
 
 ROOT_DIR = Path(__file__).parent
@@ -146,6 +150,15 @@ async def startup_event():
         await start_scheduler(db)
         logger.info("✅ Background scheduler started successfully")
         
+        # Load the in-memory catalog used by /api/charms
+        # (shared memory-mapped snapshot when configured, MongoDB otherwise)
+        if not snapshot_reader.load_latest(catalog_engine):
+            await catalog_engine.load(db)
+        
+        # Keep marketplace search results across restarts
+        await search_cache.attach(db)
+        await ja_products.attach(db)
+        
         # NOTE: Removed automatic scraping on startup
         # Use add_fallback_listings.py script to populate data manually
         # Or trigger updates via API: POST /api/scraper/update-all
@@ -163,5 +176,14 @@ async def shutdown_event():
     except Exception as e:
         logger.error(f"Error stopping scheduler: {str(e)}")
     
+    try:
+        from scrapers.browser_pool import browser_pool
+        await browser_pool.close()
+    except ImportError:
+        pass  # Playwright not installed
+    
+    from services.pipeline import shutdown_pools
+    shutdown_pools()
+    
     client.close()
     logger.info("MongoDB connection closed")
\ No newline at end of file
@@ -0,0 +1,151 @@
+"""
+Broad-Crawl Marketplace Mode for CharmTracker
+Pages through a platform's general James Avery charm results once per cycle,
+assigns each listing to catalog charms by title and seeds the search cache,
+so per-charm searches in the same cycle are answered without network calls
+"""
+
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from scrapers.circuit_breaker import circuit_breaker
+from scrapers.etsy_scraper import etsy_scraper
+from scrapers.rate_limiter import platform_limiter
+from scrapers.search_cache import SEARCH_CACHE_NEGATIVE_TTL, platform_ttl, search_cache
+from services.title_matcher import CharmMatcher
+from services.variant_groups import GROUP_VARIANT_SEARCHES, group_charms, variant_query
+
+logger = logging.getLogger(__name__)
+
+BROAD_CRAWL_ENABLED = os.getenv('BROAD_CRAWL_ENABLED', 'false').lower() == 'true'
+BROAD_CRAWL_PLATFORMS = [
+    p.strip() for p in os.getenv('BROAD_CRAWL_PLATFORMS', 'ebay,etsy').split(',') if p.strip()
+]
+BROAD_CRAWL_QUERY = os.getenv('BROAD_CRAWL_QUERY', 'charm')
+BROAD_CRAWL_MAX_PAGES = int(os.getenv('BROAD_CRAWL_MAX_PAGES', '40'))
+# Below this many due charms, individual searches are cheaper than a crawl
+BROAD_CRAWL_MIN_CHARMS = int(os.getenv('BROAD_CRAWL_MIN_CHARMS', '50'))
+
+ETSY_PAGE_SIZE = 100
+
+# Cache namespace the aggregator's per-charm search reads for each platform
+CACHE_PLATFORMS = {'ebay': 'ebay_api', 'etsy': 'etsy'}
+# Circuit breaker guarding the backend each platform's crawl pages through
+CRAWL_BREAKERS = {'ebay': 'ebay_api', 'etsy': 'etsy'}
+
+MATCHER_PROJECTION = {'_id': 0, 'id': 1, 'name': 1, 'sku': 1, 'url': 1, 'james_avery_url': 1, 'aliases': 1}
+
+
+def _page_fetchers(aggregator) -> Dict[str, Callable[[int], Awaitable[List[Dict]]]]:
+    """platform -> fetch(page_index) returning that page's listings"""
+    fetchers = {}
+    if getattr(aggregator, 'ebay_client', None):
+        fetchers['ebay'] = lambda page: aggregator.ebay_client._search_listings(BROAD_CRAWL_QUERY, page=page + 1)
+    if etsy_scraper.use_api:
+        fetchers['etsy'] = lambda page: etsy_scraper._search_api(
+            BROAD_CRAWL_QUERY, ETSY_PAGE_SIZE, offset=page * ETSY_PAGE_SIZE
+        )
+    return fetchers
+
+
+async def crawl_platform(
+    platform: str,
+    fetch: Callable[[int], Awaitable[List[Dict]]]
+) -> Tuple[List[Dict], bool]:
+    """
+    Fetch result pages until one comes back empty
+    Returns (listings, complete); complete is False when BROAD_CRAWL_MAX_PAGES cut it short
+    """
+    listings: List[Dict] = []
+    seen = set()
+    for page in range(BROAD_CRAWL_MAX_PAGES):
+        async with platform_limiter(platform):
+            batch = await fetch(page)
+        new = [l for l in batch or [] if l.get('url') not in seen]
+        if not new:
+            return listings, True
+        seen.update(l.get('url') for l in new)
+        listings.extend(new)
+    return listings, False
+
+
+def variant_group_results(charms: List[Dict], assigned: Dict[str, List[Dict]]) -> Dict[str, List[Dict]]:
+    """
+    Listings keyed by the shared query the aggregator searches for each group of
+    metal variants (see variant_groups), merged across the group without duplicates
+    """
+    results = {}
+    for group in group_charms(charm for charm in charms if charm.get('name')):
+        if len(group) < 2:
+            continue
+        merged, seen = [], set()
+        for charm in group:
+            for listing in assigned.get(charm['id'], []):
+                key = listing.get('url') or id(listing)
+                if key not in seen:
+                    seen.add(key)
+                    merged.append(listing)
+        results[variant_query(group[0]['name'])] = merged
+    return results
+
+
+async def broad_crawl(db, aggregator, platforms: Optional[List[str]] = None) -> Dict:
+    """
+    Crawl each platform once, match listings to charms and cache the result
+    for every charm that matched. Charms with no matching listing are cached as
+    empty (briefly) only when the crawl saw every result page; otherwise they
+    are left to their own searches
+    """
+    started = time.perf_counter()
+    charms = await db.charms.find({}, MATCHER_PROJECTION).to_list(length=None)
+    if not charms:
+        return {}
+    matcher = CharmMatcher(charms)
+    fetchers = _page_fetchers(aggregator)
+
+    stats = {}
+    for platform in platforms or BROAD_CRAWL_PLATFORMS:
+        fetch = fetchers.get(platform)
+        if not fetch:
+            logger.info(f"🕸️  Broad crawl not available for {platform}")
+            continue
+        if not circuit_breaker(CRAWL_BREAKERS[platform]).allow():
+            logger.info(f"🕸️  Broad crawl {platform} skipped, circuit open")
+            continue
+        try:
+            listings, complete = await crawl_platform(platform, fetch)
+            if not listings:
+                # Probably an outage; leave per-charm searches to run as usual
+                logger.warning(f"🕸️  Broad crawl {platform} returned nothing, skipping")
+                continue
+            assigned = matcher.assign(listings)
+            cache_platform = CACHE_PLATFORMS[platform]
+            ttl = platform_ttl(cache_platform)
+            for charm in charms:
+                charm_listings = assigned.get(charm['id'])
+                if charm_listings:
+                    await search_cache.put(cache_platform, charm['name'], charm_listings, ttl=ttl)
+                elif complete:
+                    await search_cache.put(cache_platform, charm['name'], [], ttl=SEARCH_CACHE_NEGATIVE_TTL)
+            # Grouped updates search once under the variants' shared query
+            if GROUP_VARIANT_SEARCHES:
+                for query, group_listings in variant_group_results(charms, assigned).items():
+                    if group_listings:
+                        await search_cache.put(cache_platform, query, group_listings, ttl=ttl)
+                    elif complete:
+                        await search_cache.put(cache_platform, query, [], ttl=SEARCH_CACHE_NEGATIVE_TTL)
+            matched = {id(l) for group in assigned.values() for l in group}
+            stats[platform] = {
+                'listings': len(listings),
+                'matched_listings': len(matched),
+                'charms_with_listings': len(assigned),
+                'complete': complete,
+            }
+            logger.info(f"🕸️  Broad crawl {platform}: {stats[platform]}")
+        except Exception as e:
+            logger.error(f"Error in broad crawl for {platform}: {str(e)}")
+
+    stats['duration_seconds'] = round(time.perf_counter() - started, 2)
+    return stats
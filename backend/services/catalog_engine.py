@@ -0,0 +1,379 @@
+"""
+Columnar In-Memory Catalog for CharmTracker
+Serves /api/charms filter, sort and pagination from NumPy columns
+"""
+
+import asyncio
+import logging
+import os
+import re
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from models.charm import CharmListResponse
+
+logger = logging.getLogger(__name__)
+
+# Full reload interval - catches writes made outside this process (scripts, other workers)
+CATALOG_RELOAD_SECONDS = int(os.getenv('CATALOG_RELOAD_SECONDS', '300'))
+
+# Fields needed to build list rows
+CATALOG_PROJECTION = {
+    '_id': 0,
+    'id': 1,
+    'name': 1,
+    'material': 1,
+    'status': 1,
+    'avg_price': 1,
+    'price_change_7d': 1,
+    'popularity': 1,
+    'images': 1,
+    'last_updated': 1,
+}
+
+NUMERIC_COLUMNS = ('price', 'popularity', 'change_7d', 'material_code', 'status_code', 'alive')
+
+ORDER_KEYS = ('price_asc', 'price_desc', 'popularity', 'name')
+
+# Searches containing any of these are treated as regular expressions
+REGEX_CHARS = re.compile(r'[.^$*+?{}\[\]\\|()]')
+
+
+class OverlayList:
+    """List-like view over a snapshot column that accepts local writes"""
+
+    def __init__(self, base_len: int, getter: Callable[[int], object]):
+        self._base_len = base_len
+        self._getter = getter
+        self._changed: Dict[int, object] = {}
+        self._appended: List[object] = []
+
+    def __len__(self):
+        return self._base_len + len(self._appended)
+
+    def __getitem__(self, index):
+        index = int(index)
+        if index in self._changed:
+            return self._changed[index]
+        if index < self._base_len:
+            return self._getter(index)
+        return self._appended[index - self._base_len]
+
+    def __setitem__(self, index, value):
+        index = int(index)
+        if index < self._base_len:
+            self._changed[index] = value
+        else:
+            self._appended[index - self._base_len] = value
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def append(self, value):
+        self._appended.append(value)
+
+
+class CatalogEngine:
+    """Columnar catalog with pre-sorted index permutations"""
+
+    def __init__(self, capacity: int = 1024):
+        self.loaded = False
+        self.loaded_at = 0.0
+        self.version = 0
+        self.snapshot_version: Optional[int] = None
+        self._loading: Optional[asyncio.Task] = None
+        self._reset(capacity)
+
+    def _reset(self, capacity: int):
+        self.size = 0
+        self.row_of: Dict[str, int] = {}
+        self.records: List[Optional[Dict]] = []
+        self.names: List[str] = []
+        self.names_lower: List[str] = []
+        self.price = np.zeros(capacity, dtype=np.float64)
+        self.popularity = np.zeros(capacity, dtype=np.float64)
+        self.change_7d = np.zeros(capacity, dtype=np.float64)
+        self.material_code = np.zeros(capacity, dtype=np.int16)
+        self.status_code = np.zeros(capacity, dtype=np.int16)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.material_codes: Dict[str, int] = {}
+        self.status_codes: Dict[str, int] = {}
+        self._orders: Dict[str, np.ndarray] = {}
+        self._lower_array: Optional[np.ndarray] = None
+        self._search_masks: Dict[str, np.ndarray] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self.loaded
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self.loaded_at > CATALOG_RELOAD_SECONDS
+
+    # ------------------------------------------------------------------
+    # Loading and incremental updates
+    # ------------------------------------------------------------------
+
+    async def load(self, db):
+        """Rebuild the catalog from MongoDB"""
+        started = time.perf_counter()
+        docs = await db.charms.find({}, CATALOG_PROJECTION).to_list(length=None)
+        self.load_documents(docs)
+        logger.info(
+            f"📚 Catalog loaded: {self.size} charms in "
+            f"{(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+
+    def load_documents(self, docs: List[Dict]):
+        """Replace the catalog contents with the given charm documents"""
+        self._reset(max(1024, len(docs)))
+        for doc in docs:
+            self._upsert(doc)
+        self._rebuild_orders()
+        self.loaded = True
+        self.loaded_at = time.monotonic()
+
+    def reload_in_background(self, db):
+        """Start a full reload unless one is already running"""
+        if self._loading and not self._loading.done():
+            return
+        self._loading = asyncio.create_task(self._safe_load(db))
+
+    async def _safe_load(self, db):
+        try:
+            await self.load(db)
+        except Exception as e:
+            logger.error(f"Error loading catalog: {str(e)}")
+
+    async def refresh_charm(self, db, charm_id: str):
+        """Re-read one charm after a write and apply it to the catalog"""
+        await self.refresh_charms(db, [charm_id])
+
+    async def refresh_charms(self, db, charm_ids: List[str]):
+        """Re-read a batch of written charms in one query; orders are invalidated once"""
+        charm_ids = [charm_id for charm_id in charm_ids if charm_id]
+        if not self.loaded or not charm_ids:
+            return
+        try:
+            docs = await db.charms.find({'id': {'$in': charm_ids}}, CATALOG_PROJECTION).to_list(length=None)
+            self.upsert_many(docs)
+            found = {doc.get('id') for doc in docs}
+            self.remove_many([charm_id for charm_id in charm_ids if charm_id not in found])
+        except Exception as e:
+            logger.error(f"Error refreshing {len(charm_ids)} catalog entries: {str(e)}")
+
+    def upsert(self, doc: Dict):
+        """Insert or update one charm document"""
+        self.upsert_many([doc])
+
+    def upsert_many(self, docs: List[Dict]):
+        """Insert or update charm documents"""
+        if not self.loaded:
+            return
+        changed = [self._upsert(doc) for doc in docs]
+        if any(changed):
+            self._orders.clear()
+            self.version += 1
+
+    def remove(self, charm_id: str):
+        self.remove_many([charm_id])
+
+    def remove_many(self, charm_ids: List[str]):
+        rows = [self.row_of[charm_id] for charm_id in charm_ids if charm_id in self.row_of]
+        if not rows:
+            return
+        self._ensure_writable()
+        for row in rows:
+            self.alive[row] = False
+            self.records[row] = None
+        self._orders.clear()
+        self.version += 1
+
+    def _code(self, table: Dict[str, int], value) -> int:
+        value = value or ''
+        if value not in table:
+            table[value] = len(table)
+        return table[value]
+
+    def attach_snapshot(self, snapshot):
+        """
+        Serve from a memory-mapped CatalogSnapshot
+        Columns are zero-copy views; local writes copy them on first use
+        """
+        n = snapshot.count
+        self.size = n
+        self.row_of = {snapshot.string('id', row): row for row in range(n)}
+        self.records = snapshot.records()
+        self.names = snapshot.string_column('name')
+        lower = snapshot.columns['names_lower']
+        self.names_lower = OverlayList(n, lambda row: lower[row].decode('utf-8'))
+        for column in ('price', 'popularity', 'change_7d', 'material_code', 'status_code'):
+            setattr(self, column, snapshot.columns[column])
+        self.alive = np.ones(n, dtype=bool)
+        self.material_codes = dict(snapshot.material_codes)
+        self.status_codes = dict(snapshot.status_codes)
+        self._orders = {
+            key: snapshot.columns[f'order_{key}']
+            for key in ORDER_KEYS
+        }
+        self._lower_array = snapshot.columns['names_lower']
+        self._search_masks = {}
+        self.snapshot_version = snapshot.version
+        self.loaded = True
+        self.loaded_at = time.monotonic()
+        self.version += 1
+
+    def _ensure_writable(self):
+        """Copy read-only snapshot columns before the first local write"""
+        for column in NUMERIC_COLUMNS:
+            array = getattr(self, column)
+            if not array.flags.writeable:
+                setattr(self, column, array.copy())
+
+    def _grow(self):
+        capacity = max(len(self.price) * 2, 1024)
+        for column in NUMERIC_COLUMNS:
+            old = getattr(self, column)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, column, new)
+
+    def _upsert(self, doc: Dict) -> bool:
+        try:
+            record = CharmListResponse(
+                id=doc['id'],
+                name=doc['name'],
+                material=doc['material'],
+                status=doc['status'],
+                avg_price=doc['avg_price'],
+                price_change_7d=doc['price_change_7d'],
+                popularity=doc['popularity'],
+                images=doc['images'],
+                last_updated=doc['last_updated'],
+            ).dict()
+        except Exception as e:
+            logger.debug(f"Skipping catalog row {doc.get('id')}: {str(e)}")
+            return False
+
+        self._ensure_writable()
+        row = self.row_of.get(record['id'])
+        if row is None:
+            if self.size == len(self.price):
+                self._grow()
+            row = self.size
+            self.size += 1
+            self.row_of[record['id']] = row
+            self.records.append(record)
+            self.names.append(record['name'])
+            self.names_lower.append(record['name'].lower())
+        else:
+            self.records[row] = record
+            self.names[row] = record['name']
+            self.names_lower[row] = record['name'].lower()
+
+        self.price[row] = record['avg_price']
+        self.popularity[row] = record['popularity']
+        self.change_7d[row] = record['price_change_7d']
+        self.material_code[row] = self._code(self.material_codes, record['material'])
+        self.status_code[row] = self._code(self.status_codes, record['status'])
+        self.alive[row] = True
+        self._lower_array = None
+        self._search_masks.clear()
+        return True
+
+    def _rebuild_orders(self):
+        self._orders = {key: self._build_order(key) for key in ORDER_KEYS}
+
+    def _build_order(self, key: str) -> np.ndarray:
+        n = self.size
+        if key == 'price_asc':
+            return np.argsort(self.price[:n], kind='stable')
+        if key == 'price_desc':
+            return np.argsort(-self.price[:n], kind='stable')
+        if key == 'name':
+            return np.argsort(np.array(list(self.names), dtype=str), kind='stable')
+        return np.argsort(-self.popularity[:n], kind='stable')
+
+    def _order(self, key: str) -> np.ndarray:
+        """Sort permutation for one key, rebuilt on first use after a write"""
+        order = self._orders.get(key)
+        if order is None:
+            order = self._orders[key] = self._build_order(key)
+        return order
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _search_mask(self, search: str) -> np.ndarray:
+        mask = self._search_masks.get(search)
+        if mask is None:
+            if len(self._search_masks) >= 256:
+                self._search_masks.clear()
+            mask = self._search_masks[search] = self._compute_search_mask(search)
+        return mask
+
+    def _compute_search_mask(self, search: str) -> np.ndarray:
+        if not REGEX_CHARS.search(search):
+            if self._lower_array is None:
+                self._lower_array = np.array(list(self.names_lower), dtype=str)
+            needle = search.lower()
+            if self._lower_array.dtype.kind == 'S':
+                # Snapshot columns hold UTF-8 bytes
+                needle = needle.encode('utf-8')
+            return np.char.find(self._lower_array[:self.size], needle) >= 0
+        # Keep Mongo $regex semantics for patterns
+        pattern = re.compile(search, re.I)
+        return np.fromiter(
+            (bool(pattern.search(name)) for name in list(self.names)[:self.size]),
+            dtype=bool,
+            count=self.size
+        )
+
+    def query(
+        self,
+        sort: str = 'popularity',
+        material: Optional[str] = None,
+        status: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        page: int = 1,
+        limit: int = 10,
+        search: Optional[str] = None,
+    ) -> Dict:
+        """Filter, sort and paginate the catalog"""
+        n = self.size
+        mask = self.alive[:n].copy()
+        if material:
+            code = self.material_codes.get(material)
+            mask &= (self.material_code[:n] == code) if code is not None else False
+        if status:
+            code = self.status_codes.get(status)
+            mask &= (self.status_code[:n] == code) if code is not None else False
+        if min_price is not None:
+            mask &= self.price[:n] >= min_price
+        if max_price is not None:
+            mask &= self.price[:n] <= max_price
+        if search:
+            mask &= self._search_mask(search)
+
+        order = self._order(sort if sort in ORDER_KEYS else 'popularity')
+        hits = order[mask[order]]
+        total = int(hits.size)
+
+        skip = (page - 1) * limit
+        page_rows = hits[skip:skip + limit]
+
+        return {
+            'charms': [self.records[row] for row in page_rows],
+            'total': total,
+            'page': page,
+            'total_pages': (total + limit - 1) // limit,
+            'limit': limit,
+        }
+
+
+# Shared catalog for the API process
+catalog_engine = CatalogEngine()
@@ -0,0 +1,260 @@
+"""
+Shared Catalog Snapshots for CharmTracker
+The scheduler publishes an immutable, versioned snapshot file after each cycle;
+API workers memory-map it and serve /api/charms from zero-copy column views
+"""
+
+import asyncio
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+from .catalog_engine import CATALOG_PROJECTION, CatalogEngine, OverlayList
+
+logger = logging.getLogger(__name__)
+
+# Snapshots are disabled unless a directory is configured
+CATALOG_SNAPSHOT_DIR = os.getenv('CATALOG_SNAPSHOT_DIR', '')
+CATALOG_SNAPSHOT_POLL_SECONDS = float(os.getenv('CATALOG_SNAPSHOT_POLL_SECONDS', '5'))
+CATALOG_SNAPSHOT_KEEP = int(os.getenv('CATALOG_SNAPSHOT_KEEP', '3'))
+
+MAGIC = b'CTSNAP01'
+ALIGN = 64
+POINTER_FILE = 'CURRENT'
+
+NUMERIC_COLUMNS = ('price', 'popularity', 'change_7d', 'material_code', 'status_code')
+
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+class CatalogSnapshot:
+    """Read-only, memory-mapped view of one snapshot file"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:8] != MAGIC:
+            raise ValueError(f"Not a catalog snapshot: {self.path}")
+        header_len = struct.unpack('<Q', self._mmap[8:16])[0]
+        self.header = json.loads(self._mmap[16:16 + header_len])
+        data_start = _aligned(16 + header_len)
+
+        self.version = self.header['version']
+        self.count = self.header['count']
+        self.material_codes: Dict[str, int] = self.header['material_codes']
+        self.status_codes: Dict[str, int] = self.header['status_codes']
+
+        self.columns: Dict[str, np.ndarray] = {}
+        for name, spec in self.header['columns'].items():
+            self.columns[name] = np.frombuffer(
+                self._mmap,
+                dtype=np.dtype(spec['dtype']),
+                count=spec['count'],
+                offset=data_start + spec['offset']
+            )
+
+        self._strings = {}
+        view = memoryview(self._mmap)
+        for name, spec in self.header['strings'].items():
+            offsets = np.frombuffer(
+                self._mmap,
+                dtype=np.int64,
+                count=self.count + 1,
+                offset=data_start + spec['offsets']
+            )
+            blob_start = data_start + spec['blob']
+            self._strings[name] = (offsets, view[blob_start:blob_start + spec['blob_len']])
+
+    def string(self, column: str, row: int) -> str:
+        offsets, blob = self._strings[column]
+        return bytes(blob[offsets[row]:offsets[row + 1]]).decode('utf-8')
+
+    def record(self, row: int) -> Dict:
+        """Build the list-response dict for one row"""
+        return {
+            'id': self.string('id', row),
+            'name': self.string('name', row),
+            'material': self.string('material', row),
+            'status': self.string('status', row),
+            'avg_price': float(self.columns['price'][row]),
+            'price_change_7d': float(self.columns['change_7d'][row]),
+            'popularity': int(self.columns['popularity'][row]),
+            'images': json.loads(self.string('images', row)),
+            'last_updated': datetime.fromisoformat(self.string('last_updated', row)),
+        }
+
+    def string_column(self, column: str) -> OverlayList:
+        return OverlayList(self.count, lambda row: self.string(column, row))
+
+    def records(self) -> OverlayList:
+        return OverlayList(self.count, self.record)
+
+
+def write_snapshot(engine: CatalogEngine, directory: Path, version: int) -> Path:
+    """Serialize a loaded catalog to a new snapshot file and return its path"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    n = engine.size
+    if not engine._orders:
+        engine._rebuild_orders()
+
+    arrays = {name: np.ascontiguousarray(getattr(engine, name)[:n]) for name in NUMERIC_COLUMNS}
+    for sort_key, order in engine._orders.items():
+        arrays[f'order_{sort_key}'] = np.ascontiguousarray(order, dtype=np.int64)
+    lowered = [name.encode('utf-8') for name in engine.names_lower]
+    arrays['names_lower'] = np.array(lowered, dtype=f'S{max([len(b) for b in lowered] + [1])}')
+
+    texts = {
+        'id': [r['id'] for r in engine.records],
+        'name': [r['name'] for r in engine.records],
+        'material': [r['material'] for r in engine.records],
+        'status': [r['status'] for r in engine.records],
+        'images': [json.dumps(r['images']) for r in engine.records],
+        'last_updated': [r['last_updated'].isoformat() for r in engine.records],
+    }
+
+    # Lay out sections relative to the start of the data region
+    sections = []
+    columns = {}
+    strings = {}
+    offset = 0
+    for name, array in arrays.items():
+        columns[name] = {'dtype': array.dtype.str, 'count': len(array), 'offset': offset}
+        sections.append((offset, array.tobytes()))
+        offset = _aligned(offset + array.nbytes)
+    for name, values in texts.items():
+        encoded = [value.encode('utf-8') for value in values]
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        if encoded:
+            offsets[1:] = np.cumsum([len(b) for b in encoded])
+        blob = b''.join(encoded)
+        strings[name] = {'offsets': offset, 'blob': 0, 'blob_len': len(blob)}
+        sections.append((offset, offsets.tobytes()))
+        offset = _aligned(offset + offsets.nbytes)
+        strings[name]['blob'] = offset
+        sections.append((offset, blob))
+        offset = _aligned(offset + len(blob))
+
+    header = json.dumps({
+        'version': version,
+        'created_at': datetime.utcnow().isoformat(),
+        'count': n,
+        'material_codes': engine.material_codes,
+        'status_codes': engine.status_codes,
+        'columns': columns,
+        'strings': strings,
+    }).encode('utf-8')
+    data_start = _aligned(16 + len(header))
+
+    path = directory / f'catalog-{version}.snap'
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        for section_offset, payload in sections:
+            f.seek(data_start + section_offset)
+            f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    # Swap the pointer atomically so readers never see a partial file
+    pointer_tmp = directory / f'{POINTER_FILE}.{os.getpid()}.tmp'
+    pointer_tmp.write_text(path.name)
+    os.replace(pointer_tmp, directory / POINTER_FILE)
+
+    _prune_snapshots(directory, keep=CATALOG_SNAPSHOT_KEEP)
+    return path
+
+
+def _prune_snapshots(directory: Path, keep: int):
+    """Remove old snapshot files; mapped readers keep their pages until they swap"""
+    snapshots = sorted(
+        directory.glob('catalog-*.snap'),
+        key=lambda p: int(p.stem.split('-', 1)[1])
+    )
+    for old in snapshots[:-keep]:
+        try:
+            old.unlink()
+        except OSError:
+            pass
+
+
+async def publish_snapshot(db, directory: Optional[str] = None) -> Optional[Path]:
+    """Build a catalog from MongoDB and publish it as the current snapshot"""
+    directory = directory or CATALOG_SNAPSHOT_DIR
+    if not directory:
+        return None
+    try:
+        started = time.perf_counter()
+        docs = await db.charms.find({}, CATALOG_PROJECTION).to_list(length=None)
+        engine = CatalogEngine()
+        engine.load_documents(docs)
+        path = await asyncio.to_thread(write_snapshot, engine, Path(directory), time.time_ns())
+        logger.info(
+            f"📸 Published catalog snapshot {path.name}: {engine.size} charms in "
+            f"{(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+        return path
+    except Exception as e:
+        logger.error(f"Error publishing catalog snapshot: {str(e)}")
+        return None
+
+
+class SnapshotReader:
+    """Watches the snapshot pointer and swaps the catalog to new versions"""
+
+    def __init__(self, directory: str = CATALOG_SNAPSHOT_DIR):
+        self.directory = Path(directory) if directory else None
+        self.current_name: Optional[str] = None
+        self.last_check = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def _pointer(self) -> Optional[str]:
+        try:
+            return (self.directory / POINTER_FILE).read_text().strip() or None
+        except OSError:
+            return None
+
+    def load_latest(self, engine: CatalogEngine) -> bool:
+        """Attach the current snapshot if it differs from the one in use"""
+        if not self.enabled:
+            return False
+        self.last_check = time.monotonic()
+        name = self._pointer()
+        if not name or name == self.current_name:
+            return name is not None
+        try:
+            snapshot = CatalogSnapshot(self.directory / name)
+            engine.attach_snapshot(snapshot)
+            self.current_name = name
+            logger.info(f"📸 Attached catalog snapshot {name} ({snapshot.count} charms)")
+            return True
+        except Exception as e:
+            logger.error(f"Error attaching catalog snapshot {name}: {str(e)}")
+            return False
+
+    def maybe_refresh(self, engine: CatalogEngine):
+        """Cheap per-request check for a newer snapshot"""
+        if time.monotonic() - self.last_check >= CATALOG_SNAPSHOT_POLL_SECONDS:
+            self.load_latest(engine)
+
+
+# Shared reader for the API process
+snapshot_reader = SnapshotReader()
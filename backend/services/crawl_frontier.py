@@ -0,0 +1,231 @@
+"""
+Crawl Frontier for CharmTracker
+Persists a crawl's discovered URLs and their progress in MongoDB so a crawl
+interrupted by a restart or deploy resumes where it stopped instead of
+starting over, and only failed pages are fetched again. The sitemap lastmod
+of each parsed page is kept so later crawls can skip unchanged pages.
+"""
+
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+CRAWL_RUNS_COLLECTION = os.getenv('CRAWL_RUNS_COLLECTION', 'crawl_runs')
+CRAWL_FRONTIER_COLLECTION = os.getenv('CRAWL_FRONTIER_COLLECTION', 'crawl_frontier')
+# Last sitemap <lastmod> of every URL parsed successfully, across runs
+CRAWL_SEEN_COLLECTION = os.getenv('CRAWL_SEEN_COLLECTION', 'crawl_seen')
+# Fetch attempts per URL before it stays failed for the rest of the run
+CRAWL_MAX_ATTEMPTS = int(os.getenv('CRAWL_MAX_ATTEMPTS', '3'))
+
+# URL states
+PENDING = 'pending'
+FETCHED = 'fetched'
+PARSED = 'parsed'
+FAILED = 'failed'
+
+
+class CrawlFrontier:
+    """
+    One crawl run of a source and the state of every URL it discovered
+
+        frontier = CrawlFrontier(db, 'james_avery')
+        run = await frontier.open()        # resumes an unfinished run
+        await frontier.add(urls)
+        for url in await frontier.todo():
+            ...mark_fetched / mark_parsed / mark_failed...
+        await frontier.complete()
+    """
+
+    def __init__(self, db, source: str, max_attempts: int = CRAWL_MAX_ATTEMPTS):
+        self.source = source
+        self.max_attempts = max_attempts
+        self.runs = db[CRAWL_RUNS_COLLECTION]
+        self.urls = db[CRAWL_FRONTIER_COLLECTION]
+        self.seen = db[CRAWL_SEEN_COLLECTION]
+        self.run: Optional[Dict] = None
+
+    @property
+    def run_id(self) -> str:
+        return self.run['_id']
+
+    async def open(self) -> Dict:
+        """Resume the source's unfinished run, or start a new one"""
+        try:
+            await self.urls.create_index([('run_id', ASCENDING), ('state', ASCENDING)])
+            await self.runs.create_index([('source', ASCENDING), ('started_at', DESCENDING)])
+            await self.seen.create_index('source')
+        except Exception as e:
+            logger.error(f"Error creating crawl frontier indexes: {str(e)}")
+
+        run = await self.runs.find_one(
+            {'source': self.source, 'status': 'running'},
+            sort=[('started_at', DESCENDING)]
+        )
+        if run:
+            await self.runs.update_one({'_id': run['_id']}, {'$inc': {'resumes': 1}})
+            self.run = run
+            counts = await self.counts()
+            logger.info(
+                f"♻️  Resuming {self.source} crawl {run['_id']}: "
+                f"{counts.get(PARSED, 0)} done, {counts.get(FAILED, 0)} failed, "
+                f"{counts.get(PENDING, 0) + counts.get(FETCHED, 0)} left"
+            )
+            return run
+
+        now = datetime.utcnow()
+        run = {
+            '_id': f"{self.source}-{now:%Y%m%d%H%M%S}",
+            'source': self.source,
+            'status': 'running',
+            'started_at': now,
+            'discovery_page': -1,
+            'discovery_complete': False,
+            'resumes': 0,
+        }
+        await self.runs.insert_one(run)
+        # URLs of earlier runs are no longer needed
+        await self.urls.delete_many({'source': self.source, 'run_id': {'$ne': run['_id']}})
+        self.run = run
+        logger.info(f"🧭 Started {self.source} crawl {run['_id']}")
+        return run
+
+    async def add(self, urls: Iterable[str], lastmods: Optional[Dict[str, Optional[datetime]]] = None) -> int:
+        """
+        Add newly discovered URLs as pending (already known URLs keep their state)
+        `lastmods` are remembered once a URL is parsed, see changed_since_seen()
+        """
+        lastmods = lastmods or {}
+        ops = [
+            UpdateOne(
+                {'_id': f"{self.run_id}|{url}"},
+                {'$setOnInsert': {
+                    'run_id': self.run_id,
+                    'source': self.source,
+                    'url': url,
+                    'state': PENDING,
+                    'attempts': 0,
+                    'lastmod': lastmods.get(url),
+                    'discovered_at': datetime.utcnow(),
+                }},
+                upsert=True
+            )
+            for url in urls
+        ]
+        if not ops:
+            return 0
+        result = await self.urls.bulk_write(ops, ordered=False)
+        return result.upserted_count
+
+    async def checkpoint_discovery(self, page: int, urls: Iterable[str]):
+        """Store one discovery page's URLs; a resumed run continues after `page`"""
+        await self.add(urls)
+        await self.runs.update_one({'_id': self.run_id}, {'$set': {'discovery_page': page}})
+        self.run['discovery_page'] = page
+
+    async def finish_discovery(self, mode: str, full: bool = True):
+        """`full` when every known URL was queued, not only changed ones"""
+        update = {'discovery_complete': True, 'discovery_mode': mode, 'full': full}
+        await self.runs.update_one({'_id': self.run_id}, {'$set': update})
+        self.run.update(update)
+
+    async def last_full_crawl(self) -> Optional[datetime]:
+        """When the last completed run that fetched every URL finished"""
+        run = await self.runs.find_one(
+            {'source': self.source, 'status': 'complete', 'full': True},
+            sort=[('finished_at', DESCENDING)]
+        )
+        return run['finished_at'] if run else None
+
+    async def changed_since_seen(self, lastmods: Dict[str, Optional[datetime]]) -> List[str]:
+        """URLs that are new, or whose lastmod is newer than (or missing from) the last parse"""
+        seen = {}
+        async for doc in self.seen.find({'source': self.source}, {'url': 1, 'lastmod': 1}):
+            seen[doc['url']] = doc.get('lastmod')
+        changed = []
+        for url, lastmod in lastmods.items():
+            previous = seen.get(url)
+            if url not in seen or lastmod is None or previous is None or lastmod > previous:
+                changed.append(url)
+        return changed
+
+    async def todo(self) -> List[str]:
+        """
+        URLs still to fetch: pending ones, fetched ones whose parse was lost
+        in a restart, and failures with attempts left
+        """
+        cursor = self.urls.find(
+            {
+                'run_id': self.run_id,
+                '$or': [
+                    {'state': {'$in': [PENDING, FETCHED]}},
+                    {'state': FAILED, 'attempts': {'$lt': self.max_attempts}},
+                ]
+            },
+            {'url': 1}
+        )
+        return [doc['url'] async for doc in cursor]
+
+    async def mark_fetched(self, url: str):
+        await self._mark([url], {'$set': {'state': FETCHED}, '$inc': {'attempts': 1}})
+
+    async def mark_parsed(self, urls: Iterable[str]):
+        urls = list(urls)
+        await self._mark(urls, {'$set': {'state': PARSED}, '$unset': {'error': ''}})
+        try:
+            ops = [
+                UpdateOne(
+                    {'_id': f"{self.source}|{doc['url']}"},
+                    {'$set': {'source': self.source, 'url': doc['url'], 'lastmod': doc.get('lastmod'),
+                              'parsed_at': datetime.utcnow()}},
+                    upsert=True
+                )
+                async for doc in self.urls.find(
+                    {'_id': {'$in': [f"{self.run_id}|{url}" for url in urls]}}, {'url': 1, 'lastmod': 1}
+                )
+            ]
+            if ops:
+                await self.seen.bulk_write(ops, ordered=False)
+        except Exception as e:
+            # The page is simply treated as changed by the next sitemap pass
+            logger.error(f"Error recording parsed crawl URLs: {str(e)}")
+
+    async def mark_failed(self, url: str, error: str, attempted: bool = True):
+        """`attempted=False` when the fetch was already counted by mark_fetched"""
+        update = {'$set': {'state': FAILED, 'error': error}}
+        if attempted:
+            update['$inc'] = {'attempts': 1}
+        await self._mark([url], update)
+
+    async def _mark(self, urls: Iterable[str], update: Dict):
+        ids = [f"{self.run_id}|{url}" for url in urls]
+        if not ids:
+            return
+        update.setdefault('$set', {})['updated_at'] = datetime.utcnow()
+        try:
+            await self.urls.update_many({'_id': {'$in': ids}}, update)
+        except Exception as e:
+            # Losing a checkpoint only means the URL is fetched again on resume
+            logger.error(f"Error updating crawl frontier: {str(e)}")
+
+    async def counts(self) -> Dict[str, int]:
+        """Number of URLs in each state for the current run"""
+        pipeline = [
+            {'$match': {'run_id': self.run_id}},
+            {'$group': {'_id': '$state', 'count': {'$sum': 1}}},
+        ]
+        return {doc['_id']: doc['count'] async for doc in self.urls.aggregate(pipeline)}
+
+    async def complete(self) -> Dict[str, int]:
+        """Close the run; the next open() starts a fresh crawl"""
+        counts = await self.counts()
+        await self.runs.update_one(
+            {'_id': self.run_id},
+            {'$set': {'status': 'complete', 'finished_at': datetime.utcnow(), 'counts': counts}}
+        )
+        self.run['status'] = 'complete'
+        return counts
@@ -7,17 +7,53 @@ import logging
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 import asyncio
+import os
+import time
 from statistics import mean, median
 import pandas as pd
 import numpy as np
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 
 from scrapers.ebay_api_client import EbayAPIClient
 from scrapers.etsy_scraper import etsy_scraper
 from scrapers.poshmark_scraper import poshmark_scraper
-from scrapers.james_avery_scraper import james_avery_scraper
+from scrapers.james_avery_scraper import james_avery_scraper, product_url_of
+from scrapers.product_resolver import ja_products
+from scrapers.rate_limiter import platform_limiter
+from services.price_changes import recalculate_all_price_changes
+from services.refresh_policy import refresh_queue, refresh_schedule
+from services.catalog_engine import catalog_engine
+from services.detail_renderer import RENDERED_FIELDS, refresh_rendered_detail
+from services.singleflight import charm_updates, marketplace_searches
+from services.variant_groups import (
+    GROUP_VARIANT_SEARCHES, VARIANT_PROJECTION, group_charms, partition_listings, variant_query
+)
+from services.pipeline import PIPELINE_PARSE_WORKERS, Pipeline, thread_pool
 
 logger = logging.getLogger(__name__)
 
+# Longest any one charm update may wait on marketplaces
+UPDATE_DEADLINE_SECONDS = float(os.getenv('UPDATE_DEADLINE_SECONDS', '120'))
+
+# Per-source budgets; late sources are cancelled and the update is committed as partial
+SOURCE_DEADLINES = {
+    'ebay': float(os.getenv('EBAY_DEADLINE_SECONDS', '20')),
+    'etsy': float(os.getenv('ETSY_DEADLINE_SECONDS', '20')),
+    'poshmark': float(os.getenv('POSHMARK_DEADLINE_SECONDS', '75')),
+    'james_avery': float(os.getenv('JAMES_AVERY_DEADLINE_SECONDS', '45')),
+}
+
+# Listing platform labels, used to carry forward listings from late sources
+LISTING_PLATFORMS = {'ebay': 'eBay', 'etsy': 'Etsy', 'poshmark': 'Poshmark'}
+
+# Listings requested per marketplace search, and the cap for a shared variant search
+SEARCH_LIMIT = 20
+MAX_GROUP_SEARCH_LIMIT = int(os.getenv('MAX_GROUP_SEARCH_LIMIT', '60'))
+
+# Charm updates written per bulk write
+PERSIST_BATCH_SIZE = int(os.getenv('PERSIST_BATCH_SIZE', '25'))
+
 
 class DataAggregator:
     """Aggregates and analyzes data from all sources"""
@@ -31,88 +67,278 @@ class DataAggregator:
             'james_avery': james_avery_scraper
         }
     
-    async def update_charm_data(self, charm_id: str) -> bool:
-        """Update all data for a specific charm"""
+    async def update_charm_data(self, charm_id: str, prefetched: Optional[Tuple[Dict, Dict]] = None) -> bool:
+        """
+        Update all data for a specific charm
+        Concurrent calls for the same charm share one update
+        `prefetched` is (results, source_status) for sources already searched
+        """
+        return await charm_updates.do(charm_id, lambda: self._update_charm_data(charm_id, prefetched))
+    
+    async def _update_charm_data(self, charm_id: str, prefetched: Optional[Tuple[Dict, Dict]] = None) -> bool:
         try:
-            # Get existing charm data
-            charm = await self.db.charms.find_one({"id": charm_id})
-            if not charm:
-                logger.error(f"Charm {charm_id} not found")
+            fetched = await self._fetch_charm_data(charm_id, prefetched)
+            if not fetched:
                 return False
+            outcomes = await self.persist_updates([self._build_update(fetched)])
+            return outcomes.get(charm_id, False)
             
-            charm_name = charm['name']
-            logger.info(f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
-            logger.info(f"🔄 UPDATING DATA FOR: {charm_name}")
-            logger.info(f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
-            
-            # Fetch current marketplace data
-            tasks = [
-                self._fetch_ebay_data(charm_name),
-                self._fetch_marketplace_data(charm_name, 'etsy'),
-                self._fetch_marketplace_data(charm_name, 'poshmark'),
-                self._fetch_james_avery_data(charm_name)
-            ]
-            
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            ebay_data = results[0] if not isinstance(results[0], Exception) else {'current': [], 'completed': []}
-            etsy_data = results[1] if not isinstance(results[1], Exception) else []
-            poshmark_data = results[2] if not isinstance(results[2], Exception) else []
-            ja_data = results[3] if not isinstance(results[3], Exception) else None
-            
-            # Current active listings from all platforms
-            all_listings = ebay_data['current'] + etsy_data + poshmark_data
-            
-            logger.info(f"📊 LISTING COUNTS:")
-            logger.info(f"  🛒 eBay: {len(ebay_data['current'])} listings")
-            logger.info(f"  🎨 Etsy: {len(etsy_data)} listings")
-            logger.info(f"  👗 Poshmark: {len(poshmark_data)} listings")
-            logger.info(f"  📦 Total: {len(all_listings)} listings")
-            
-            # Log sample data from each platform
-            if ebay_data['current']:
-                logger.info(f"  eBay Sample: ${ebay_data['current'][0].get('price', 0):.2f} - {ebay_data['current'][0].get('title', 'N/A')[:50]}")
-            if etsy_data:
-                logger.info(f"  Etsy Sample: ${etsy_data[0].get('price', 0):.2f} - {etsy_data[0].get('title', 'N/A')[:50]}")
-            if poshmark_data:
-                logger.info(f"  Poshmark Sample: ${poshmark_data[0].get('price', 0):.2f} - {poshmark_data[0].get('title', 'N/A')[:50]}")
-            
-            # Calculate aggregated metrics
-            update_data = await self._calculate_aggregated_data(
-                charm,
-                all_listings,
-                ja_data
-            )
-            
-            logger.info(f"💰 Average Price: ${update_data.get('average_price', 0):.2f}")
-            logger.info(f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n")
-            
-            # Update database
-            result = await self.db.charms.update_one(
+        except Exception as e:
+            logger.error(f"Error updating charm {charm_id}: {str(e)}")
+            return False
+    
+    async def update_charms(self, groups: List[List[Dict]], concurrency: int = 10) -> Dict[str, bool]:
+        """
+        Update many charms on the fetch -> aggregate -> persist pipeline
+        Each group shares one marketplace search (see variant_groups);
+        returns {charm_id: success}, leaving out charms skipped because an
+        update for them was already running
+        """
+        outcomes: Dict[str, bool] = {}
+        
+        async def fetch(group):
+            # Charms a manual update is already refreshing are left to it (and
+            # left out of the outcomes: they neither succeeded nor failed here)
+            group = [charm for charm in group if not charm_updates.in_flight(charm['id'])]
+            outcomes.update({charm['id']: False for charm in group})
+            return await self._fetch_group_data(group) if group else []
+        
+        async def persist(batch):
+            outcomes.update(await self.persist_updates(batch))
+        
+        pipeline = Pipeline('marketplace_updates')
+        pipeline.add_stage('fetch', fetch, concurrency=concurrency, expand=True)
+        pipeline.add_stage('aggregate', self._build_update, concurrency=PIPELINE_PARSE_WORKERS, executor=thread_pool())
+        pipeline.add_sink('persist', persist, batch_size=PERSIST_BATCH_SIZE)
+        await pipeline.run(groups)
+        return outcomes
+    
+    async def _fetch_group_data(self, charms: List[Dict]) -> List[Dict]:
+        """Fetched data for each charm of a group (one shared search for variants)"""
+        if len(charms) == 1:
+            prefetched = {charms[0]['id']: None}
+        else:
+            prefetched = await self._shared_search(charms)
+        fetched = await asyncio.gather(*(
+            self._fetch_charm_data(charm['id'], prefetched[charm['id']]) for charm in charms
+        ))
+        return [item for item in fetched if item]
+    
+    async def _shared_search(self, charms: List[Dict]) -> Dict[str, Tuple[Dict, Dict]]:
+        """
+        Search metal variants of one design once and split the results
+        `charms` need id, name, material and prices; returns {charm_id: (results, source_status)}
+        """
+        query = variant_query(charms[0]['name'])
+        limit = min(SEARCH_LIMIT * len(charms), MAX_GROUP_SEARCH_LIMIT)
+        logger.info(f"🔗 Shared search '{query}' for {len(charms)} variants")
+        results, source_status = await self._fetch_with_deadlines({
+            'ebay': self._fetch_ebay_data(query),
+            'etsy': self._fetch_marketplace_data(query, 'etsy', limit),
+            'poshmark': self._fetch_marketplace_data(query, 'poshmark', limit),
+        })
+        
+        # Split each platform's results between the variants; a late platform
+        # stays late for every variant rather than being searched once per charm
+        per_charm = {charm['id']: {} for charm in charms}
+        for platform, result in results.items():
+            if source_status[platform]['status'] != 'ok':
+                for charm_id in per_charm:
+                    per_charm[charm_id][platform] = None
+                continue
+            if platform == 'ebay':
+                current = partition_listings(result['current'], charms)
+                completed = partition_listings(result['completed'], charms)
+                for charm_id in per_charm:
+                    per_charm[charm_id]['ebay'] = {
+                        'current': current[charm_id],
+                        'completed': completed[charm_id],
+                    }
+            else:
+                for charm_id, listings in partition_listings(result, charms).items():
+                    per_charm[charm_id][platform] = listings
+        
+        return {charm_id: (data, source_status) for charm_id, data in per_charm.items()}
+    
+    async def _fetch_charm_data(self, charm_id: str, prefetched: Optional[Tuple[Dict, Dict]] = None) -> Optional[Dict]:
+        """
+        Fetch stage: the stored charm plus fresh results from every source
+        `prefetched` is (results, source_status) for sources already searched
+        """
+        try:
+            # Get existing charm data
+            charm = await self.db.charms.find_one(
                 {"id": charm_id},
-                {"$set": update_data}
+                {field: 0 for field in RENDERED_FIELDS}
             )
+            if not charm:
+                logger.error(f"Charm {charm_id} not found")
+                return None
             
-            logger.info(f"Updated {charm_name}: {result.modified_count} documents modified")
-            return result.modified_count > 0
+            charm_name = charm['name']
+            logger.info(f"🔄 Fetching data for: {charm_name}")
+            
+            # Fetch current marketplace data, each source within its own deadline;
+            # sources a shared variant search already answered are not fetched again
+            prefetched_results, prefetched_status = prefetched or ({}, {})
+            sources = {
+                'ebay': lambda: self._fetch_ebay_data(charm_name),
+                'etsy': lambda: self._fetch_marketplace_data(charm_name, 'etsy'),
+                'poshmark': lambda: self._fetch_marketplace_data(charm_name, 'poshmark'),
+                'james_avery': lambda: self._fetch_james_avery_data(charm_name, charm),
+            }
+            results, source_status = await self._fetch_with_deadlines({
+                name: fetch() for name, fetch in sources.items() if name not in prefetched_results
+            })
+            results.update(prefetched_results)
+            source_status.update({name: prefetched_status[name] for name in prefetched_results})
+            return {'charm': charm, 'results': results, 'source_status': source_status}
             
         except Exception as e:
-            logger.error(f"Error updating charm {charm_id}: {str(e)}")
-            return False
+            logger.error(f"Error fetching data for charm {charm_id}: {str(e)}")
+            return None
+    
+    def _build_update(self, fetched: Dict) -> Dict:
+        """Aggregate stage (CPU only): the $set document for one charm"""
+        charm = fetched['charm']
+        results = fetched['results']
+        source_status = fetched['source_status']
+        charm_name = charm['name']
+        logger.info(f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+        logger.info(f"🔄 UPDATING DATA FOR: {charm_name}")
+        logger.info(f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+        
+        ebay_data = results.get('ebay') or {'current': [], 'completed': []}
+        etsy_data = results.get('etsy') or []
+        poshmark_data = results.get('poshmark') or []
+        ja_data = results.get('james_avery')
+        
+        # Sources that missed their deadline keep their previous listings
+        late = [name for name, status in source_status.items() if status['status'] != 'ok']
+        carried = [
+            listing for listing in charm.get('listings', [])
+            if listing.get('platform') in {LISTING_PLATFORMS.get(name) for name in late}
+        ]
+        if late:
+            logger.warning(f"⏱️  Partial update for {charm_name}: {', '.join(late)} did not finish")
+        
+        # Current active listings from all platforms; carried listings are shown
+        # but do not feed prices or history
+        all_listings = ebay_data['current'] + etsy_data + poshmark_data
+        
+        logger.info(f"📊 LISTING COUNTS:")
+        logger.info(f"  🛒 eBay: {len(ebay_data['current'])} listings")
+        logger.info(f"  🎨 Etsy: {len(etsy_data)} listings")
+        logger.info(f"  👗 Poshmark: {len(poshmark_data)} listings")
+        logger.info(f"  📦 Total: {len(all_listings)} listings")
+        if carried:
+            logger.info(f"  ♻️  Carried forward: {len(carried)} listings")
+        
+        # Log sample data from each platform
+        if ebay_data['current']:
+            logger.info(f"  eBay Sample: ${ebay_data['current'][0].get('price', 0):.2f} - {ebay_data['current'][0].get('title', 'N/A')[:50]}")
+        if etsy_data:
+            logger.info(f"  Etsy Sample: ${etsy_data[0].get('price', 0):.2f} - {etsy_data[0].get('title', 'N/A')[:50]}")
+        if poshmark_data:
+            logger.info(f"  Poshmark Sample: ${poshmark_data[0].get('price', 0):.2f} - {poshmark_data[0].get('title', 'N/A')[:50]}")
+        
+        # Calculate aggregated metrics
+        update_data = self._calculate_aggregated_data(
+            charm,
+            all_listings,
+            ja_data,
+            carried=carried,
+            partial=bool(late)
+        )
+        update_data['source_status'] = source_status
+        update_data['partial_update'] = bool(late)
+        
+        logger.info(f"💰 Average Price: ${update_data.get('average_price', 0):.2f}")
+        logger.info(f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n")
+        return {'charm_id': charm['id'], 'update_data': update_data}
+    
+    async def persist_updates(self, updates: List[Dict]) -> Dict[str, bool]:
+        """Persist stage: one bulk write for a batch of charm updates"""
+        outcomes = {update['charm_id']: True for update in updates}
+        try:
+            result = await self.db.charms.bulk_write([
+                UpdateOne({"id": update['charm_id']}, {"$set": update['update_data']})
+                for update in updates
+            ], ordered=False)
+            logger.info(f"💾 Persisted {len(updates)} charm updates: {result.modified_count} documents modified")
+        except BulkWriteError as e:
+            for error in e.details.get('writeErrors', []):
+                outcomes[updates[error['index']]['charm_id']] = False
+            logger.error(f"Error persisting {len(e.details.get('writeErrors', []))} charm updates")
+        except Exception as e:
+            logger.error(f"Error persisting charm updates: {str(e)}")
+            return {charm_id: False for charm_id in outcomes}
+        
+        written = [charm_id for charm_id, ok in outcomes.items() if ok]
+        for update in updates:
+            next_refresh_at = update['update_data'].get('next_refresh_at')
+            if outcomes[update['charm_id']] and next_refresh_at:
+                refresh_queue.push(update['charm_id'], next_refresh_at)
+        await catalog_engine.refresh_charms(self.db, written)
+        await asyncio.gather(*(refresh_rendered_detail(self.db, charm_id) for charm_id in written))
+        return outcomes
+    
+    async def _fetch_with_deadlines(self, sources: Dict) -> Tuple[Dict, Dict]:
+        """
+        Run source fetches concurrently, cancelling any that exceed their deadline
+        Returns (results by source, {source: {status, latency_ms}})
+        """
+        async def run(name, coro):
+            deadline = min(SOURCE_DEADLINES.get(name, UPDATE_DEADLINE_SECONDS), UPDATE_DEADLINE_SECONDS)
+            started = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(coro, timeout=deadline)
+                status = 'ok'
+            except asyncio.TimeoutError:
+                result, status = None, 'timeout'
+            except Exception as e:
+                logger.error(f"Error fetching from {name}: {str(e)}")
+                result, status = None, 'error'
+            latency_ms = round((time.perf_counter() - started) * 1000, 1)
+            return name, result, {'status': status, 'latency_ms': latency_ms}
+        
+        outcomes = await asyncio.gather(*(run(name, coro) for name, coro in sources.items()))
+        results = {name: result for name, result, _ in outcomes}
+        source_status = {name: status for name, _, status in outcomes}
+        logger.info(
+            "⏱️  Source latency: " +
+            ", ".join(f"{name} {status['latency_ms']:.0f}ms ({status['status']})"
+                      for name, status in source_status.items())
+        )
+        return results, source_status
+    
+    @staticmethod
+    def _search_key(platform: str, charm_name: str) -> Tuple[str, str]:
+        return platform, ' '.join(charm_name.lower().split())
     
     async def _fetch_ebay_data(self, charm_name: str) -> Dict:
         """Fetch both current and completed eBay listings"""
-        current = await self.ebay_client.search_listings(charm_name)
-        completed = await self.ebay_client.get_completed_listings(charm_name)
+        return await marketplace_searches.do(
+            self._search_key('ebay', charm_name),
+            lambda: self._search_ebay(charm_name)
+        )
+    
+    async def _search_ebay(self, charm_name: str) -> Dict:
+        async with platform_limiter('ebay'):
+            current = await self.ebay_client.search_listings(charm_name)
+        async with platform_limiter('ebay'):
+            completed = await self.ebay_client.get_completed_listings(charm_name)
+        # A failed search (None) counts as no listings
         return {
-            'current': current,
-            'completed': completed
+            'current': current or [],
+            'completed': completed or []
         }
     
     async def _fetch_marketplace_data(
         self, 
         charm_name: str, 
-        platform: str
+        platform: str,
+        limit: int = SEARCH_LIMIT
     ) -> List[Dict]:
         """Fetch data from other marketplaces"""
         try:
@@ -120,7 +346,10 @@ class DataAggregator:
             if not scraper:
                 return []
             
-            result = await scraper.search_charm(charm_name, limit=20)
+            result = await marketplace_searches.do(
+                self._search_key(platform, charm_name) + (limit,),
+                lambda: self._search_platform(scraper, platform, charm_name, limit)
+            )
             
             # Handle both dict and list returns (eBay returns dict, others may return list)
             if isinstance(result, dict):
@@ -137,14 +366,62 @@ class DataAggregator:
             logger.error(f"Error fetching from {platform}: {str(e)}")
             return []
     
+    async def _search_platform(self, scraper, platform: str, charm_name: str, limit: int = SEARCH_LIMIT):
+        """One rate-limited scraper call (shared by coalesced callers)"""
+        if getattr(scraper, 'paces_itself', False):
+            # Batching scrapers apply the platform limiter per upstream request
+            return await scraper.search_charm(charm_name, limit=limit)
+        async with platform_limiter(platform):
+            if platform == 'james_avery':
+                return await scraper.get_charm_details(charm_name)
+            return await scraper.search_charm(charm_name, limit=limit)
+    
     async def _fetch_james_avery_data(
         self, 
-        charm_name: str
+        charm_name: str,
+        charm: Optional[Dict] = None
     ) -> Optional[Dict]:
-        """Fetch official James Avery data"""
+        """
+        Fetch official James Avery data
+        The product page stored on the charm (or resolved for its name
+        earlier) is fetched directly; the site search is the fallback
+        """
         try:
             ja_scraper = self.scrapers['james_avery']
-            details = await ja_scraper.get_charm_details(charm_name)
+            stored_url = product_url_of(charm) if charm else None
+            # A resolution is only recorded after a search found a working page,
+            # so it wins over a stored URL that may have died since
+            resolved = await ja_products.get(charm_name)
+            product_url = (resolved or {}).get('url') or stored_url
+            
+            details = None
+            if product_url:
+                details = await marketplace_searches.do(
+                    ('james_avery_product', product_url),
+                    lambda: self._fetch_james_avery_product(ja_scraper, product_url)
+                )
+                if not details:
+                    logger.info(f"James Avery page for {charm_name} did not load, searching instead")
+                    if resolved:
+                        await ja_products.forget(charm_name)
+            
+            if not details:
+                # A SKU search finds exactly one product; a name search takes the best guess
+                query = (charm or {}).get('sku') or (resolved or {}).get('sku') or charm_name
+                details = await marketplace_searches.do(
+                    self._search_key('james_avery', query),
+                    lambda: self._search_platform(ja_scraper, 'james_avery', query)
+                )
+                found_url = product_url_of({'james_avery_url': (details or {}).get('official_url')})
+                if found_url:
+                    await ja_products.put(charm_name, found_url, details.get('sku'))
+                    if charm and found_url != stored_url:
+                        # Store the new page now so the next update fetches it directly,
+                        # even if this update is never persisted
+                        await self.db.charms.update_one(
+                            {'id': charm['id']}, {'$set': {'james_avery_url': found_url}}
+                        )
+                        logger.info(f"🔗 James Avery page for {charm_name} moved to {found_url}")
             
             if details:
                 logger.info(f"Found James Avery details for {charm_name}")
@@ -157,13 +434,23 @@ class DataAggregator:
             logger.error(f"Error fetching James Avery data: {str(e)}")
             return None
     
-    async def _calculate_aggregated_data(
+    async def _fetch_james_avery_product(self, ja_scraper, product_url: str) -> Optional[Dict]:
+        async with platform_limiter('james_avery'):
+            return await ja_scraper.get_product_details(product_url)
+    
+    def _calculate_aggregated_data(
         self, 
         existing_charm: Dict,
         listings: List[Dict],
-        ja_data: Optional[Dict]
+        ja_data: Optional[Dict],
+        carried: Optional[List[Dict]] = None,
+        partial: bool = False
     ) -> Dict:
-        """Calculate aggregated pricing and metadata"""
+        """
+        Calculate aggregated pricing and metadata
+        `carried` listings (from sources that missed their deadline) are only
+        displayed; a `partial` update does not add a price history point
+        """
         update_data = {
             "last_updated": datetime.utcnow()
         }
@@ -236,7 +523,8 @@ class DataAggregator:
                     logger.warning(f"   ⚠️  No images found from any source!")
         
         # Update listings
-        if listings:
+        display_listings = listings + (carried or [])
+        if display_listings:
             # Log eBay prices for debugging
             logger.info(f"📊 [EBAY] Listing Prices for {existing_charm.get('name', 'Unknown')}:")
             for idx, listing in enumerate(listings[:5], 1):
@@ -244,7 +532,7 @@ class DataAggregator:
             
             # Format listings for database
             formatted_listings = []
-            for listing in listings[:20]:  # Keep top 20
+            for listing in display_listings[:20]:  # Keep top 20
                 formatted_listings.append({
                     'platform': listing['platform'],
                     'title': listing['title'],
@@ -282,9 +570,10 @@ class DataAggregator:
                 # Get existing price history
                 price_history = existing_charm.get('price_history', [])
                 
-                # Only add if price is different or it's been more than 12 hours
-                should_add = True
-                if price_history:
+                # Only add if price is different or it's been more than 12 hours,
+                # and never from a partial update (some sources missing)
+                should_add = not partial
+                if should_add and price_history:
                     last_entry = price_history[-1]
                     last_date = last_entry.get('date')
                     last_price = last_entry.get('price')
@@ -359,6 +648,9 @@ class DataAggregator:
                 price_changes = self._calculate_price_changes(existing_history, update_data['avg_price'])
                 update_data.update(price_changes)
         
+        # Schedule the next refresh from how much this charm's market moves
+        update_data.update(refresh_schedule(existing_charm, update_data))
+        
         return update_data
     
     def _calculate_price_changes(
@@ -416,14 +708,25 @@ class DataAggregator:
         
         return changes
     
+    async def recalculate_price_changes(self) -> Dict:
+        """
+        Refresh 7/30/90-day price changes for every charm from stored history
+        Runs as one vectorized batch, independent of scraping
+        """
+        try:
+            return await recalculate_all_price_changes(self.db)
+        except Exception as e:
+            logger.error(f"Error recalculating price changes: {str(e)}")
+            return {'total': 0, 'changed': 0, 'modified': 0, 'error': str(e)}
+    
     async def update_all_charms(self, limit: Optional[int] = None) -> Dict:
         """
         Update data for all charms in database
         Returns statistics about the update
         """
         try:
-            # Get all charm IDs
-            cursor = self.db.charms.find({}, {"id": 1})
+            # Get all charms, with the fields needed to share variant searches
+            cursor = self.db.charms.find({}, VARIANT_PROJECTION)
             if limit:
                 cursor = cursor.limit(limit)
             
@@ -432,32 +735,17 @@ class DataAggregator:
             
             logger.info(f"Starting update for {len(charm_ids)} charms")
             
-            # Update charms with rate limiting (avoid overwhelming scrapers)
-            success_count = 0
-            fail_count = 0
-            
-            for i, charm_id in enumerate(charm_ids):
-                try:
-                    logger.info(f"Updating charm {i+1}/{len(charm_ids)}: {charm_id}")
-                    success = await self.update_charm_data(charm_id)
-                    
-                    if success:
-                        success_count += 1
-                    else:
-                        fail_count += 1
-                    
-                    # Rate limiting - wait between requests
-                    if i < len(charm_ids) - 1:
-                        await asyncio.sleep(2)  # 2 second delay between charms
-                        
-                except Exception as e:
-                    logger.error(f"Error updating charm {charm_id}: {str(e)}")
-                    fail_count += 1
+            # Marketplace pacing comes from the per-platform limiters
+            groups = group_charms(charms) if GROUP_VARIANT_SEARCHES else [[charm] for charm in charms]
+            outcomes = await self.update_charms(groups)
+            success_count = sum(1 for ok in outcomes.values() if ok)
+            fail_count = len(outcomes) - success_count
             
             stats = {
                 'total': len(charm_ids),
                 'success': success_count,
                 'failed': fail_count,
+                'skipped': len(charm_ids) - len(outcomes),
                 'updated_at': datetime.utcnow()
             }
             
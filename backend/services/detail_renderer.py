@@ -0,0 +1,107 @@
+"""
+Materialized Charm Detail Responses for CharmTracker
+Renders GET /api/charms/{id} payloads at write time so reads can stream bytes
+"""
+
+import gzip
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+from models.charm import CharmResponse
+
+logger = logging.getLogger(__name__)
+
+DETAIL_PRECOMPRESS = os.getenv('DETAIL_PRECOMPRESS', 'true').lower() == 'true'
+DETAIL_GZIP_MIN_BYTES = int(os.getenv('DETAIL_GZIP_MIN_BYTES', '1024'))
+
+# Stored alongside the charm document
+RENDERED_FIELDS = ('detail_json', 'detail_gzip', 'detail_version', 'detail_last_updated')
+
+# Fields read when serving a pre-rendered detail
+RENDERED_PROJECTION = {'_id': 0, 'last_updated': 1, **{field: 1 for field in RENDERED_FIELDS}}
+
+
+def build_charm_response(charm: Dict, price_history: Optional[List[Dict]] = None) -> CharmResponse:
+    """Build the detail response model from a charm document"""
+    return CharmResponse(
+        id=charm["id"],
+        name=charm["name"],
+        description=charm["description"],
+        material=charm["material"],
+        status=charm["status"],
+        is_retired=charm["is_retired"],
+        avg_price=charm["avg_price"],
+        price_change_7d=charm["price_change_7d"],
+        price_change_30d=charm["price_change_30d"],
+        price_change_90d=charm["price_change_90d"],
+        popularity=charm["popularity"],
+        images=charm["images"],
+        listings=charm.get("listings", []),
+        price_history=charm.get("price_history", []) if price_history is None else price_history,
+        related_charm_ids=charm.get("related_charm_ids", []),
+        last_updated=charm["last_updated"],
+    )
+
+
+def render_detail(charm: Dict) -> Dict:
+    """Serialize (and optionally compress) a charm's detail payload"""
+    body = build_charm_response(charm).model_dump_json().encode('utf-8')
+    rendered = {
+        'detail_json': body,
+        'detail_gzip': None,
+        'detail_version': time.time_ns(),
+        'detail_last_updated': charm.get('last_updated'),
+    }
+    if DETAIL_PRECOMPRESS and len(body) >= DETAIL_GZIP_MIN_BYTES:
+        rendered['detail_gzip'] = gzip.compress(body, compresslevel=6)
+    return rendered
+
+
+def is_current(doc: Optional[Dict]) -> bool:
+    """
+    True when a stored rendering matches the document it was built from
+    Keyed on last_updated, so writers that change response fields without
+    bumping it must drop the rendering with invalidate_rendered_detail()
+    """
+    return bool(
+        doc
+        and doc.get('detail_json')
+        and doc.get('detail_last_updated') == doc.get('last_updated')
+    )
+
+
+async def store_rendered_detail(db, charm: Dict) -> Optional[Dict]:
+    """
+    Render and persist a charm's detail payload
+    Only stored if the document has not been rewritten in the meantime
+    """
+    try:
+        rendered = render_detail(charm)
+        await db.charms.update_one(
+            {'id': charm['id'], 'last_updated': charm.get('last_updated')},
+            {'$set': rendered}
+        )
+        return rendered
+    except Exception as e:
+        logger.error(f"Error rendering detail for {charm.get('id')}: {str(e)}")
+        return None
+
+
+async def refresh_rendered_detail(db, charm_id: str) -> Optional[Dict]:
+    """Re-read a charm after a write and store its rendered detail"""
+    if not charm_id:
+        return None
+    charm = await db.charms.find_one(
+        {'id': charm_id},
+        {field: 0 for field in RENDERED_FIELDS}
+    )
+    if not charm:
+        return None
+    return await store_rendered_detail(db, charm)
+
+
+def invalidate_rendered_detail() -> Dict:
+    """Update fragment that drops a stored rendering, for writes that keep last_updated"""
+    return {'$unset': {'detail_json': '', 'detail_gzip': '', 'detail_last_updated': ''}}
@@ -0,0 +1,150 @@
+"""
+Price History Downsampling for CharmTracker
+Largest-Triangle-Three-Buckets (LTTB) reduction of chart series
+"""
+
+import logging
+import os
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Supported ?range= values and the window they cover
+HISTORY_RANGES = {
+    '7d': timedelta(days=7),
+    '30d': timedelta(days=30),
+    '90d': timedelta(days=90),
+    '180d': timedelta(days=180),
+    'all': None,
+}
+
+HISTORY_CACHE_SIZE = int(os.getenv('HISTORY_CACHE_SIZE', '2048'))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Return indices of the points LTTB keeps for a series
+    x must be sorted ascending; first and last points are always kept
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # Bucket boundaries for the n - 2 interior points
+    edges = np.floor(np.linspace(1, n - 1, threshold - 1)).astype(np.int64)
+    starts = edges[:-1]
+    ends = edges[1:]
+
+    # Average of each bucket (used as the third triangle vertex)
+    cum_x = np.concatenate(([0.0], np.cumsum(x)))
+    cum_y = np.concatenate(([0.0], np.cumsum(y)))
+    counts = ends - starts
+    avg_x = (cum_x[ends] - cum_x[starts]) / counts
+    avg_y = (cum_y[ends] - cum_y[starts]) / counts
+    # The last point closes the series
+    avg_x = np.append(avg_x[1:], x[-1])
+    avg_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    prev = 0
+    for bucket in range(threshold - 2):
+        lo, hi = starts[bucket], ends[bucket]
+        bx = x[lo:hi]
+        by = y[lo:hi]
+        # Twice the triangle area against previous point and next bucket average
+        areas = np.abs(
+            (x[prev] - avg_x[bucket]) * (by - y[prev])
+            - (x[prev] - bx) * (avg_y[bucket] - y[prev])
+        )
+        prev = lo + int(np.argmax(areas))
+        selected[bucket + 1] = prev
+
+    return selected
+
+
+def _entry_timestamp(entry: Dict) -> Optional[float]:
+    date = entry.get('date')
+    if isinstance(date, datetime):
+        return date.timestamp()
+    if isinstance(date, str):
+        try:
+            return datetime.fromisoformat(date).timestamp()
+        except ValueError:
+            return None
+    return None
+
+
+def downsample_history(
+    price_history: List[Dict],
+    points: Optional[int] = None,
+    range_key: Optional[str] = None,
+    anchor: Optional[datetime] = None
+) -> List[Dict]:
+    """
+    Trim a price history to a range and reduce it to at most `points` entries
+    The range window ends at `anchor` (the charm's last update) so results stay
+    stable for a given document version
+    """
+    entries = [e for e in price_history if _entry_timestamp(e) is not None]
+    entries.sort(key=_entry_timestamp)
+
+    window = HISTORY_RANGES.get(range_key) if range_key else None
+    if window is not None and entries:
+        end = anchor or datetime.utcnow()
+        cutoff = (end - window).timestamp()
+        entries = [e for e in entries if _entry_timestamp(e) >= cutoff]
+
+    if not points or len(entries) <= points:
+        return entries
+
+    x = np.fromiter((_entry_timestamp(e) for e in entries), dtype=np.float64, count=len(entries))
+    y = np.fromiter((float(e.get('price') or 0.0) for e in entries), dtype=np.float64, count=len(entries))
+    keep = lttb_indices(x, y, points)
+    return [entries[i] for i in keep]
+
+
+class DownsampleCache:
+    """Small LRU of downsampled series keyed by charm version and request shape"""
+
+    def __init__(self, max_entries: int = HISTORY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, List[Dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(
+        self,
+        charm_id: str,
+        last_updated: Optional[datetime],
+        price_history: List[Dict],
+        points: Optional[int],
+        range_key: Optional[str]
+    ) -> List[Dict]:
+        """Return the cached series or compute and store it"""
+        key = (charm_id, last_updated, points, range_key)
+        cached = self._entries.get(key)
+        if cached is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        series = downsample_history(price_history, points, range_key, anchor=last_updated)
+        self._entries[key] = series
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return series
+
+    def clear(self):
+        self._entries.clear()
+
+
+# Shared cache instance for the API process
+history_cache = DownsampleCache()
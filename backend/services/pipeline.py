@@ -0,0 +1,289 @@
+"""
+Staged Processing Pipeline for CharmTracker
+Async fetch workers, a parse pool and a batched writer connected by bounded
+queues, so a slow stage applies backpressure instead of stalling the others
+or buffering without limit. Queue depth, throughput and latency percentiles
+are tracked per stage.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, Iterable, List, Optional, Union
+
+from scrapers.latency import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+# Items allowed to wait between two stages
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '100'))
+PIPELINE_PARSE_WORKERS = int(os.getenv('PIPELINE_PARSE_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+_DONE = object()
+
+_thread_pool: Optional[ThreadPoolExecutor] = None
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def thread_pool() -> ThreadPoolExecutor:
+    """Shared pool for parse steps that need objects which cannot be pickled"""
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(max_workers=PIPELINE_PARSE_WORKERS, thread_name_prefix='parse')
+    return _thread_pool
+
+
+def process_pool() -> ProcessPoolExecutor:
+    """Shared pool for CPU-bound parse steps (handlers must be module-level functions)"""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=PIPELINE_PARSE_WORKERS)
+    return _process_pool
+
+
+def shutdown_pools():
+    """Stop the shared executors (server shutdown)"""
+    global _thread_pool, _process_pool
+    for pool in (_thread_pool, _process_pool):
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+    _thread_pool = None
+    _process_pool = None
+
+
+class _Stage:
+    def __init__(
+        self,
+        name: str,
+        handler: Callable,
+        concurrency: int,
+        executor: Optional[Executor] = None,
+        expand: bool = False,
+        batch_size: Optional[int] = None,
+        flush_seconds: float = 1.0
+    ):
+        self.name = name
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.executor = executor
+        self.expand = expand
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.queue: Optional[asyncio.Queue] = None
+        self.reset()
+
+    def reset(self):
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.busy_seconds = 0.0
+        # Seconds per item (per batch for sinks)
+        self.latency = LatencyTracker()
+
+    async def call(self, item):
+        if self.executor is not None:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, self.handler, item)
+        return await self.handler(item)
+
+    def stats(self, elapsed: float) -> Dict:
+        latency = self.latency.stats()
+        return {
+            'concurrency': self.concurrency,
+            'queue_depth': self.queue.qsize() if self.queue else 0,
+            'max_queue_depth': self.max_depth,
+            'processed': self.processed,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'busy_seconds': round(self.busy_seconds, 2),
+            'items_per_second': round(self.processed / elapsed, 2) if elapsed > 0 else 0.0,
+            'p50_ms': latency['p50_ms'],
+            'p95_ms': latency['p95_ms'],
+            'p99_ms': latency['p99_ms'],
+        }
+
+
+class Pipeline:
+    """
+    Stages run in the order they are added:
+
+        pipeline = Pipeline('catalog_sync')
+        pipeline.add_stage('fetch', fetch, concurrency=4)
+        pipeline.add_stage('parse', parse, executor=process_pool())
+        pipeline.add_sink('persist', write_batch, batch_size=50)
+        stats = await pipeline.run(urls)
+
+    A stage handler returns the item for the next stage, or None to drop it
+    (with expand=True it returns a list of items). Sink handlers receive lists.
+    """
+
+    def __init__(self, name: str, queue_size: int = PIPELINE_QUEUE_SIZE):
+        self.name = name
+        self.queue_size = queue_size
+        self.stages: List[_Stage] = []
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        _pipelines[name] = self
+
+    def add_stage(
+        self,
+        name: str,
+        handler: Callable[[Any], Union[Awaitable[Any], Any]],
+        concurrency: int = 1,
+        executor: Optional[Executor] = None,
+        expand: bool = False
+    ) -> 'Pipeline':
+        """Async handler, or a plain function run in `executor`"""
+        self.stages.append(_Stage(name, handler, concurrency, executor, expand))
+        return self
+
+    def add_sink(
+        self,
+        name: str,
+        handler: Callable[[List[Any]], Awaitable[Any]],
+        batch_size: int = 50,
+        flush_seconds: float = 1.0,
+        concurrency: int = 1
+    ) -> 'Pipeline':
+        """Final stage that receives up to `batch_size` items at a time"""
+        self.stages.append(_Stage(name, handler, concurrency, batch_size=batch_size, flush_seconds=flush_seconds))
+        return self
+
+    async def run(self, items: Union[Iterable, AsyncIterable]) -> Dict:
+        if not self.stages:
+            raise ValueError(f"Pipeline {self.name} has no stages")
+        for stage in self.stages:
+            stage.reset()
+            stage.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+
+        tasks = [asyncio.create_task(self._feed(items))]
+        for index, stage in enumerate(self.stages):
+            downstream = self.stages[index + 1].queue if index + 1 < len(self.stages) else None
+            tasks.append(asyncio.create_task(self._run_stage(stage, downstream)))
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        finally:
+            self.finished_at = time.perf_counter()
+
+        stats = self.stats()
+        logger.info(
+            f"🏭 Pipeline {self.name} finished in {stats['elapsed_seconds']:.1f}s: " +
+            ", ".join(f"{name} {s['processed']} ({s['items_per_second']}/s, max queue {s['max_queue_depth']})"
+                      for name, s in stats['stages'].items())
+        )
+        return stats
+
+    async def _feed(self, items):
+        first = self.stages[0]
+        if hasattr(items, '__aiter__'):
+            async for item in items:
+                await self._put(first, item)
+        else:
+            for item in items:
+                await self._put(first, item)
+        for _ in range(first.concurrency):
+            await first.queue.put(_DONE)
+
+    @staticmethod
+    async def _put(stage: _Stage, item):
+        # Blocks while the stage is behind; this is the backpressure
+        await stage.queue.put(item)
+        stage.max_depth = max(stage.max_depth, stage.queue.qsize())
+
+    async def _run_stage(self, stage: _Stage, downstream: Optional[asyncio.Queue]):
+        worker = self._batch_worker if stage.batch_size else self._item_worker
+        workers = [asyncio.create_task(worker(stage, downstream)) for _ in range(stage.concurrency)]
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            for task in workers:
+                task.cancel()
+            raise
+        if downstream is not None:
+            next_stage = self.stages[self.stages.index(stage) + 1]
+            for _ in range(next_stage.concurrency):
+                await downstream.put(_DONE)
+
+    async def _item_worker(self, stage: _Stage, downstream: Optional[asyncio.Queue]):
+        next_stage = self.stages[self.stages.index(stage) + 1] if downstream is not None else None
+        while True:
+            item = await stage.queue.get()
+            if item is _DONE:
+                return
+            started = time.perf_counter()
+            try:
+                result = await stage.call(item)
+            except Exception as e:
+                stage.failed += 1
+                logger.error(f"Error in {self.name}/{stage.name}: {str(e)}")
+                continue
+            finally:
+                took = time.perf_counter() - started
+                stage.busy_seconds += took
+                stage.latency.record(took)
+            stage.processed += 1
+            outputs = (result or []) if stage.expand else ([] if result is None else [result])
+            if not outputs:
+                stage.dropped += 1
+            if next_stage is not None:
+                for output in outputs:
+                    await self._put(next_stage, output)
+
+    async def _batch_worker(self, stage: _Stage, downstream: Optional[asyncio.Queue]):
+        loop = asyncio.get_running_loop()
+        finished = False
+        while not finished:
+            batch = []
+            item = await stage.queue.get()
+            if item is _DONE:
+                return
+            batch.append(item)
+            deadline = loop.time() + stage.flush_seconds
+            while len(batch) < stage.batch_size:
+                try:
+                    item = await asyncio.wait_for(stage.queue.get(), timeout=max(deadline - loop.time(), 0))
+                except asyncio.TimeoutError:
+                    break
+                if item is _DONE:
+                    finished = True
+                    break
+                batch.append(item)
+
+            started = time.perf_counter()
+            try:
+                await stage.handler(batch)
+                stage.processed += len(batch)
+            except Exception as e:
+                stage.failed += len(batch)
+                logger.error(f"Error in {self.name}/{stage.name} batch of {len(batch)}: {str(e)}")
+            finally:
+                took = time.perf_counter() - started
+                stage.busy_seconds += took
+                stage.latency.record(took)
+
+    def stats(self) -> Dict:
+        if self.started_at is None:
+            return {'running': False, 'elapsed_seconds': 0.0, 'stages': {}}
+        end = self.finished_at or time.perf_counter()
+        elapsed = end - self.started_at
+        return {
+            'running': self.finished_at is None,
+            'elapsed_seconds': round(elapsed, 2),
+            'stages': {stage.name: stage.stats(elapsed) for stage in self.stages},
+        }
+
+
+_pipelines: Dict[str, Pipeline] = {}
+
+
+def pipeline_stats() -> Dict[str, Dict]:
+    """Latest run of every pipeline, by name"""
+    return {name: pipeline.stats() for name, pipeline in _pipelines.items()}
@@ -0,0 +1,152 @@
+"""
+Bulk Price Change Recalculation for CharmTracker
+Recomputes 7/30/90-day price changes for every charm in one vectorized pass
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+from pymongo import UpdateOne
+
+from services.detail_renderer import invalidate_rendered_detail
+
+logger = logging.getLogger(__name__)
+
+# Horizon (days) -> document field
+PRICE_CHANGE_HORIZONS = {
+    7: 'price_change_7d',
+    30: 'price_change_30d',
+    90: 'price_change_90d',
+}
+
+# Spacing between charms in the composite (charm, timestamp) sort key;
+# comfortably larger than any epoch-seconds value we will see
+_KEY_STRIDE = np.int64(1) << np.int64(34)
+
+
+def _history_arrays(price_history: List[Dict]):
+    """Extract (timestamps, prices) for entries with a usable date and price"""
+    times = []
+    prices = []
+    for entry in price_history or []:
+        date = entry.get('date')
+        price = entry.get('price')
+        if not isinstance(date, datetime) or price is None:
+            continue
+        times.append(int(date.timestamp()))
+        prices.append(float(price))
+    return times, prices
+
+
+def compute_price_changes(
+    charms: List[Dict],
+    now: Optional[datetime] = None
+) -> Dict[str, Dict[str, float]]:
+    """
+    Compute price change percentages for many charms at once
+    The baseline for each horizon is the latest history entry at least that
+    many days old, matching DataAggregator._calculate_price_changes
+    """
+    now = now or datetime.utcnow()
+    now_ts = int(now.timestamp())
+
+    charm_ids = []
+    current = []
+    all_times = []
+    all_prices = []
+    owners = []
+
+    for charm in charms:
+        idx = len(charm_ids)
+        charm_ids.append(charm['id'])
+        current.append(float(charm.get('avg_price') or 0.0))
+        times, prices = _history_arrays(charm.get('price_history'))
+        all_times.extend(times)
+        all_prices.extend(prices)
+        owners.extend([idx] * len(times))
+
+    if not charm_ids:
+        return {}
+
+    current = np.asarray(current, dtype=np.float64)
+    times = np.asarray(all_times, dtype=np.int64)
+    prices = np.asarray(all_prices, dtype=np.float64)
+    owners = np.asarray(owners, dtype=np.int64)
+
+    # Sort every history by (charm, time) in one go
+    keys = owners * _KEY_STRIDE + times
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    prices = prices[order]
+    owners = owners[order]
+
+    charm_index = np.arange(len(charm_ids), dtype=np.int64)
+    segment_start = np.searchsorted(owners, charm_index, side='left')
+
+    results = {charm_id: {} for charm_id in charm_ids}
+    for days, field in PRICE_CHANGE_HORIZONS.items():
+        cutoff = now_ts - days * 86400
+        # Last entry per charm with timestamp <= cutoff
+        pos = np.searchsorted(keys, charm_index * _KEY_STRIDE + cutoff, side='right') - 1
+        has_baseline = pos >= segment_start
+        baseline = np.zeros(len(charm_ids), dtype=np.float64)
+        baseline[has_baseline] = prices[pos[has_baseline]]
+
+        valid = has_baseline & (baseline > 0)
+        change = np.zeros(len(charm_ids), dtype=np.float64)
+        change[valid] = (current[valid] - baseline[valid]) / baseline[valid] * 100
+        change = np.round(change, 1)
+
+        for i, charm_id in enumerate(charm_ids):
+            results[charm_id][field] = float(change[i])
+
+    return results
+
+
+async def recalculate_all_price_changes(db, now: Optional[datetime] = None) -> Dict:
+    """
+    Load all price histories, recompute change metrics and write back the
+    ones that moved with a single bulk write
+    """
+    start = datetime.utcnow()
+    projection = {
+        '_id': 0,
+        'id': 1,
+        'avg_price': 1,
+        'price_history.date': 1,
+        'price_history.price': 1,
+    }
+    projection.update({field: 1 for field in PRICE_CHANGE_HORIZONS.values()})
+
+    charms = await db.charms.find({}, projection).to_list(length=None)
+    changes = compute_price_changes(charms, now)
+
+    operations = []
+    for charm in charms:
+        new_values = changes.get(charm['id'])
+        if not new_values:
+            continue
+        if all(charm.get(field) == value for field, value in new_values.items()):
+            continue
+        # Drop the pre-rendered detail; it is rebuilt on the next read
+        operations.append(UpdateOne(
+            {'id': charm['id']},
+            {'$set': new_values, **invalidate_rendered_detail()}
+        ))
+
+    modified = 0
+    if operations:
+        result = await db.charms.bulk_write(operations, ordered=False)
+        modified = result.modified_count
+
+    duration = (datetime.utcnow() - start).total_seconds()
+    stats = {
+        'total': len(charms),
+        'changed': len(operations),
+        'modified': modified,
+        'duration_seconds': round(duration, 3),
+    }
+    logger.info(f"📈 Price changes recalculated: {stats}")
+    return stats
@@ -0,0 +1,210 @@
+"""
+Adaptive Refresh Policy for CharmTracker
+Gives each charm its own refresh interval based on how much its market moves
+and keeps a min-heap of next-due times for the scheduler
+"""
+
+import heapq
+import logging
+import os
+from datetime import datetime, timedelta
+from statistics import mean
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ADAPTIVE_REFRESH = os.getenv('ADAPTIVE_REFRESH', 'true').lower() == 'true'
+BASE_REFRESH_HOURS = float(os.getenv('UPDATE_INTERVAL_HOURS', '6'))
+MIN_REFRESH_HOURS = float(os.getenv('MIN_REFRESH_HOURS', '2'))
+MAX_REFRESH_HOURS = float(os.getenv('MAX_REFRESH_HOURS', '72'))
+RETIRED_INTERVAL_FACTOR = float(os.getenv('RETIRED_INTERVAL_FACTOR', '1.5'))
+
+# Average move between consecutive history points that counts as "volatile"
+VOLATILITY_REFERENCE = 0.05
+VOLATILITY_WINDOW_DAYS = 30
+
+# Share of the urgency score each signal contributes (sums to 1)
+URGENCY_WEIGHTS = {'volatility': 0.5, 'churn': 0.3, 'popularity': 0.2}
+
+
+def price_volatility(price_history: List[Dict], now: Optional[datetime] = None) -> float:
+    """Mean absolute relative change between consecutive recent prices"""
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=VOLATILITY_WINDOW_DAYS)
+    prices = [
+        entry['price'] for entry in price_history or []
+        if isinstance(entry.get('date'), datetime)
+        and entry['date'] >= cutoff
+        and entry.get('price')
+    ]
+    if len(prices) < 2:
+        return 0.0
+    moves = [abs(b - a) / a for a, b in zip(prices, prices[1:]) if a > 0]
+    return mean(moves) if moves else 0.0
+
+
+def listing_churn(old_listings: List[Dict], new_listings: List[Dict]) -> float:
+    """Share of listings that appeared or disappeared since the last update"""
+    old_urls = {l.get('url') for l in old_listings or [] if l.get('url')}
+    new_urls = {l.get('url') for l in new_listings or [] if l.get('url')}
+    union = old_urls | new_urls
+    if not union:
+        return 0.0
+    return 1 - len(old_urls & new_urls) / len(union)
+
+
+def _interpolate_hours(urgency: float) -> float:
+    """
+    Map urgency 0 -> MAX_REFRESH_HOURS, 0.5 -> BASE_REFRESH_HOURS, 1 -> MIN_REFRESH_HOURS,
+    geometrically in between so each step of urgency scales the interval by the same factor
+    """
+    base = max(MIN_REFRESH_HOURS, min(MAX_REFRESH_HOURS, BASE_REFRESH_HOURS))
+    if urgency <= 0.5:
+        return MAX_REFRESH_HOURS * (base / MAX_REFRESH_HOURS) ** (urgency * 2)
+    return base * (MIN_REFRESH_HOURS / base) ** ((urgency - 0.5) * 2)
+
+
+def refresh_interval(
+    price_history: List[Dict],
+    churn: float = 0.0,
+    popularity: int = 50,
+    is_retired: bool = False,
+    now: Optional[datetime] = None
+) -> timedelta:
+    """Refresh interval for one charm"""
+    if not ADAPTIVE_REFRESH:
+        return timedelta(hours=BASE_REFRESH_HOURS)
+
+    # Normalized urgency in [0, 1]: a quiet, unpopular charm sits near 0 and
+    # waits up to MAX_REFRESH_HOURS, a volatile popular one near 1 gets MIN_REFRESH_HOURS
+    volatility = min(price_volatility(price_history, now) / VOLATILITY_REFERENCE, 1.0)
+    popularity = min(max((popularity or 0) / 100, 0.0), 1.0)
+    urgency = (
+        URGENCY_WEIGHTS['volatility'] * volatility
+        + URGENCY_WEIGHTS['churn'] * min(max(churn, 0.0), 1.0)
+        + URGENCY_WEIGHTS['popularity'] * popularity
+    )
+    hours = _interpolate_hours(urgency)
+    if is_retired:
+        hours *= RETIRED_INTERVAL_FACTOR
+
+    hours = max(MIN_REFRESH_HOURS, min(MAX_REFRESH_HOURS, hours))
+    return timedelta(hours=hours)
+
+
+def refresh_schedule(existing_charm: Dict, update_data: Dict) -> Dict:
+    """
+    Fields describing when a charm should next be refreshed,
+    computed from the data just written for it
+    """
+    now = update_data.get('last_updated') or datetime.utcnow()
+    new_listings = update_data.get('listings', existing_charm.get('listings', []))
+    churn = listing_churn(existing_charm.get('listings', []), new_listings)
+    interval = refresh_interval(
+        update_data.get('price_history', existing_charm.get('price_history', [])),
+        churn=churn,
+        popularity=update_data.get('popularity', existing_charm.get('popularity', 50)),
+        is_retired=update_data.get('is_retired', existing_charm.get('is_retired', False)),
+        now=now
+    )
+    return {
+        'listing_churn': round(churn, 3),
+        'refresh_interval_hours': round(interval.total_seconds() / 3600, 2),
+        'next_refresh_at': now + interval,
+    }
+
+
+class RefreshQueue:
+    """
+    Min-heap of (next_due, charm_id) driving which charm is updated next
+    Loaded from the charms collection once; after that every persisted update
+    pushes its own next_refresh_at, and superseded heap entries are skipped on pop
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime, str]] = []
+        self._due: Dict[str, datetime] = {}
+        self.loaded = False
+
+    def __len__(self):
+        return len(self._due)
+
+    def __contains__(self, charm_id: str) -> bool:
+        return charm_id in self._due
+
+    def push(self, charm_id: str, due: datetime):
+        self._due[charm_id] = due
+        heapq.heappush(self._heap, (due, charm_id))
+
+    def _drop_stale(self):
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def pop_due(self, now: Optional[datetime] = None, limit: Optional[int] = None) -> List[str]:
+        """Pop charms whose refresh is due, most overdue first"""
+        now = now or datetime.utcnow()
+        due = []
+        self._drop_stale()
+        while self._heap and self._heap[0][0] <= now:
+            if limit is not None and len(due) >= limit:
+                break
+            charm_id = heapq.heappop(self._heap)[1]
+            del self._due[charm_id]
+            due.append(charm_id)
+            self._drop_stale()
+        return due
+
+    def next_due(self) -> Optional[datetime]:
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    async def load(self, db):
+        """Build the heap from the charms collection (first call only)"""
+        if self.loaded:
+            return
+        docs = await db.charms.find(
+            {'next_refresh_at': {'$type': 'date'}},
+            {'_id': 0, 'id': 1, 'next_refresh_at': 1}
+        ).to_list(length=None)
+        for doc in docs:
+            self._due[doc['id']] = doc['next_refresh_at']
+        self._heap = [(due, charm_id) for charm_id, due in self._due.items()]
+        heapq.heapify(self._heap)
+        self.loaded = True
+        await self.load_unscheduled(db)
+        logger.info(f"🗓️  Refresh queue loaded: {len(self)} charms")
+
+    async def load_unscheduled(self, db):
+        """
+        Add charms never refreshed under this policy (new from the catalog
+        scrape, or older than the policy), scheduled from their history
+        """
+        unscheduled = await db.charms.find(
+            {'next_refresh_at': {'$not': {'$type': 'date'}}}, {'_id': 0, 'id': 1}
+        ).to_list(length=None)
+        new_ids = [doc['id'] for doc in unscheduled if doc['id'] not in self._due]
+        if not new_ids:
+            return
+
+        cursor = db.charms.find(
+            {'id': {'$in': new_ids}},
+            {
+                '_id': 0, 'id': 1, 'last_updated': 1, 'popularity': 1,
+                'is_retired': 1, 'price_history.date': 1, 'price_history.price': 1
+            }
+        )
+        async for doc in cursor:
+            last_updated = doc.get('last_updated')
+            if not isinstance(last_updated, datetime):
+                last_updated = datetime.min
+            interval = refresh_interval(
+                doc.get('price_history', []),
+                popularity=doc.get('popularity', 50),
+                is_retired=doc.get('is_retired', False)
+            )
+            self.push(doc['id'], last_updated + interval)
+        logger.info(f"🗓️  Refresh queue: {len(new_ids)} unscheduled charms added")
+
+
+# Global instance shared by the scheduler and the aggregator's persist stage
+refresh_queue = RefreshQueue()
@@ -6,14 +6,33 @@ Runs James Avery scraper every 6 hours with duplicate prevention
 
 import asyncio
 import logging
-from datetime import datetime, time
-from typing import Optional
+from datetime import datetime, time, timedelta
+from typing import List, Optional
 import os
 
-from .data_aggregator import DataAggregator
+from .data_aggregator import PERSIST_BATCH_SIZE, DataAggregator
+from .catalog_engine import catalog_engine
+from .catalog_snapshot import publish_snapshot
+from .detail_renderer import refresh_rendered_detail
+from .refresh_policy import MIN_REFRESH_HOURS, refresh_queue
+from .broad_crawl import BROAD_CRAWL_ENABLED, BROAD_CRAWL_MIN_CHARMS, broad_crawl
+from .variant_groups import GROUP_VARIANT_SEARCHES, VARIANT_PROJECTION, group_charms
+from .pipeline import PIPELINE_PARSE_WORKERS, Pipeline, process_pool
+from .crawl_frontier import FAILED, CrawlFrontier
+from pymongo import InsertOne, UpdateOne
+from scrapers.james_avery_scraper import catalog_fields
+from pymongo.errors import BulkWriteError
 
 logger = logging.getLogger(__name__)
 
+# Product pages downloaded at once during a catalog sync (still paced by the
+# James Avery limiter)
+CATALOG_FETCH_CONCURRENCY = int(os.getenv('CATALOG_FETCH_CONCURRENCY', '4'))
+# 'sitemap' queues only changed products; 'pages' always pages through /charms
+JAMES_AVERY_DISCOVERY = os.getenv('JAMES_AVERY_DISCOVERY', 'sitemap').lower()
+# Re-fetch every product at least this often (prices can change without a new lastmod)
+SITEMAP_FULL_REFRESH_HOURS = float(os.getenv('SITEMAP_FULL_REFRESH_HOURS', '168'))
+
 
 class BackgroundScheduler:
     """Manages scheduled background tasks"""
@@ -24,14 +43,24 @@ class BackgroundScheduler:
         self.running = False
         self.task = None
         self.scraper_task = None
+        self.price_change_task = None
         
         # Configuration
         self.update_interval_hours = int(os.getenv('UPDATE_INTERVAL_HOURS', '6'))
         self.update_time = os.getenv('UPDATE_TIME', '02:00')  # Default 2 AM
         self.batch_size = int(os.getenv('UPDATE_BATCH_SIZE', '10'))
         
+        # Per-charm refresh times (see services/refresh_policy.py)
+        self.refresh_queue = refresh_queue
+        self.queue_poll_seconds = int(os.getenv('REFRESH_QUEUE_POLL_SECONDS', '900'))
+        
         # James Avery scraper interval (6 hours = 21600 seconds)
         self.scraper_interval_seconds = 6 * 60 * 60  # 6 hours
+        # Scheduled and manual scrapes would resume the same crawl run
+        self.scrape_lock = asyncio.Lock()
+        
+        # Bulk price change recalculation (cheap, runs from stored history)
+        self.price_change_interval_minutes = int(os.getenv('PRICE_CHANGE_INTERVAL_MINUTES', '60'))
     
     async def start(self):
         """Start the background scheduler"""
@@ -42,9 +71,11 @@ class BackgroundScheduler:
         self.running = True
         self.task = asyncio.create_task(self._run_scheduler())
         self.scraper_task = asyncio.create_task(self._run_james_avery_scraper())
+        self.price_change_task = asyncio.create_task(self._run_price_change_recalculation())
         logger.info("🚀 Background scheduler started")
-        logger.info(f"📅 Marketplace updates: every {self.update_interval_hours} hours")
+        logger.info(f"📅 Marketplace updates: adaptive per charm (base {self.update_interval_hours} hours)")
         logger.info(f"🏪 James Avery scraper: every 6 hours")
+        logger.info(f"📈 Price change recalculation: every {self.price_change_interval_minutes} minutes")
     
     async def stop(self):
         """Stop the background scheduler"""
@@ -66,6 +97,13 @@ class BackgroundScheduler:
             except asyncio.CancelledError:
                 pass
         
+        if self.price_change_task:
+            self.price_change_task.cancel()
+            try:
+                await self.price_change_task
+            except asyncio.CancelledError:
+                pass
+        
         logger.info("Background scheduler stopped")
     
     async def _run_scheduler(self):
@@ -74,8 +112,8 @@ class BackgroundScheduler:
             try:
                 await self._update_cycle()
                 
-                # Wait for next update interval
-                await asyncio.sleep(self.update_interval_hours * 3600)
+                # Sleep until the next charm is due (re-check periodically for new charms)
+                await asyncio.sleep(self._seconds_until_next_due())
                 
             except asyncio.CancelledError:
                 logger.info("Scheduler task cancelled")
@@ -85,52 +123,81 @@ class BackgroundScheduler:
                 # Wait before retrying
                 await asyncio.sleep(300)  # 5 minutes
     
+    def _seconds_until_next_due(self) -> float:
+        next_due = self.refresh_queue.next_due()
+        if next_due is None:
+            return self.queue_poll_seconds
+        wait = (next_due - datetime.utcnow()).total_seconds()
+        return min(max(wait, 60), self.queue_poll_seconds)
+    
+    async def _defer_refresh(self, charm_id: str):
+        """Push a failed charm back so it is retried later, not on the next poll"""
+        retry_at = datetime.utcnow() + timedelta(hours=MIN_REFRESH_HOURS)
+        self.refresh_queue.push(charm_id, retry_at)
+        try:
+            await self.db.charms.update_one(
+                {"id": charm_id},
+                {"$set": {"next_refresh_at": retry_at}}
+            )
+        except Exception as e:
+            logger.error(f"Error deferring refresh for {charm_id}: {str(e)}")
+    
     async def _update_cycle(self):
-        """Run a complete update cycle"""
+        """Update every charm whose refresh is due, most overdue first"""
         try:
-            logger.info("Starting scheduled update cycle")
             start_time = datetime.utcnow()
             
-            # Get charms that need updating (oldest first)
-            charms = await self.db.charms.find().sort("last_updated", 1).to_list(1000)
+            # Built once; persisted updates push their own next refresh, so
+            # each cycle only looks for charms added since (e.g. by the catalog scrape)
+            if self.refresh_queue.loaded:
+                await self.refresh_queue.load_unscheduled(self.db)
+            else:
+                await self.refresh_queue.load(self.db)
+            charm_ids = self.refresh_queue.pop_due(start_time)
+            charms = [{'id': charm_id} for charm_id in charm_ids]
+            if GROUP_VARIANT_SEARCHES and charm_ids:
+                found = await self.db.charms.find(
+                    {'id': {'$in': charm_ids}}, VARIANT_PROJECTION
+                ).to_list(length=None)
+                by_id = {charm['id']: charm for charm in found}
+                charms = [by_id.get(charm_id, {'id': charm_id}) for charm_id in charm_ids]
             
             total_charms = len(charms)
-            logger.info(f"Found {total_charms} charms to update")
+            if total_charms == 0:
+                return
+            logger.info(f"Starting scheduled update cycle: {total_charms} charms due")
             
-            # Update in batches
-            success_count = 0
-            fail_count = 0
+            # One pass over each marketplace instead of a search per charm;
+            # results land in the search cache the per-charm updates read from
+            if BROAD_CRAWL_ENABLED and total_charms >= BROAD_CRAWL_MIN_CHARMS:
+                await broad_crawl(self.db, self.aggregator)
             
-            for i in range(0, total_charms, self.batch_size):
-                batch = charms[i:i + self.batch_size]
-                
-                logger.info(f"Processing batch {i//self.batch_size + 1}")
-                
-                # Update batch in parallel
-                tasks = [
-                    self.aggregator.update_charm_data(charm['id'])
-                    for charm in batch
-                ]
-                
-                results = await asyncio.gather(*tasks, return_exceptions=True)
-                
-                for result in results:
-                    if isinstance(result, Exception):
-                        fail_count += 1
-                    elif result:
-                        success_count += 1
-                    else:
-                        fail_count += 1
-                
-                # Rate limiting between batches
-                if i + self.batch_size < total_charms:
-                    await asyncio.sleep(10)  # 10 seconds between batches
+            # Metal variants of one design share a single marketplace search
+            groups = group_charms(charms) if GROUP_VARIANT_SEARCHES else [[charm] for charm in charms]
+            if len(groups) < total_charms:
+                logger.info(f"🔗 {total_charms} charms share {len(groups)} marketplace searches")
+            
+            # Keep `batch_size` searches in flight; marketplace pacing comes
+            # from the per-platform limiters (scrapers/rate_limiter.py)
+            outcomes = await self.aggregator.update_charms(groups, concurrency=self.batch_size)
+            success_count = sum(1 for ok in outcomes.values() if ok)
+            fail_count = len(outcomes) - success_count
+            for charm_id, ok in outcomes.items():
+                if not ok:
+                    await self._defer_refresh(charm_id)
+            
+            # Charms skipped because a manual update was running reschedule
+            # themselves when it persists; if it has not, check again next poll
+            skipped = [charm['id'] for charm in charms if charm['id'] not in outcomes]
+            for charm_id in skipped:
+                if charm_id not in self.refresh_queue:
+                    self.refresh_queue.push(charm_id, datetime.utcnow() + timedelta(seconds=self.queue_poll_seconds))
             
             # Log results
             duration = (datetime.utcnow() - start_time).total_seconds()
             logger.info(
                 f"Update cycle complete: {success_count} success, "
-                f"{fail_count} failed in {duration:.1f}s"
+                f"{fail_count} failed, {len(skipped)} skipped in {duration:.1f}s"
             )
             
             # Store update statistics
@@ -140,12 +207,31 @@ class BackgroundScheduler:
                 "duration_seconds": duration,
                 "total_charms": total_charms,
                 "success_count": success_count,
-                "fail_count": fail_count
+                "fail_count": fail_count,
+                "skipped_count": len(skipped)
             })
             
+            # Share the refreshed catalog with API workers
+            await publish_snapshot(self.db)
+            
         except Exception as e:
             logger.error(f"Error in update cycle: {str(e)}")
     
+    async def _run_price_change_recalculation(self):
+        """Recalculate 7/30/90-day price changes for all charms on an interval"""
+        while self.running:
+            try:
+                await self.aggregator.recalculate_price_changes()
+                await publish_snapshot(self.db)
+                await asyncio.sleep(self.price_change_interval_minutes * 60)
+                
+            except asyncio.CancelledError:
+                logger.info("Price change task cancelled")
+                break
+            except Exception as e:
+                logger.error(f"Error in price change loop: {str(e)}")
+                await asyncio.sleep(300)  # 5 minutes
+    
     async def _run_james_avery_scraper(self):
         """Run James Avery scraper every 6 hours with duplicate prevention"""
         logger.info("🏪 James Avery scraper scheduler started")
@@ -178,137 +264,89 @@ class BackgroundScheduler:
     
     async def _run_james_avery_scrape(self):
         """Execute James Avery scraper with duplicate prevention"""
+        if self.scrape_lock.locked():
+            logger.info("🏪 James Avery scrape already running, skipping")
+            return
+        async with self.scrape_lock:
+            await self._james_avery_crawl()
+    
+    async def _james_avery_crawl(self):
+        from scrapers.james_avery_scraper import JamesAveryScraper, parse_product_page
+        
+        scraper = JamesAveryScraper()
         try:
-            from scrapers.james_avery_scraper import JamesAveryScraper
+            start_time = datetime.utcnow()
+            
+            # Resumes an unfinished crawl (restart, deploy) where it stopped
+            frontier = CrawlFrontier(self.db, 'james_avery')
+            run = await frontier.open()
             
-            scraper = JamesAveryScraper()
+            if not run['discovery_complete']:
+                await self._discover_james_avery(scraper, frontier, run)
             
-            # Get all product URLs
-            logger.info("🔍 Finding all James Avery products...")
-            product_urls = await scraper._get_all_product_urls()
-            total = len(product_urls)
-            logger.info(f"✅ Found {total} products")
+            product_urls = await frontier.todo()
+            total = sum((await frontier.counts()).values())
+            logger.info(f"✅ Found {total} products, {len(product_urls)} to fetch")
             
             if total == 0:
-                logger.warning("⚠️ No products found from James Avery")
+                if frontier.run.get('discovery_mode') == 'sitemap':
+                    logger.info("✅ No new or changed James Avery products since the last crawl")
+                else:
+                    logger.warning("⚠️ No products found from James Avery")
+                await frontier.complete()
                 return
             
-            saved = 0
-            updated = 0
-            skipped = 0
-            failed = 0
-            start_time = datetime.utcnow()
+            counts = {'saved': 0, 'updated': 0, 'skipped': 0}
             
-            for i, url in enumerate(product_urls, 1):
+            async def fetch(url):
+                # Paced by the shared James Avery limiter
                 try:
-                    # Rate limiting
-                    if i > 1:
-                        await asyncio.sleep(0.5)  # 500ms between requests
-                    
-                    # Scrape product
                     html = await scraper._make_request(url)
-                    if not html:
-                        failed += 1
-                        continue
-                    
-                    data = scraper._parse_product_page(html, url)
-                    if not data or not data.get('name'):
-                        failed += 1
-                        continue
-                    
-                    # Create charm document
-                    name = data['name']
-                    charm_id = f"charm_{name.lower().replace(' ', '_').replace('-', '_')}"
-                    
-                    # Format images
-                    images = data.get('images', [])
-                    formatted_images = []
-                    for img_url in images:
-                        if 'scene7.com' in img_url and '?' not in img_url:
-                            img_url = f"{img_url}?wid=800&hei=800&fmt=jpeg&qlt=90"
-                        formatted_images.append(img_url)
-                    
-                    # Check if charm exists
-                    existing = await self.db.charms.find_one({'_id': charm_id})
-                    
-                    if existing:
-                        # Check if data has changed
-                        has_changes = (
-                            existing.get('name') != name or
-                            existing.get('price') != data.get('price') or
-                            existing.get('official_price') != data.get('official_price') or
-                            existing.get('status') != data.get('status') or
-                            existing.get('images') != formatted_images
-                        )
-                        
-                        if has_changes:
-                            # Update only if data changed
-                            await self.db.charms.update_one(
-                                {'_id': charm_id},
-                                {'$set': {
-                                    'name': name,
-                                    'description': data.get('description', f"Beautiful {name} from James Avery"),
-                                    'price': data.get('price', data.get('official_price')),
-                                    'official_price': data.get('official_price'),
-                                    'material': data.get('material', 'Sterling Silver'),
-                                    'images': formatted_images,
-                                    'url': data.get('url', url),
-                                    'sku': data.get('sku'),
-                                    'status': data.get('status', 'Active'),
-                                    'is_retired': data.get('status') == 'Retired',
-                                    'scraped_at': datetime.utcnow(),
-                                    'last_updated': datetime.utcnow()
-                                }}
-                            )
-                            updated += 1
-                            if i % 50 == 0:
-                                logger.info(f"[{i}/{total}] ✏️  Updated: {name}")
-                        else:
-                            skipped += 1
-                            if i % 50 == 0:
-                                logger.info(f"[{i}/{total}] ⏭️  Skipped (no changes): {name}")
-                    else:
-                        # Insert new charm
-                        charm = {
-                            '_id': charm_id,
-                            'id': charm_id,
-                            'name': name,
-                            'description': data.get('description', f"Beautiful {name} from James Avery"),
-                            'price': data.get('price', data.get('official_price')),
-                            'official_price': data.get('official_price'),
-                            'material': data.get('material', 'Sterling Silver'),
-                            'images': formatted_images,
-                            'url': data.get('url', url),
-                            'sku': data.get('sku'),
-                            'status': data.get('status', 'Active'),
-                            'is_retired': data.get('status') == 'Retired',
-                            'avg_price': data.get('price', data.get('official_price', 50)),
-                            'price_change_7d': 0.0,
-                            'price_change_30d': 0.0,
-                            'price_change_90d': 0.0,
-                            'popularity': 75,
-                            'listings': [],
-                            'price_history': [],
-                            'related_charm_ids': [],
-                            'scraped_at': datetime.utcnow(),
-                            'created_at': datetime.utcnow(),
-                            'last_updated': datetime.utcnow()
-                        }
-                        await self.db.charms.insert_one(charm)
-                        saved += 1
-                        if i % 50 == 0:
-                            logger.info(f"[{i}/{total}] ✅ Saved: {name}")
-                    
-                    # Progress update every 100 items
-                    if i % 100 == 0:
-                        elapsed = (datetime.utcnow() - start_time).total_seconds() / 60
-                        logger.info(f"Progress: {i}/{total} | Saved: {saved} | Updated: {updated} | Skipped: {skipped} | Failed: {failed} | Time: {elapsed:.1f}min")
-                
                 except Exception as e:
-                    failed += 1
-                    if i % 100 == 0:
-                        logger.error(f"Error processing product: {str(e)[:100]}")
-                    continue
+                    await frontier.mark_failed(url, str(e)[:200])
+                    raise
+                if not html:
+                    await frontier.mark_failed(url, 'fetch')
+                    return None
+                await frontier.mark_fetched(url)
+                return url, html
+            
+            async def parse(page):
+                parsed = await asyncio.get_running_loop().run_in_executor(process_pool(), parse_product_page, page)
+                if parsed is None:
+                    await frontier.mark_failed(page[0], 'parse', attempted=False)
+                return parsed
+            
+            async def persist(batch):
+                failed_urls = await self._persist_catalog_batch(batch, counts)
+                for url in failed_urls:
+                    await frontier.mark_failed(url, 'persist', attempted=False)
+                await frontier.mark_parsed([url for url, _ in batch if url not in failed_urls])
+                done = sum(counts.values())
+                if done // 100 != (done - len(batch)) // 100:
+                    elapsed = (datetime.utcnow() - start_time).total_seconds() / 60
+                    logger.info(
+                        f"Progress: {done}/{len(product_urls)} | Saved: {counts['saved']} | Updated: {counts['updated']} | "
+                        f"Skipped: {counts['skipped']} | Time: {elapsed:.1f}min"
+                    )
+            
+            # Downloads, HTML parsing and Mongo writes overlap instead of
+            # running one product at a time
+            pipeline = Pipeline('catalog_sync')
+            pipeline.add_stage('fetch', fetch, concurrency=CATALOG_FETCH_CONCURRENCY)
+            pipeline.add_stage('parse', parse, concurrency=PIPELINE_PARSE_WORKERS)
+            pipeline.add_sink('persist', persist, batch_size=PERSIST_BATCH_SIZE)
+            
+            # Failed pages are retried until they run out of attempts
+            for _ in range(frontier.max_attempts):
+                if not product_urls:
+                    break
+                await pipeline.run(product_urls)
+                product_urls = await frontier.todo()
+            
+            states = await frontier.complete()
+            saved, updated, skipped = counts['saved'], counts['updated'], counts['skipped']
+            failed = states.get(FAILED, 0)
             
             # Final summary
             duration = (datetime.utcnow() - start_time).total_seconds() / 60
@@ -326,13 +364,134 @@ class BackgroundScheduler:
             logger.info(f"⏱️  Duration: {duration:.1f} minutes")
             logger.info("="*70)
             
-            if hasattr(scraper, 'session') and scraper.session:
-                await scraper.session.close()
+            await publish_snapshot(self.db)
             
         except Exception as e:
             logger.error(f"❌ Error in James Avery scrape: {str(e)}")
             import traceback
             traceback.print_exc()
+        finally:
+            if scraper.session:
+                await scraper.session.close()
+    
+    async def _discover_james_avery(self, scraper, frontier: CrawlFrontier, run):
+        """
+        Queue product URLs for this crawl run
+        From the sitemap only new or changed pages are queued (everything
+        once every SITEMAP_FULL_REFRESH_HOURS); /charms paging is the fallback
+        """
+        # A run that already paged part of the catalog keeps paging
+        if JAMES_AVERY_DISCOVERY == 'sitemap' and run['discovery_page'] < 0:
+            logger.info("🗺️  Reading James Avery sitemaps...")
+            lastmods = await scraper.get_sitemap_products()
+            if lastmods:
+                last_full = await frontier.last_full_crawl()
+                full = last_full is None or datetime.utcnow() - last_full >= timedelta(hours=SITEMAP_FULL_REFRESH_HOURS)
+                urls = list(lastmods) if full else await frontier.changed_since_seen(lastmods)
+                await frontier.add(urls, lastmods)
+                await frontier.finish_discovery('sitemap', full=full or len(urls) == len(lastmods))
+                logger.info(
+                    f"🗺️  {len(urls)} of {len(lastmods)} products queued "
+                    f"({'full refresh' if full else 'new or changed since last crawl'})"
+                )
+                return
+            logger.warning("⚠️ Sitemap discovery failed, paging through /charms instead")
+        
+        logger.info("🔍 Finding all James Avery products...")
+        await scraper._get_all_product_urls(
+            start_page=run['discovery_page'] + 1,
+            on_page=frontier.checkpoint_discovery
+        )
+        await frontier.finish_discovery('pages')
+    
+    async def _persist_catalog_batch(self, batch, counts) -> List[str]:
+        """
+        Insert or update a batch of parsed product pages with one bulk write
+        Returns the URLs whose write failed
+        """
+        now = datetime.utcnow()
+        
+        # Later pages win when two URLs map to the same charm
+        products = {}
+        for url, data in batch:
+            name = data['name']
+            charm_id = f"charm_{name.lower().replace(' ', '_').replace('-', '_')}"
+            products[charm_id] = (url, data)
+        counts['skipped'] += len(batch) - len(products)
+        
+        existing = {
+            doc['_id']: doc
+            async for doc in self.db.charms.find(
+                {'_id': {'$in': list(products)}},
+                {'name': 1, 'price': 1, 'official_price': 1, 'status': 1, 'images': 1}
+            )
+        }
+        
+        ops = []
+        op_ids = []
+        inserted = []
+        changed = []
+        for charm_id, (url, data) in products.items():
+            name = data['name']
+            fields = {**catalog_fields(url, data), 'scraped_at': now, 'last_updated': now}
+            formatted_images = fields['images']
+            
+            current = existing.get(charm_id)
+            if current:
+                # Update only if data changed
+                has_changes = (
+                    current.get('name') != name or
+                    current.get('price') != data.get('price') or
+                    current.get('official_price') != data.get('official_price') or
+                    current.get('status') != data.get('status') or
+                    current.get('images') != formatted_images
+                )
+                if has_changes:
+                    ops.append(UpdateOne({'_id': charm_id}, {'$set': fields}))
+                    op_ids.append(charm_id)
+                    changed.append(charm_id)
+                else:
+                    counts['skipped'] += 1
+            else:
+                charm = {
+                    '_id': charm_id,
+                    'id': charm_id,
+                    **fields,
+                    'avg_price': data.get('price', data.get('official_price', 50)),
+                    'price_change_7d': 0.0,
+                    'price_change_30d': 0.0,
+                    'price_change_90d': 0.0,
+                    'popularity': 75,
+                    'listings': [],
+                    'price_history': [],
+                    'related_charm_ids': [],
+                    'created_at': now
+                }
+                ops.append(InsertOne(charm))
+                op_ids.append(charm_id)
+                inserted.append(charm)
+        
+        if not ops:
+            return []
+        
+        failed_ids = set()
+        try:
+            await self.db.charms.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            failed_ids = {op_ids[err['index']] for err in e.details.get('writeErrors', [])}
+            logger.error(f"Error writing {len(failed_ids)} of {len(ops)} catalog products: {str(e)[:100]}")
+        
+        inserted = [charm for charm in inserted if charm['_id'] not in failed_ids]
+        changed = [charm_id for charm_id in changed if charm_id not in failed_ids]
+        catalog_engine.upsert_many(inserted)
+        await catalog_engine.refresh_charms(self.db, changed)
+        for charm in inserted:
+            await refresh_rendered_detail(self.db, charm['_id'])
+            counts['saved'] += 1
+        for charm_id in changed:
+            await refresh_rendered_detail(self.db, charm_id)
+            counts['updated'] += 1
+        return [products[charm_id][0] for charm_id in failed_ids]
     
     async def trigger_immediate_update(self, charm_id: Optional[str] = None):
         """Trigger an immediate update outside the schedule"""
@@ -353,6 +512,8 @@ class BackgroundScheduler:
     async def trigger_immediate_scrape(self):
         """Trigger an immediate James Avery scrape outside the schedule"""
         try:
+            if self.scrape_lock.locked():
+                return {"success": False, "error": "James Avery scrape already running"}
             logger.info("🏪 Triggering immediate James Avery scrape...")
             await self._run_james_avery_scrape()
             return {"success": True, "message": "James Avery scrape completed"}
@@ -0,0 +1,63 @@
+"""
+Request Coalescing for CharmTracker
+Concurrent callers asking for the same key share one in-flight call and its result
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent async calls by key
+    The shared call is cancelled only when every caller waiting on it is cancelled
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[Hashable, int] = {}
+        self.coalesced = 0
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable]) -> Any:
+        """Run `call()` for `key`, or wait for the run already in progress"""
+        task = self._calls.get(key)
+        if task is None or task.done():
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+        else:
+            self.coalesced += 1
+            logger.debug(f"[{self.name}] Joining in-flight call for {key}")
+
+        self._waiters[key] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._calls.get(key) is task:
+                self._waiters[key] -= 1
+                if self._waiters[key] == 0:
+                    task.cancel()
+            raise
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+            self._waiters.pop(key, None)
+
+    def stats(self) -> Dict:
+        return {'in_flight': len(self._calls), 'coalesced': self.coalesced}
+
+
+# Whole-charm updates, keyed by charm id
+charm_updates = SingleFlight('charm_updates')
+
+# Marketplace searches, keyed by (platform, normalized query)
+marketplace_searches = SingleFlight('marketplace_searches')
@@ -0,0 +1,152 @@
+"""
+Listing Title Matching for CharmTracker
+Aho-Corasick automaton over charm names, aliases and SKUs so a marketplace
+listing title can be assigned to catalog charms in a single pass
+"""
+
+import logging
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+SKU_PATTERN = re.compile(r'\b([A-Z]{2,4}-\d{3,6})\b')
+
+# Words dropped to derive the short alias of a charm name
+MATERIAL_WORDS = (
+    'sterling silver', '14k yellow gold', '14k gold', '18k gold', 'yellow gold',
+    'rose gold', 'gold', 'silver', 'bronze', 'copper', 'enamel',
+)
+GENERIC_WORDS = {'charm', 'charms', 'james', 'avery', 'the', 'a'}
+
+# Aliases shorter than this (in characters) are too ambiguous to match on
+MIN_ALIAS_LENGTH = 5
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase alphanumerics separated by single spaces, padded for word boundaries"""
+    return f" {' '.join(_NON_WORD.sub(' ', (text or '').lower()).split())} "
+
+
+def base_name(name: str) -> str:
+    """Charm name without material words and generic terms ('Sterling Silver Cross Charm' -> 'cross')"""
+    short = normalize_text(name)
+    for words in MATERIAL_WORDS:
+        short = short.replace(f' {words} ', ' ')
+    return ' '.join(w for w in short.split() if w not in GENERIC_WORDS)
+
+
+class AhoCorasick:
+    """Multi-pattern substring search; patterns map to arbitrary payloads"""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[str, object]]] = [[]]
+        self._built = False
+
+    def add(self, pattern: str, payload: object):
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((pattern, payload))
+        self._built = False
+
+    def build(self):
+        """Compute failure links breadth-first"""
+        queue = deque()
+        for nxt in self._goto[0].values():
+            self._fail[nxt] = 0
+            queue.append(nxt)
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        self._built = True
+
+    def search(self, text: str) -> List[Tuple[str, object]]:
+        """All (pattern, payload) pairs occurring in text"""
+        if not self._built:
+            self.build()
+        node = 0
+        found = []
+        for ch in text:
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            if self._out[node]:
+                found.extend(self._out[node])
+        return found
+
+
+def charm_patterns(charm: Dict) -> Set[Tuple[str, bool]]:
+    """Normalized (pattern, is_sku) pairs from a charm's name, aliases and SKUs"""
+    patterns = set()
+    name = normalize_text(charm.get('name', ''))
+    if name.strip():
+        patterns.add((name, False))
+
+    short = base_name(name)
+    if len(short) >= MIN_ALIAS_LENGTH:
+        patterns.add((f' {short} ', False))
+
+    for alias in charm.get('aliases', []) or []:
+        alias = normalize_text(alias)
+        if len(alias.strip()) >= MIN_ALIAS_LENGTH:
+            patterns.add((alias, False))
+
+    skus = set()
+    if charm.get('sku'):
+        skus.add(str(charm['sku']).upper())
+    for field in ('url', 'james_avery_url'):
+        skus.update(SKU_PATTERN.findall(charm.get(field) or ''))
+    for sku in skus:
+        patterns.add((normalize_text(sku), True))
+    return patterns
+
+
+class CharmMatcher:
+    """Assigns listing titles to charms; a SKU match wins, then the longest name match"""
+
+    def __init__(self, charms: Iterable[Dict]):
+        self.automaton = AhoCorasick()
+        self.size = 0
+        for charm in charms:
+            for pattern, is_sku in charm_patterns(charm):
+                self.automaton.add(pattern, (charm['id'], is_sku))
+            self.size += 1
+        self.automaton.build()
+        logger.info(f"🔤 Title matcher built for {self.size} charms")
+
+    def match(self, title: str) -> List[str]:
+        """Charm ids a title refers to (several when variants share a name)"""
+        hits = self.automaton.search(normalize_text(title))
+        if not hits:
+            return []
+        skus = {charm_id for _, (charm_id, is_sku) in hits if is_sku}
+        if skus:
+            return sorted(skus)
+        best = max(len(pattern) for pattern, _ in hits)
+        return sorted({charm_id for pattern, (charm_id, _) in hits if len(pattern) == best})
+
+    def assign(self, listings: Iterable[Dict]) -> Dict[str, List[Dict]]:
+        """Group listings by matched charm id"""
+        assigned: Dict[str, List[Dict]] = {}
+        for listing in listings:
+            for charm_id in self.match(listing.get('title', '')):
+                assigned.setdefault(charm_id, []).append(listing)
+        return assigned
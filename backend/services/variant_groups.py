@@ -0,0 +1,99 @@
+"""
+Shared-Name Variant Grouping for CharmTracker
+Metal variants of one design ('Sterling Silver Cross Charm', '14K Gold Cross Charm')
+are searched once under their common name; the results are split back to each
+variant by material keywords in the title, then by nearest reference price
+"""
+
+import logging
+import math
+import os
+from typing import Dict, Iterable, List, Optional
+
+from services.title_matcher import MATERIAL_WORDS, normalize_text
+
+logger = logging.getLogger(__name__)
+
+GROUP_VARIANT_SEARCHES = os.getenv('GROUP_VARIANT_SEARCHES', 'true').lower() == 'true'
+
+# Charm fields needed to group variants and split results between them
+VARIANT_PROJECTION = {'_id': 0, 'id': 1, 'name': 1, 'material': 1, 'james_avery_price': 1, 'avg_price': 1}
+
+# Title keywords -> canonical material, most specific first
+MATERIAL_KEYWORDS = (
+    ('14k', 'gold'), ('18k', 'gold'), ('10k', 'gold'), ('gold', 'gold'),
+    ('sterling', 'silver'), ('925', 'silver'), ('silver', 'silver'),
+    ('bronze', 'bronze'), ('copper', 'copper'),
+)
+
+
+def variant_query(name: str) -> str:
+    """Search query shared by all metal variants of a charm name"""
+    query = normalize_text(name)
+    for words in MATERIAL_WORDS:
+        query = query.replace(f' {words} ', ' ')
+    query = ' '.join(query.split())
+    return query or ' '.join(normalize_text(name).split())
+
+
+def material_of(text: Optional[str]) -> Optional[str]:
+    """Canonical material named in text; 'mixed' when it names more than one"""
+    words = set(normalize_text(text).split())
+    found = {material for keyword, material in MATERIAL_KEYWORDS if keyword in words}
+    if len(found) > 1:
+        return 'mixed'
+    return found.pop() if found else None
+
+
+def reference_price(charm: Dict) -> Optional[float]:
+    for field in ('james_avery_price', 'avg_price'):
+        price = charm.get(field)
+        if isinstance(price, (int, float)) and price > 0:
+            return float(price)
+    return None
+
+
+def group_charms(charms: Iterable[Dict]) -> List[List[Dict]]:
+    """Charms bucketed by shared search query, in first-seen order"""
+    groups: Dict[str, List[Dict]] = {}
+    for charm in charms:
+        # Charms without a name cannot share a search
+        key = variant_query(charm['name']) if charm.get('name') else f"id:{charm['id']}"
+        groups.setdefault(key, []).append(charm)
+    return list(groups.values())
+
+
+def partition_listings(listings: List[Dict], variants: List[Dict]) -> Dict[str, List[Dict]]:
+    """
+    Split one search's listings between variants (dicts with id, name,
+    material and prices). A listing naming a material goes to the variants of
+    that material; otherwise it goes to the variant whose reference price is
+    closest on a log scale. Listings nothing can place go to every variant.
+    """
+    assigned: Dict[str, List[Dict]] = {variant['id']: [] for variant in variants}
+    if len(variants) == 1:
+        assigned[variants[0]['id']] = list(listings)
+        return assigned
+
+    materials = {
+        variant['id']: material_of(variant.get('material')) or material_of(variant.get('name'))
+        for variant in variants
+    }
+    prices = {variant['id']: reference_price(variant) for variant in variants}
+
+    for listing in listings:
+        material = material_of(listing.get('title'))
+        targets = [charm_id for charm_id, m in materials.items() if material and m == material]
+
+        price = listing.get('price')
+        if len(targets) != 1 and isinstance(price, (int, float)) and price > 0:
+            candidates = [
+                charm_id for charm_id in (targets or assigned)
+                if prices[charm_id]
+            ]
+            if candidates:
+                targets = [min(candidates, key=lambda c: abs(math.log(price / prices[c])))]
+
+        for charm_id in targets or assigned:
+            assigned[charm_id].append(listing)
+    return assigned
@@ -2,6 +2,7 @@
 Test AgentQL scraper specifically for James Avery "Jesus Loves Me Charm"
 This will show exactly what AgentQL is finding and why charm details aren't showing
 """
+import asyncio
 from scrapers.agentql_scraper import AgentQLMarketplaceScraper
 import json
 
@@ -27,7 +28,7 @@ def test_james_avery_charm():
         print("\n🎯 Starting scraping process...\n")
         
         # Scrape all marketplaces
-        results = scraper.scrape_all(charm_name)
+        results = asyncio.run(scraper.scrape_all(charm_name))
         
         # Print summary
         print("\n" + "="*80)
@@ -6,6 +6,7 @@ import asyncio
 import aiohttp
 from bs4 import BeautifulSoup
 import re
+from scrapers.http_transport import client_session
 
 async def test_ebay_search():
     print("=" * 80)
@@ -39,7 +40,7 @@ async def test_ebay_search():
     print()
     
     try:
-        async with aiohttp.ClientSession() as session:
+        async with client_session() as session:
             async with session.get(url, params=params, headers=headers, timeout=aiohttp.ClientTimeout(total=15)) as response:
                 print(f"📊 Response Status: {response.status}")
                 print(f"📝 Content Type: {response.headers.get('Content-Type', 'Unknown')}")
@@ -1,6 +1,7 @@
 """
 Test the AgentQL Etsy scraper directly
 """
+import asyncio
 import sys
 sys.path.insert(0, '.')
 
@@ -21,7 +22,7 @@ def test_etsy():
     print(f"\nSearching for: {charm_name}\n")
     
     # Run scrape
-    listings = scraper.scrape_etsy(charm_name)
+    listings = asyncio.run(scraper.scrape_etsy(charm_name))
     
     # Display results
     print("\n" + "="*60)
@@ -0,0 +1,67 @@
+"""
+Test the record/replay HTTP transport
+Records batched Poshmark searches against the fake Apify API, stops the
+server, then replays the same searches from the archive and compares results
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ.setdefault('APIFY_API_TOKEN', 'fake-token')
+os.environ.setdefault('APIFY_BASE_URL', 'http://localhost:8765/v2')
+os.environ.setdefault('SEARCH_CACHE_ENABLED', 'false')
+os.environ.setdefault('POSHMARK_REQUESTS_PER_SECOND', '0')
+
+from fake_apify_server import start_fake_apify
+from scrapers import http_transport
+from scrapers.http_transport import HttpArchive
+from scrapers.poshmark_scraper import poshmark_scraper
+
+CHARMS = ["Cross Charm", "Heart Charm", "Texas Charm", "Anchor Charm", "Star Charm"]
+
+
+async def run_searches(mode: str, archive: HttpArchive):
+    http_transport.HTTP_TRANSPORT = mode
+    http_transport.http_archive = archive
+    started = time.perf_counter()
+    try:
+        results = await asyncio.gather(*(poshmark_scraper.search_charm(name) for name in CHARMS))
+    finally:
+        await poshmark_scraper.close()
+    return results, time.perf_counter() - started
+
+
+async def test_http_replay():
+    print("=" * 60)
+    print("🧪 TESTING RECORD / REPLAY HTTP TRANSPORT")
+    print("=" * 60)
+
+    path = os.path.join(tempfile.mkdtemp(), 'poshmark.jsonl.gz')
+
+    runner = await start_fake_apify()
+    try:
+        recording = HttpArchive(path)
+        recorded, record_seconds = await run_searches('record', recording)
+        recording.close()
+    finally:
+        await runner.cleanup()
+    print(f"\n📼 Recorded {recording.recorded} exchanges in {record_seconds:.1f}s -> {path}")
+
+    # The fake server is gone; every response now comes from the archive
+    replaying = HttpArchive(path)
+    replayed, replay_seconds = await run_searches('replay', replaying)
+    print(f"▶️  Replayed {replaying.replayed} exchanges ({replaying.missed} missed) in {replay_seconds:.1f}s\n")
+
+    for name, before, after in zip(CHARMS, recorded, replayed):
+        same = [l['url'] for l in before] == [l['url'] for l in after]
+        print(f"   {'✅' if before and same else '❌'} {name}: {len(before)} recorded, {len(after)} replayed")
+
+    print("\n" + "=" * 60)
+    print("🏁 Test Complete")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    asyncio.run(test_http_replay())
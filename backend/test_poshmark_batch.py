@@ -0,0 +1,55 @@
+"""
+Test batched Poshmark searches against the fake Apify API
+Many concurrent searches should share one actor run and each get its own listings
+"""
+
+import asyncio
+import os
+import time
+
+os.environ.setdefault('APIFY_API_TOKEN', 'fake-token')
+os.environ.setdefault('APIFY_BASE_URL', 'http://localhost:8765/v2')
+os.environ.setdefault('SEARCH_CACHE_ENABLED', 'false')
+os.environ.setdefault('POSHMARK_REQUESTS_PER_SECOND', '0')
+
+from fake_apify_server import start_fake_apify
+from scrapers.poshmark_scraper import poshmark_scraper
+
+CHARMS = [
+    "Cross Charm", "Heart Charm", "Texas Charm", "Anchor Charm", "Star Charm",
+    "Butterfly Charm", "Dove Charm", "Cowboy Boot Charm", "Horseshoe Charm", "Angel Charm",
+]
+
+
+async def test_poshmark_batch():
+    print("=" * 60)
+    print("🧪 TESTING BATCHED POSHMARK SEARCHES (fake Apify)")
+    print("=" * 60)
+
+    runner = await start_fake_apify()
+    app = runner.app
+    try:
+        started = time.perf_counter()
+        results = await asyncio.gather(*(poshmark_scraper.search_charm(name) for name in CHARMS))
+        elapsed = time.perf_counter() - started
+
+        for name, listings in zip(CHARMS, results):
+            listings = listings or []
+            own = all(name.lower() in l['title'].lower() for l in listings)
+            print(f"   {'✅' if listings and own else '❌'} {name}: {len(listings)} listings")
+
+        stats = app['stats']
+        print(f"\n📊 {len(CHARMS)} searches -> {stats['runs_started']} actor run(s), "
+              f"{stats['status_polls']} status polls, {stats['dataset_reads']} dataset reads "
+              f"in {elapsed:.1f}s")
+    finally:
+        await poshmark_scraper.close()
+        await runner.cleanup()
+
+    print("\n" + "=" * 60)
+    print("🏁 Test Complete")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    asyncio.run(test_poshmark_batch())
@@ -5,6 +5,7 @@ import asyncio
 import os
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
+from services.detail_renderer import invalidate_rendered_detail
 
 # Define a mapping of charm names to their actual image URLs
 CHARM_IMAGES = {
@@ -60,7 +61,7 @@ async def update_charm_images():
             # Update the charm's images
             await db.charms.update_one(
                 {"id": charm["id"]},
-                {"$set": {"images": new_images}}
+                {"$set": {"images": new_images}, **invalidate_rendered_detail()}
             )
             
             print(f"Updated images for: {name}")
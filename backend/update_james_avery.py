@@ -6,6 +6,7 @@ import os
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 from scrapers.james_avery_scraper import JamesAveryScraper
+from services.detail_renderer import invalidate_rendered_detail
 
 async def update_james_avery_data():
     # Load environment variables
@@ -67,7 +68,7 @@ async def update_james_avery_data():
                         
                         await db.charms.update_one(
                             {"id": charm["id"]},
-                            {"$set": update_data}
+                            {"$set": update_data, **invalidate_rendered_detail()}
                         )
                         
                         print(f"Updated charm: {charm['name']}")
@@ -7,6 +7,7 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 import os
 from scrapers.james_avery_scraper import JamesAveryScraper
+from services.detail_renderer import invalidate_rendered_detail
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -53,7 +54,8 @@ async def update_single_charm(charm_name: str):
                             "images": product['images'],
                             "james_avery_url": product.get('url'),
                             "james_avery_price": product.get('price')
-                        }
+                        },
+                        **invalidate_rendered_detail()
                     }
                 )
                 if result.modified_count > 0: